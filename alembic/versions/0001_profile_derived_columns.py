@@ -0,0 +1,108 @@
+"""Add derived age and gender columns to profiles
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Tables are created by `Base.metadata.create_all`, which never alters an
+existing table. Revisions therefore only add what an older table is
+missing, and skip tables that don't exist yet (create_all makes them
+complete).
+"""
+from datetime import date
+from typing import Optional
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.profile_service import calculate_age, gender_mask, normalize_gender
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("birth_year", sa.Integer(), nullable=True),
+    sa.Column("age", sa.Integer(), nullable=True),
+    sa.Column("gender_code", sa.Integer(), nullable=False, server_default="0"),
+    sa.Column("gender_preference_mask", sa.Integer(), nullable=False, server_default="0"),
+]
+
+profiles = sa.table(
+    "profiles",
+    sa.column("id", sa.Integer),
+    sa.column("birth_date"),  # untyped: older SQLite rows hold ISO strings
+    sa.column("gender", sa.String),
+    sa.column("gender_preference", sa.JSON),
+    sa.column("birth_year", sa.Integer),
+    sa.column("age", sa.Integer),
+    sa.column("gender_code", sa.Integer),
+    sa.column("gender_preference_mask", sa.Integer),
+)
+
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return value
+
+
+def _backfill(bind, chunk_size: int = 1000):
+    """Recompute every profile's derived columns (also fixes masks from older rules)"""
+    update = profiles.update()\
+        .where(profiles.c.id == sa.bindparam("row_id"))\
+        .values(
+            birth_year=sa.bindparam("birth_year"),
+            age=sa.bindparam("age"),
+            gender_code=sa.bindparam("gender_code"),
+            gender_preference_mask=sa.bindparam("gender_preference_mask"),
+        )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(profiles.c.id, profiles.c.birth_date, profiles.c.gender, profiles.c.gender_preference)
+            .where(profiles.c.id > last_id)
+            .order_by(profiles.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        params = []
+        for row_id, birth_date, gender, preference in rows:
+            birth_date = _as_date(birth_date)
+            params.append({
+                "row_id": row_id,
+                "birth_year": birth_date.year if birth_date else None,
+                "age": calculate_age(birth_date),
+                "gender_code": int(normalize_gender(gender)),
+                "gender_preference_mask": gender_mask(preference),
+            })
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("profiles"):
+        return
+    existing = {column["name"] for column in inspector.get_columns("profiles")}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("profiles", column)
+    if "ix_profiles_visible_gender_age" not in {index["name"] for index in inspector.get_indexes("profiles")}:
+        op.create_index("ix_profiles_visible_gender_age", "profiles", ["is_visible", "gender_code", "age"])
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_profiles_visible_gender_age", table_name="profiles")
+    with op.batch_alter_table("profiles") as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column.name)
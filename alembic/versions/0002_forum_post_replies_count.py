@@ -0,0 +1,35 @@
+"""Add forum_posts.replies_count, counted from post_replies
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("forum_posts"):
+        return
+    if "replies_count" not in {column["name"] for column in inspector.get_columns("forum_posts")}:
+        op.add_column(
+            "forum_posts",
+            sa.Column("replies_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    op.execute(
+        "UPDATE forum_posts SET replies_count = "
+        "(SELECT COUNT(*) FROM post_replies WHERE post_replies.post_id = forum_posts.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("forum_posts") as batch:
+        batch.drop_column("replies_count")
@@ -0,0 +1,35 @@
+"""Add the feed and user-post keyset pagination indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_forum_posts_created_at_id": ["created_at", "id"],
+    "ix_forum_posts_author_created_at_id": ["author_id", "created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("forum_posts"):
+        return
+    existing = {index["name"] for index in inspector.get_indexes("forum_posts")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "forum_posts", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="forum_posts")
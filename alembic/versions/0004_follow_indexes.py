@@ -0,0 +1,35 @@
+"""Add the follower and following lookup indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_follows_following_follower": ["following_id", "follower_id"],
+    "ix_follows_follower_following": ["follower_id", "following_id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("follows"):
+        return
+    existing = {index["name"] for index in inspector.get_indexes("follows")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "follows", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="follows")
@@ -0,0 +1,35 @@
+"""Add forum_topics.post_count, counted from forum_posts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("forum_topics"):
+        return
+    if "post_count" not in {column["name"] for column in inspector.get_columns("forum_topics")}:
+        op.add_column(
+            "forum_topics",
+            sa.Column("post_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    op.execute(
+        "UPDATE forum_topics SET post_count = "
+        "(SELECT COUNT(*) FROM forum_posts WHERE forum_posts.topic_id = forum_topics.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("forum_topics") as batch:
+        batch.drop_column("post_count")
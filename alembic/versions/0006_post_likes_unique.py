@@ -0,0 +1,50 @@
+"""Drop duplicate post likes, make (post_id, user_id) unique and recount likes_count
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+SQLite cannot add a constraint to an existing table, so there the
+constraint is a unique index of the same name. It enforces the same rule.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+NAME = "uq_post_likes_post_user"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("post_likes"):
+        return
+    existing = {constraint["name"] for constraint in inspector.get_unique_constraints("post_likes")}
+    existing |= {index["name"] for index in inspector.get_indexes("post_likes")}
+    if NAME not in existing:
+        # Keep each user's first like of a post
+        op.execute(
+            "DELETE FROM post_likes WHERE id NOT IN "
+            "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM post_likes GROUP BY post_id, user_id) AS firsts)"
+        )
+        if bind.dialect.name == "sqlite":
+            op.create_index(NAME, "post_likes", ["post_id", "user_id"], unique=True)
+        else:
+            op.create_unique_constraint(NAME, "post_likes", ["post_id", "user_id"])
+    op.execute(
+        "UPDATE forum_posts SET likes_count = "
+        "(SELECT COUNT(*) FROM post_likes WHERE post_likes.post_id = forum_posts.id)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.drop_index(NAME, table_name="post_likes")
+    else:
+        op.drop_constraint(NAME, "post_likes", type_="unique")
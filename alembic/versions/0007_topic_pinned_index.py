@@ -0,0 +1,36 @@
+"""Add the pinned-first topic listing index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_forum_posts_topic_pinned_created_id": [
+        sa.text("topic_id"), sa.text("is_pinned DESC"), sa.text("created_at DESC"), sa.text("id DESC"),
+    ],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("forum_posts"):
+        return
+    existing = {index["name"] for index in inspector.get_indexes("forum_posts")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "forum_posts", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="forum_posts")
@@ -0,0 +1,34 @@
+"""Add the reply thread keyset pagination index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_post_replies_post_created_at_id": ["post_id", "created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("post_replies"):
+        return
+    existing = {index["name"] for index in inspector.get_indexes("post_replies")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "post_replies", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="post_replies")
@@ -0,0 +1,53 @@
+"""Add the mention lookup indexes and make post tags unique per post and user
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+SQLite cannot add a constraint to an existing table, so there
+uq_post_tags_post_user is a unique index of the same name.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+UNIQUE = "uq_post_tags_post_user"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("profiles"):
+        # Reflection skips expression indexes, so let the database check
+        op.create_index("ix_profiles_username_lower", "profiles", [sa.text("lower(username)")], if_not_exists=True)
+    if not inspector.has_table("post_tags"):
+        return
+    existing = {index["name"] for index in inspector.get_indexes("post_tags")}
+    existing |= {constraint["name"] for constraint in inspector.get_unique_constraints("post_tags")}
+    if UNIQUE not in existing:
+        # Keep each user's first tag on a post
+        op.execute(
+            "DELETE FROM post_tags WHERE id NOT IN "
+            "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM post_tags GROUP BY post_id, tagged_user_id) AS firsts)"
+        )
+        if bind.dialect.name == "sqlite":
+            op.create_index(UNIQUE, "post_tags", ["post_id", "tagged_user_id"], unique=True)
+        else:
+            op.create_unique_constraint(UNIQUE, "post_tags", ["post_id", "tagged_user_id"])
+    if "ix_post_tags_user_created_id" not in existing:
+        op.create_index("ix_post_tags_user_created_id", "post_tags", ["tagged_user_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_post_tags_user_created_id", table_name="post_tags")
+    if op.get_bind().dialect.name == "sqlite":
+        op.drop_index(UNIQUE, table_name="post_tags")
+    else:
+        op.drop_constraint(UNIQUE, "post_tags", type_="unique")
+    op.drop_index("ix_profiles_username_lower", table_name="profiles")
@@ -0,0 +1,42 @@
+"""Add forum_posts.moderation_status and the moderation_queue table
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("forum_posts") and \
+            "moderation_status" not in {column["name"] for column in inspector.get_columns("forum_posts")}:
+        op.add_column("forum_posts", sa.Column("moderation_status", sa.String(), nullable=True))
+    if not inspector.has_table("moderation_queue"):
+        op.create_table(
+            "moderation_queue",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("item_type", sa.String(), nullable=False),
+            sa.Column("item_id", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("claimed_by", sa.String(), nullable=True),
+            sa.Column("claimed_at", sa.DateTime(), nullable=True),
+            sa.Column("enqueued_at", sa.DateTime(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_moderation_queue_status_id", "moderation_queue", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_moderation_queue_status_id", table_name="moderation_queue")
+    op.drop_table("moderation_queue")
+    with op.batch_alter_table("forum_posts") as batch:
+        batch.drop_column("moderation_status")
@@ -0,0 +1,27 @@
+"""Add post_replies.moderation_status
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("post_replies") and \
+            "moderation_status" not in {column["name"] for column in inspector.get_columns("post_replies")}:
+        op.add_column("post_replies", sa.Column("moderation_status", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("post_replies") as batch:
+        batch.drop_column("moderation_status")
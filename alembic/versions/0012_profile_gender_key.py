@@ -0,0 +1,58 @@
+"""Add profiles.gender_key, the normalized gender unlisted preferences match on
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.profile_service import gender_key
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+profiles = sa.table(
+    "profiles",
+    sa.column("id", sa.Integer),
+    sa.column("gender", sa.String),
+    sa.column("gender_key", sa.String),
+)
+
+
+def _backfill(bind, chunk_size: int = 1000):
+    update = profiles.update()\
+        .where(profiles.c.id == sa.bindparam("row_id"))\
+        .values(gender_key=sa.bindparam("key"))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(profiles.c.id, profiles.c.gender)
+            .where(profiles.c.id > last_id)
+            .where(profiles.c.gender.isnot(None))
+            .order_by(profiles.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        bind.execute(update, [{"row_id": row_id, "key": gender_key(gender) or None} for row_id, gender in rows])
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("profiles"):
+        return
+    if "gender_key" not in {column["name"] for column in inspector.get_columns("profiles")}:
+        op.add_column("profiles", sa.Column("gender_key", sa.String(), nullable=True))
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("profiles") as batch:
+        batch.drop_column("gender_key")
@@ -38,7 +38,88 @@ class Settings(BaseSettings):
     # Replit OIDC (optional for local dev)
     ISSUER_URL: Optional[str] = os.getenv("ISSUER_URL", "https://replit.com/oidc")
     REPL_ID: Optional[str] = os.getenv("REPL_ID")
-    
+
+    # Discover swipe decks (pre-scored candidate queues per active user)
+    DECK_SIZE: int = int(os.getenv("DECK_SIZE", "100"))
+    DECK_LOW_WATERMARK: int = int(os.getenv("DECK_LOW_WATERMARK", "25"))
+    DECK_REFILL_INTERVAL_SECONDS: int = int(os.getenv("DECK_REFILL_INTERVAL_SECONDS", "5"))
+    DECK_IDLE_TTL_SECONDS: int = int(os.getenv("DECK_IDLE_TTL_SECONDS", "1800"))
+
+    # Discover impression de-duplication (per-user bloom filters)
+    IMPRESSION_FALSE_POSITIVE_RATE: float = float(os.getenv("IMPRESSION_FALSE_POSITIVE_RATE", "0.01"))
+    IMPRESSION_WINDOW_DAYS: int = int(os.getenv("IMPRESSION_WINDOW_DAYS", "14"))
+    IMPRESSION_MIN_CAPACITY: int = int(os.getenv("IMPRESSION_MIN_CAPACITY", "200"))
+    IMPRESSION_MAX_CAPACITY: int = int(os.getenv("IMPRESSION_MAX_CAPACITY", "20000"))
+    IMPRESSION_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("IMPRESSION_FLUSH_INTERVAL_SECONDS", "10"))
+
+    # Co-like ("people who liked X also liked") neighbors
+    COLIKE_TOP_K: int = int(os.getenv("COLIKE_TOP_K", "50"))
+    COLIKE_MIN_CO_LIKES: int = int(os.getenv("COLIKE_MIN_CO_LIKES", "2"))
+    COLIKE_RANK_WEIGHT: float = float(os.getenv("COLIKE_RANK_WEIGHT", "20"))
+
+    # Offline geocoding of free-text profile locations
+    GEOCODER_CACHE_SIZE: int = int(os.getenv("GEOCODER_CACHE_SIZE", "4096"))
+    GEOCODER_BACKFILL_BATCH_SIZE: int = int(os.getenv("GEOCODER_BACKFILL_BATCH_SIZE", "500"))
+
+    # Location ping write coalescing
+    LOCATION_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("LOCATION_FLUSH_INTERVAL_SECONDS", "30"))
+    LOCATION_FLUSH_DISTANCE_KM: float = float(os.getenv("LOCATION_FLUSH_DISTANCE_KM", "1.0"))
+
+    # Shared cache for the first pages of the global feed
+    FEED_CACHE_PAGES: int = int(os.getenv("FEED_CACHE_PAGES", "5"))
+    FEED_CACHE_TTL_SECONDS: int = int(os.getenv("FEED_CACHE_TTL_SECONDS", "60"))
+
+    # "Following" home timelines
+    TIMELINE_MAX_LENGTH: int = int(os.getenv("TIMELINE_MAX_LENGTH", "500"))
+    TIMELINE_FANOUT_LIMIT: int = int(os.getenv("TIMELINE_FANOUT_LIMIT", "5000"))
+    TIMELINE_IDLE_TTL_SECONDS: int = int(os.getenv("TIMELINE_IDLE_TTL_SECONDS", "86400"))
+    TIMELINE_EVICT_INTERVAL_SECONDS: int = int(os.getenv("TIMELINE_EVICT_INTERVAL_SECONDS", "300"))
+
+    # Post like counters (0 disables write-behind; see like_counter_service)
+    LIKE_WRITE_BEHIND_THRESHOLD: int = int(os.getenv("LIKE_WRITE_BEHIND_THRESHOLD", "0"))
+    LIKE_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("LIKE_FLUSH_INTERVAL_SECONDS", "2"))
+
+    # Denormalized counter reconciliation (see reconciliation_service)
+    COUNTER_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("COUNTER_RECONCILE_INTERVAL_SECONDS", "3600"))
+    COUNTER_RECONCILE_CHUNK_SIZE: int = int(os.getenv("COUNTER_RECONCILE_CHUNK_SIZE", "1000"))
+
+    # Post search (SQLite ranks only the newest N matches; see search_service)
+    SEARCH_MAX_CANDIDATES: int = int(os.getenv("SEARCH_MAX_CANDIDATES", "10000"))
+
+    # Trending ("hot") posts
+    TRENDING_HALF_LIFE_HOURS: float = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+    TRENDING_MAX_POSTS: int = int(os.getenv("TRENDING_MAX_POSTS", "1000"))
+    TRENDING_PERSIST_INTERVAL_SECONDS: int = int(os.getenv("TRENDING_PERSIST_INTERVAL_SECONDS", "60"))
+
+    # Trending hashtags (count-min sketches over a sliding window; see hashtag_service)
+    TRENDING_TAGS_WINDOW_HOURS: int = int(os.getenv("TRENDING_TAGS_WINDOW_HOURS", "24"))
+    TRENDING_TAGS_BUCKET_MINUTES: int = int(os.getenv("TRENDING_TAGS_BUCKET_MINUTES", "60"))
+    TRENDING_TAGS_SKETCH_WIDTH: int = int(os.getenv("TRENDING_TAGS_SKETCH_WIDTH", "2048"))
+    TRENDING_TAGS_SKETCH_DEPTH: int = int(os.getenv("TRENDING_TAGS_SKETCH_DEPTH", "4"))
+    TRENDING_TAGS_CANDIDATES: int = int(os.getenv("TRENDING_TAGS_CANDIDATES", "200"))
+
+    # Content moderation queue (see moderation_service)
+    MODERATION_WORKERS: int = int(os.getenv("MODERATION_WORKERS", "1"))
+    MODERATION_BATCH_SIZE: int = int(os.getenv("MODERATION_BATCH_SIZE", "200"))
+    MODERATION_POLL_INTERVAL_SECONDS: float = float(os.getenv("MODERATION_POLL_INTERVAL_SECONDS", "2"))
+    MODERATION_CLAIM_TIMEOUT_SECONDS: int = int(os.getenv("MODERATION_CLAIM_TIMEOUT_SECONDS", "300"))
+    MODERATION_MAX_ATTEMPTS: int = int(os.getenv("MODERATION_MAX_ATTEMPTS", "5"))
+    MODERATION_QUEUE_WARN_DEPTH: int = int(os.getenv("MODERATION_QUEUE_WARN_DEPTH", "5000"))
+    MODERATION_QUEUE_WARN_AGE_SECONDS: int = int(os.getenv("MODERATION_QUEUE_WARN_AGE_SECONDS", "300"))
+    # Comma-separated user ids allowed to read the queue stats; empty: nobody
+    MODERATION_STAFF_USER_IDS: str = os.getenv("MODERATION_STAFF_USER_IDS", "")
+
+    # Blocked-term list (empty path: app/data/blocked_terms.txt; see blocked_terms_service)
+    BLOCKED_TERMS_PATH: str = os.getenv("BLOCKED_TERMS_PATH", "")
+    BLOCKED_TERMS_RELOAD_SECONDS: int = int(os.getenv("BLOCKED_TERMS_RELOAD_SECONDS", "30"))
+
+    # Near-duplicate posts and replies (MinHash/LSH over a recent window; see duplicate_service)
+    DUPLICATE_WINDOW_MINUTES: int = int(os.getenv("DUPLICATE_WINDOW_MINUTES", "60"))
+    DUPLICATE_MAX_ENTRIES: int = int(os.getenv("DUPLICATE_MAX_ENTRIES", "100000"))
+    DUPLICATE_SIMILARITY: float = float(os.getenv("DUPLICATE_SIMILARITY", "0.8"))
+    DUPLICATE_MIN_WORDS: int = int(os.getenv("DUPLICATE_MIN_WORDS", "8"))
+    DUPLICATE_THROTTLE_COUNT: int = int(os.getenv("DUPLICATE_THROTTLE_COUNT", "3"))
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,6 +1,7 @@
 """
 Main FastAPI application entry point
 """
+import asyncio
 import os
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -40,6 +41,11 @@ async def lifespan(app: FastAPI):
     # Create tables
     Base.metadata.create_all(bind=engine)
     log("Database initialized")
+    try:
+        from app.services.search_service import ensure_search_index
+        ensure_search_index()
+    except Exception as e:
+        log(f"Warning: Could not set up the post search index: {e}")
     
     # Clean up expired sessions on startup
     from app.middleware.auth import cleanup_expired_sessions
@@ -51,10 +57,57 @@ async def lifespan(app: FastAPI):
         log("Expired sessions cleaned up")
     except Exception as e:
         log(f"Warning: Could not clean up expired sessions: {e}")
-    
+
+    # Background workers
+    from app.services.deck_service import run_deck_refill_loop
+    from app.services.impression_service import run_impression_flush_loop
+    from app.services.location_service import run_location_flush_loop
+    from app.services.timeline_service import run_timeline_eviction_loop
+    from app.services.like_counter_service import run_like_flush_loop
+    from app.services.reconciliation_service import run_reconciliation_loop
+    from app.services.text_index_service import build_text_index
+    from app.services.profile_service import run_birthday_refresh_loop
+
+    from app.services.map_index_service import build_map_index
+    from app.services.reference_data_service import reference_data
+    from app.services.trending_service import load_trending, run_trending_persist_loop
+    from app.services.hashtag_service import load_recent_hashtags
+    from app.services.duplicate_service import load_recent_content
+    from app.services.moderation_service import run_moderation_worker_loop
+
+    def load_in_memory_indexes():
+        db = SessionLocal()
+        try:
+            reference_data.load(db)
+            log(f"Indexed {build_text_index(db)} profiles for similarity search")
+            log(f"Indexed {build_map_index(db)} map points")
+            log(f"Loaded trending scores for {load_trending(db)} posts")
+            log(f"Counted hashtags of {load_recent_hashtags(db)} recent posts")
+            log(f"Indexed {load_recent_content(db)} recent posts and replies for duplicate detection")
+        finally:
+            db.close()
+
+    background_tasks = [
+        asyncio.create_task(asyncio.to_thread(load_in_memory_indexes)),
+        asyncio.create_task(run_deck_refill_loop()),
+        asyncio.create_task(run_impression_flush_loop()),
+        asyncio.create_task(run_location_flush_loop()),
+        asyncio.create_task(run_timeline_eviction_loop()),
+        asyncio.create_task(run_like_flush_loop()),
+        asyncio.create_task(run_reconciliation_loop()),
+        asyncio.create_task(run_trending_persist_loop()),
+        asyncio.create_task(run_birthday_refresh_loop()),
+    ]
+    background_tasks += [
+        asyncio.create_task(run_moderation_worker_loop()) for _ in range(settings.MODERATION_WORKERS)
+    ]
+
     yield
     # Shutdown
     log("Shutting down...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
 
 
 # Create FastAPI app
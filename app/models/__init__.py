@@ -3,13 +3,14 @@ Database models
 """
 from app.models.auth import User, Session
 from app.models.profile import Profile, SavedProfile
-from app.models.matching import Like, Match, Message
+from app.models.matching import Like, Match, Message, ProfileNeighbor, ImpressionFilter
 from app.models.collaboration import Collaboration, CollaborationWorkspace, CollabTemplate
-from app.models.community import ForumTopic, ForumPost, PostReply, PostLike, Event, EventAttendee, SafetyAlert
-from app.models.moderation import Block, Report
+from app.models.community import ForumTopic, ForumPost, PostReply, PostLike, PostTrendingScore, Event, EventAttendee, SafetyAlert
+from app.models.moderation import Block, Report, ModerationQueueItem
 from app.models.support import SupportTicket, SupportCategory
 from app.models.connections import Follow, MutedUser, RestrictedUser, PostTag
 from app.models.vault import DraftPost, ArchivedItem, DeletedPost
+from app.models.jobs import JobCheckpoint
 
 __all__ = [
     "User",
@@ -19,6 +20,8 @@ __all__ = [
     "Like",
     "Match",
     "Message",
+    "ProfileNeighbor",
+    "ImpressionFilter",
     "Collaboration",
     "CollaborationWorkspace",
     "CollabTemplate",
@@ -26,11 +29,13 @@ __all__ = [
     "ForumPost",
     "PostReply",
     "PostLike",
+    "PostTrendingScore",
     "Event",
     "EventAttendee",
     "SafetyAlert",
     "Block",
     "Report",
+    "ModerationQueueItem",
     "SupportTicket",
     "SupportCategory",
     "Follow",
@@ -40,4 +45,5 @@ __all__ = [
     "DraftPost",
     "ArchivedItem",
     "DeletedPost",
+    "JobCheckpoint",
 ]
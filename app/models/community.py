@@ -1,7 +1,7 @@
 """
 Community models (forums, events, safety alerts)
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -15,6 +15,7 @@ class ForumTopic(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=False)
     icon = Column(String, nullable=False)
+    post_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
@@ -33,12 +34,27 @@ class ForumPost(Base):
     is_anonymous = Column(Boolean, nullable=False, server_default="false")
     is_pinned = Column(Boolean, nullable=False, server_default="false")
     likes_count = Column(Integer, nullable=False, server_default="0")
+    replies_count = Column(Integer, nullable=False, server_default="0")
+    moderation_status = Column(String, nullable=True)  # None until moderated; approved, flagged or rejected
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     topic = relationship("ForumTopic", back_populates="posts")
     replies = relationship("PostReply", back_populates="post")
+    
+    # Keyset pagination of the feed and of a user's posts
+    __table_args__ = (
+        Index("ix_forum_posts_created_at_id", "created_at", "id"),
+        Index("ix_forum_posts_author_created_at_id", "author_id", "created_at", "id"),
+    )
+
+
+# A topic's posts, pinned first, then newest first
+Index(
+    "ix_forum_posts_topic_pinned_created_id",
+    ForumPost.topic_id, ForumPost.is_pinned.desc(), ForumPost.created_at.desc(), ForumPost.id.desc()
+)
 
 
 class PostReply(Base):
@@ -50,10 +66,16 @@ class PostReply(Base):
     author_id = Column(String, ForeignKey("users.id"), nullable=True)
     content = Column(Text, nullable=False)
     is_anonymous = Column(Boolean, nullable=False, server_default="false")
+    moderation_status = Column(String, nullable=True)  # None until moderated; approved, flagged or rejected
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     post = relationship("ForumPost", back_populates="replies")
+    
+    # Keyset pagination of a post's thread, oldest first
+    __table_args__ = (
+        Index("ix_post_replies_post_created_at_id", "post_id", "created_at", "id"),
+    )
 
 
 class PostLike(Base):
@@ -68,6 +90,22 @@ class PostLike(Base):
     # Relationships
     post = relationship("ForumPost")
     user = relationship("User")
+    
+    __table_args__ = (
+        UniqueConstraint("post_id", "user_id", name="uq_post_likes_post_user"),
+    )
+
+
+class PostTrendingScore(Base):
+    """Snapshot of the in-memory trending scores (see trending_service)
+    
+    `score` is the time-decayed score as of `scored_at`.
+    """
+    __tablename__ = "post_trending_scores"
+    
+    post_id = Column(Integer, ForeignKey("forum_posts.id"), primary_key=True)
+    score = Column(Float, nullable=False)
+    scored_at = Column(DateTime, nullable=False)
 
 
 class Event(Base):
@@ -1,7 +1,7 @@
 """
 Connection models (follows, mutes, restrictions, etc.)
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -19,6 +19,12 @@ class Follow(Base):
     # Relationships
     follower = relationship("User", foreign_keys=[follower_id])
     following = relationship("User", foreign_keys=[following_id])
+    
+    # Timeline fan-out (followers of an author) and rebuilds (followees of a reader)
+    __table_args__ = (
+        Index("ix_follows_following_follower", "following_id", "follower_id"),
+        Index("ix_follows_follower_following", "follower_id", "following_id"),
+    )
 
 
 class MutedUser(Base):
@@ -63,3 +69,9 @@ class PostTag(Base):
     # Relationships
     post = relationship("ForumPost", foreign_keys=[post_id])
     tagged_user = relationship("User", foreign_keys=[tagged_user_id], back_populates="post_tags")
+    
+    # One tag per user per post; a user's tags are listed newest first
+    __table_args__ = (
+        UniqueConstraint("post_id", "tagged_user_id", name="uq_post_tags_post_user"),
+        Index("ix_post_tags_user_created_id", "tagged_user_id", "created_at", "id"),
+    )
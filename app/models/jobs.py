@@ -0,0 +1,15 @@
+"""
+Background job bookkeeping models
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class JobCheckpoint(Base):
+    """Last processed row for an incremental job (e.g. highest likes.id seen)"""
+    __tablename__ = "job_checkpoints"
+    
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
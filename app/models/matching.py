@@ -1,7 +1,7 @@
 """
 Matching and messaging models
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, LargeBinary, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -56,3 +56,36 @@ class Message(Base):
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships (set up in __init__.py)
+
+
+class ProfileNeighbor(Base):
+    """Item-item similarity from the likes graph ("people who liked X also liked Y")"""
+    __tablename__ = "profile_neighbors"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    neighbor_id = Column(String, ForeignKey("users.id"), nullable=False)
+    score = Column(Float, nullable=False)
+    co_likes = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ImpressionFilter(Base):
+    """Per-user bloom filters of profiles already shown in discover
+    
+    Two generations are kept: new impressions go into `bits`, and once that
+    generation is full or older than the impression window it becomes
+    `previous_bits`, so impressions age out after roughly two windows.
+    """
+    __tablename__ = "impression_filters"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, unique=True)
+    capacity = Column(Integer, nullable=False)
+    num_hashes = Column(Integer, nullable=False)
+    bits = Column(LargeBinary, nullable=False)
+    item_count = Column(Integer, nullable=False, server_default="0")
+    started_at = Column(DateTime, server_default=func.now())
+    previous_num_hashes = Column(Integer, nullable=True)
+    previous_bits = Column(LargeBinary, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
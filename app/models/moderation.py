@@ -1,7 +1,7 @@
 """
 Moderation models
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -28,3 +28,22 @@ class Report(Base):
     description = Column(Text, nullable=True)
     status = Column(String, nullable=False, server_default="pending")
     created_at = Column(DateTime, server_default=func.now())
+
+
+class ModerationQueueItem(Base):
+    """A post or message waiting for the moderation workers (see moderation_service)"""
+    __tablename__ = "moderation_queue"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_type = Column(String, nullable=False)  # "post", "reply" or "message"
+    item_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, server_default="pending")  # pending, processing, failed
+    attempts = Column(Integer, nullable=False, server_default="0")
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    enqueued_at = Column(DateTime, server_default=func.now())
+    
+    # Workers claim the oldest pending rows
+    __table_args__ = (
+        Index("ix_moderation_queue_status_id", "status", "id"),
+    )
@@ -1,11 +1,23 @@
 """
 Profile models
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Float, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 from typing import Optional, Dict, List
+import enum
+
+
+class GenderCode(int, enum.Enum):
+    """Normalized gender, stored in profiles.gender_code; bit (1 << code) in preference masks"""
+    UNKNOWN = 0
+    WOMAN = 1
+    MAN = 2
+    NON_BINARY = 3
+    TRANS_WOMAN = 4
+    TRANS_MAN = 5
+    OTHER = 6
 
 
 class Profile(Base):
@@ -60,8 +72,22 @@ class Profile(Base):
     testing_status = Column(String, nullable=True)
     preferred_language = Column(String, server_default="'en'")
     
+    # Derived from birth_date / gender / gender_preference by the profile service
+    # so age and gender compatibility can be filtered in SQL
+    birth_year = Column(Integer, nullable=True)
+    age = Column(Integer, nullable=True)  # refreshed daily for birthdays
+    gender_code = Column(Integer, nullable=False, server_default="0")  # GenderCode
+    gender_key = Column(String, nullable=True)  # gender in gender_key form, for unlisted-gender matches
+    gender_preference_mask = Column(Integer, nullable=False, server_default="0")  # 0 = no preference
+    
     # Relationships
     user = relationship("User", back_populates="profile")
+    
+    __table_args__ = (
+        Index("ix_profiles_visible_gender_age", "is_visible", "gender_code", "age"),
+        # @mention lookups are case-insensitive
+        Index("ix_profiles_username_lower", func.lower(username)),
+    )
 
 
 class SavedProfile(Base):
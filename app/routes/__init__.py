@@ -2,7 +2,7 @@
 API routes
 """
 from fastapi import FastAPI
-from app.routes import auth, profiles, matching, collaboration, community, moderation, support, connections, vault, statistics
+from app.routes import auth, profiles, matching, collaboration, community, moderation, support, connections, vault, statistics, map, search, trending
 
 def register_routes(app: FastAPI):
     """Register all API routes"""
@@ -16,3 +16,6 @@ def register_routes(app: FastAPI):
     app.include_router(connections.router, prefix="/api", tags=["connections"])
     app.include_router(vault.router, prefix="/api", tags=["vault"])
     app.include_router(statistics.router, prefix="/api", tags=["statistics"])
+    app.include_router(map.router, prefix="/api", tags=["map"])
+    app.include_router(search.router, prefix="/api", tags=["search"])
+    app.include_router(trending.router, prefix="/api", tags=["trending"])
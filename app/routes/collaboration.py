@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.storage_service import get_storage
+from app.services.reference_data_service import reference_data
 from app.middleware.auth import get_current_user
 from app.models.auth import User
 from pydantic import BaseModel
@@ -93,3 +94,9 @@ async def acknowledge_collaboration(
         raise HTTPException(status_code=404, detail="Collaboration not found")
     
     return collab
+
+
+@router.get("/templates")
+async def get_collab_templates(db: Session = Depends(get_db)):
+    """Get collaboration message templates"""
+    return reference_data.templates(db)
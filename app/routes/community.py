@@ -1,16 +1,30 @@
 """
 Community routes (forums, events, safety alerts)
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
 from app.database import get_db
 from app.models.community import ForumPost, ForumTopic, PostReply, PostLike
 from app.models.auth import User
 from app.middleware.auth import get_current_user, get_current_user_id
+from app.services.feed_service import author_card, post_card_query, build_post_cards, liked_post_ids, reply_card, reply_card_query
+from app.services.feed_cache_service import feed_cache, is_cacheable_page, render_page
+from app.services.timeline_service import fan_out_post, get_timeline_page
+from app.services.forum_service import topic_to_response, increment_topic_post_count
+from app.services.reference_data_service import reference_data, TOPICS
+from app.services.like_counter_service import buffer_like_delta, change_likes_count, current_likes_count
+from app.services.search_service import index_post, index_reply
+from app.services.trending_service import trending_scores, record_like, record_unlike, record_reply
+from app.services.hashtag_service import record_post_hashtags
+from app.services.mention_service import tag_mentions
+from app.services.moderation_service import FLAGGED, POST, REPLY, enqueue as enqueue_moderation, high_risk_category
+from app.services.duplicate_service import check_duplicate, record_content
+from app.services.pagination_service import decode_cursor, encode_cursor, keyset_after, next_cursor, paged_response
 from fastapi import Request
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 router = APIRouter()
 
@@ -32,105 +46,147 @@ class CreateForumTopicRequest(BaseModel):
     icon: Optional[str] = "📝"
 
 
-def get_or_create_general_topic(db: Session) -> ForumTopic:
-    """Get or create the General Feed topic"""
-    topic = db.query(ForumTopic).filter(ForumTopic.name == "General Feed").first()
-    if not topic:
-        topic = ForumTopic(
-            name="General Feed",
-            description="General posts from creators",
-            icon="📝"
+# Sort keys for paged post lists; all descending, so one keyset predicate fits each
+NEWEST_FIRST = (ForumPost.created_at, ForumPost.id)
+PINNED_THEN_NEWEST = (ForumPost.is_pinned, ForumPost.created_at, ForumPost.id)
+
+
+def _load_feed_page(
+    query,
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+    db: Session,
+    viewer_id: Optional[str] = None,
+    sort: Tuple = NEWEST_FIRST
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Page a post_card_query in `sort` order, by keyset cursor or (legacy) offset"""
+    query = query.order_by(*[desc(column) for column in sort])
+    if cursor:
+        try:
+            values = decode_cursor(cursor, len(sort))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(keyset_after(db, sort, values))
+    elif offset:
+        query = query.offset(offset)
+    rows = query.limit(limit).all()
+    key = lambda row: tuple(getattr(row[0], column.key) for column in sort)
+    return build_post_cards(db, rows, viewer_id), next_cursor(rows, limit, key)
+
+
+def _load_reply_page(
+    db: Session,
+    post_id: int,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Page a post's replies oldest first, by keyset cursor or (legacy) offset"""
+    query = reply_card_query(db, post_id)
+    if cursor:
+        try:
+            created_at, reply_id = decode_cursor(cursor, 2)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(
+            keyset_after(db, (PostReply.created_at, PostReply.id), (created_at, reply_id), descending=False)
         )
-        db.add(topic)
-        db.commit()
-        db.refresh(topic)
-    return topic
+    elif offset:
+        query = query.offset(offset)
+    rows = query.limit(limit).all()
+    replies = [reply_card(reply, author) for reply, author in rows]
+    return replies, next_cursor(rows, limit, lambda row: (row[0].created_at, row[0].id))
+
+
+def _load_hot_page(
+    db: Session,
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+    viewer_id: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Page the in-memory trending ranking; the cursor is the next offset"""
+    if cursor:
+        try:
+            (offset,) = decode_cursor(cursor, 1)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not isinstance(offset, int) or offset < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    post_ids = trending_scores.page(offset, limit)
+    if not post_ids:
+        return [], None
+    rank = {post_id: i for i, post_id in enumerate(post_ids)}
+    rows = post_card_query(db).filter(ForumPost.id.in_(post_ids)).all()
+    rows.sort(key=lambda row: rank[row[0].id])
+    cursor_out = encode_cursor(offset + limit) if len(post_ids) == limit else None
+    return build_post_cards(db, rows, viewer_id), cursor_out
 
 
 @router.get("/feed")
 async def get_feed(
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    sort: str = Query("new", pattern="^(new|hot)$"),
     db: Session = Depends(get_db),
     request: Request = None
 ):
-    """Get feed of creator posts"""
+    """Get feed of creator posts, newest first or (sort=hot) trending"""
     # Get current user if authenticated (optional)
-    current_user = None
+    viewer_id = None
     try:
         if request:
-            user_id = get_current_user_id(request, db)
-            if user_id:
-                current_user = db.query(User).filter(User.id == user_id).first()
+            viewer_id = get_current_user_id(request, db)
     except:
         pass  # User not authenticated, continue without user
-    """Get feed of creator posts"""
     try:
-        # Get recent forum posts with author and topic info
-        posts = db.query(ForumPost)\
-            .join(ForumTopic, ForumPost.topic_id == ForumTopic.id)\
-            .outerjoin(User, ForumPost.author_id == User.id)\
-            .order_by(desc(ForumPost.created_at))\
-            .limit(limit)\
-            .offset(offset)\
-            .all()
-        
-        # Get reply counts for each post
-        reply_counts = db.query(
-            PostReply.post_id,
-            func.count(PostReply.id).label('count')
-        ).group_by(PostReply.post_id).all()
-        
-        reply_count_map = {post_id: count for post_id, count in reply_counts}
-        
-        # Get liked posts for current user if authenticated
-        liked_post_ids = set()
-        if current_user:
-            liked_posts = db.query(PostLike.post_id).filter(
-                PostLike.user_id == current_user.id,
-                PostLike.post_id.in_([p.id for p in posts])
-            ).all()
-            liked_post_ids = {post_id for (post_id,) in liked_posts}
-        
-        result = []
-        for post in posts:
-            post_data: Dict[str, Any] = {
-                "id": post.id,
-                "title": post.title,
-                "content": post.content,
-                "authorId": post.author_id,
-                "likesCount": post.likes_count or 0,
-                "repliesCount": reply_count_map.get(post.id, 0),
-                "createdAt": post.created_at.isoformat() if post.created_at else None,
-                "isAnonymous": post.is_anonymous,
-                "isLiked": post.id in liked_post_ids if current_user else False,
-            }
-            
-            # Add author info if not anonymous
-            if not post.is_anonymous and post.author_id:
-                author = db.query(User).filter(User.id == post.author_id).first()
-                if author:
-                    post_data["author"] = {
-                        "id": author.id,
-                        "firstName": author.first_name,
-                        "lastName": author.last_name,
-                        "profileImageUrl": author.profile_image_url
-                    }
-            
-            # Add topic info
-            if post.topic:
-                post_data["topic"] = {
-                    "id": post.topic.id,
-                    "name": post.topic.name
-                }
-            
-            result.append(post_data)
+        if sort == "hot":
+            # Ranking comes from memory; the page costs the same queries as a chronological one
+            posts, cursor_out = _load_hot_page(db, limit, offset, cursor, viewer_id)
+            return paged_response(posts, cursor_out, cursor, response)
+        
+        if is_cacheable_page(limit, offset, cursor):
+            # First pages are shared by every viewer; only isLiked differs
+            page = await feed_cache.get_or_build(
+                (limit, offset),
+                lambda: _load_feed_page(post_card_query(db), limit, offset, None, db)
+            )
+            return render_page(page, liked_post_ids(db, viewer_id, page.post_ids), envelope=cursor is not None)
         
-        return result
+        # One joined query for posts, topics and author cards
+        posts, cursor_out = _load_feed_page(post_card_query(db), limit, offset, cursor, db, viewer_id)
+        return paged_response(posts, cursor_out, cursor, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch feed: {str(e)}")
 
 
+@router.get("/feed/following")
+async def get_following_feed(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get posts from the accounts the current user follows"""
+    after = None
+    if cursor:
+        try:
+            after = tuple(decode_cursor(cursor, 2))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        posts, last = get_timeline_page(db, current_user.id, limit, after)
+        return paged_response(posts, encode_cursor(*last) if last else None, cursor, response)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch following feed: {str(e)}")
+
+
 class CreatePostRequest(BaseModel):
     title: str
     content: str
@@ -144,21 +200,39 @@ async def create_post(
     current_user: User = Depends(get_current_user)
 ):
     """Create a new post"""
+    # Only high-risk content is checked inline; the rest is moderated from the queue
+    if high_risk_category(request.title, request.content):
+        raise HTTPException(status_code=400, detail="Post violates community guidelines")
+    duplicate = check_duplicate(current_user.id, request.title, request.content)
+    if duplicate.throttled:
+        raise HTTPException(status_code=429, detail="You've posted this several times already. Please slow down.")
     try:
-        # Get or create General Feed topic
-        topic = get_or_create_general_topic(db)
+        # General Feed topic comes from the reference data cache
+        topic = reference_data.general_topic(db)
         
         # Create post
         post = ForumPost(
-            topic_id=topic.id,
+            topic_id=topic["id"],
             author_id=None if request.isAnonymous else current_user.id,
             title=request.title,
             content=request.content,
-            is_anonymous=request.isAnonymous or False
+            is_anonymous=request.isAnonymous or False,
+            is_pinned=False,
+            moderation_status=FLAGGED if duplicate.suspected else None
         )
         db.add(post)
+        db.flush()
+        index_post(db, post)
+        tag_mentions(db, post.id, current_user.id, post.title, post.content)
+        enqueue_moderation(db, POST, post.id)
+        increment_topic_post_count(db, topic["id"])
         db.commit()
         db.refresh(post)
+        reference_data.bump_post_count(topic["id"])
+        feed_cache.invalidate("feed")
+        fan_out_post(db, post)
+        record_post_hashtags(post)
+        record_content(duplicate, post.author_id)
         
         # Return post with author and topic info
         post_data: Dict[str, Any] = {
@@ -172,20 +246,10 @@ async def create_post(
             "isAnonymous": post.is_anonymous,
         }
         
-        if not post.is_anonymous and post.author_id:
-            author = db.query(User).filter(User.id == post.author_id).first()
-            if author:
-                post_data["author"] = {
-                    "id": author.id,
-                    "firstName": author.first_name,
-                    "lastName": author.last_name,
-                    "profileImageUrl": author.profile_image_url
-                }
+        if not post.is_anonymous:
+            post_data["author"] = author_card(current_user)
         
-        post_data["topic"] = {
-            "id": topic.id,
-            "name": topic.name
-        }
+        post_data["topic"] = topic
         
         return post_data
     except Exception as e:
@@ -196,60 +260,21 @@ async def create_post(
 @router.get("/posts/user/{user_id}")
 async def get_user_posts(
     user_id: str,
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
     """Get posts by a specific user"""
     try:
-        posts = db.query(ForumPost)\
+        query = post_card_query(db)\
             .filter(ForumPost.author_id == user_id)\
-            .filter(ForumPost.is_anonymous == False)\
-            .join(ForumTopic, ForumPost.topic_id == ForumTopic.id)\
-            .order_by(desc(ForumPost.created_at))\
-            .limit(limit)\
-            .offset(offset)\
-            .all()
-        
-        # Get reply counts
-        reply_counts = db.query(
-            PostReply.post_id,
-            func.count(PostReply.id).label('count')
-        ).group_by(PostReply.post_id).all()
-        
-        reply_count_map = {post_id: count for post_id, count in reply_counts}
-        
-        result = []
-        for post in posts:
-            post_data: Dict[str, Any] = {
-                "id": post.id,
-                "title": post.title,
-                "content": post.content,
-                "authorId": post.author_id,
-                "likesCount": post.likes_count or 0,
-                "repliesCount": reply_count_map.get(post.id, 0),
-                "createdAt": post.created_at.isoformat() if post.created_at else None,
-                "isAnonymous": False,
-            }
-            
-            author = db.query(User).filter(User.id == post.author_id).first()
-            if author:
-                post_data["author"] = {
-                    "id": author.id,
-                    "firstName": author.first_name,
-                    "lastName": author.last_name,
-                    "profileImageUrl": author.profile_image_url
-                }
-            
-            if post.topic:
-                post_data["topic"] = {
-                    "id": post.topic.id,
-                    "name": post.topic.name
-                }
-            
-            result.append(post_data)
-        
-        return result
+            .filter(ForumPost.is_anonymous == False)
+        posts, cursor_out = _load_feed_page(query, limit, offset, cursor, db)
+        return paged_response(posts, cursor_out, cursor, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch user posts: {str(e)}")
 
@@ -258,25 +283,7 @@ async def get_user_posts(
 async def get_forums(db: Session = Depends(get_db)):
     """Get all forum topics with post counts"""
     try:
-        topics = db.query(ForumTopic).order_by(ForumTopic.created_at).all()
-        
-        result = []
-        for topic in topics:
-            # Get post count for this topic
-            post_count = db.query(func.count(ForumPost.id)).filter(
-                ForumPost.topic_id == topic.id
-            ).scalar() or 0
-            
-            result.append({
-                "id": topic.id,
-                "name": topic.name,
-                "description": topic.description,
-                "icon": topic.icon,
-                "createdAt": topic.created_at.isoformat() if topic.created_at else None,
-                "postCount": post_count
-            })
-        
-        return result
+        return reference_data.topics(db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch forums: {str(e)}")
 
@@ -313,15 +320,9 @@ async def create_forum_topic(
         db.add(topic)
         db.commit()
         db.refresh(topic)
+        reference_data.invalidate(TOPICS)
         
-        return {
-            "id": topic.id,
-            "name": topic.name,
-            "description": topic.description,
-            "icon": topic.icon,
-            "createdAt": topic.created_at.isoformat() if topic.created_at else None,
-            "postCount": 0
-        }
+        return topic_to_response(topic)
     except HTTPException:
         raise
     except Exception as e:
@@ -337,12 +338,29 @@ async def get_forum_topics(db: Session = Depends(get_db)):
 
 @router.get("/forums/posts")
 async def get_forum_posts(
+    response: Response,
     topic_id: int = Query(...),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    request: Request = None
 ):
-    """Get forum posts"""
-    # TODO: Implement
-    return []
+    """Get a topic's posts, pinned first, then newest first"""
+    viewer_id = None
+    try:
+        if request:
+            viewer_id = get_current_user_id(request, db)
+    except:
+        pass  # User not authenticated, continue without user
+    try:
+        # Walks ix_forum_posts_topic_pinned_created_id; cards and liked flags add one query each
+        query = post_card_query(db).filter(ForumPost.topic_id == topic_id)
+        posts, cursor_out = _load_feed_page(query, limit, 0, cursor, db, viewer_id, sort=PINNED_THEN_NEWEST)
+        return paged_response(posts, cursor_out, cursor, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch forum posts: {str(e)}")
 
 
 @router.get("/events")
@@ -359,6 +377,51 @@ async def get_safety_alerts(db: Session = Depends(get_db)):
     return []
 
 
+@router.get("/posts/{post_id}")
+async def get_post(
+    post_id: int,
+    includeReplies: bool = Query(False),
+    replyLimit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+    request: Request = None
+):
+    """Get a post, optionally with the first page of its replies inline"""
+    viewer_id = None
+    try:
+        if request:
+            viewer_id = get_current_user_id(request, db)
+    except:
+        pass  # User not authenticated, continue without user
+    try:
+        row = post_card_query(db).filter(ForumPost.id == post_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Post not found")
+        post_data = build_post_cards(db, [row], viewer_id)[0]
+        
+        if includeReplies:
+            # Saves the client a round trip; later pages come from /posts/{id}/replies?cursor=
+            replies, cursor_out = _load_reply_page(db, post_id, replyLimit)
+            post_data["replies"] = replies
+            post_data["repliesNextCursor"] = cursor_out
+        
+        return post_data
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch post: {str(e)}")
+
+
+@router.get("/forums/posts/{post_id}")
+async def get_forum_post(
+    post_id: int,
+    replyLimit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+    request: Request = None
+):
+    """Get a forum post with its first page of replies"""
+    return await get_post(post_id, True, replyLimit, db, request)
+
+
 @router.post("/posts/{post_id}/like")
 async def like_post(
     post_id: int,
@@ -367,37 +430,44 @@ async def like_post(
 ):
     """Like or unlike a post"""
     try:
-        post = db.query(ForumPost).filter(ForumPost.id == post_id).first()
-        if not post:
+        if not db.query(ForumPost.id).filter(ForumPost.id == post_id).first():
             raise HTTPException(status_code=404, detail="Post not found")
         
-        # Check if user already liked this post
-        existing_like = db.query(PostLike).filter(
+        # Unlike if a like exists; otherwise like. The unique (post_id, user_id)
+        # constraint makes a concurrent duplicate like a no-op instead of a double count
+        existing = db.query(PostLike.id, PostLike.created_at).filter(
             PostLike.post_id == post_id,
             PostLike.user_id == current_user.id
         ).first()
+        removed = db.query(PostLike).filter(PostLike.id == existing.id)\
+            .delete(synchronize_session=False) if existing else 0
         
-        if existing_like:
-            # Unlike: remove the like
-            db.delete(existing_like)
-            post.likes_count = max(0, (post.likes_count or 0) - 1)
+        liked = False
+        buffered = 0
+        if removed:
+            buffered = change_likes_count(db, post_id, -removed)
             is_liked = False
         else:
-            # Like: add the like
-            new_like = PostLike(
-                post_id=post_id,
-                user_id=current_user.id
-            )
-            db.add(new_like)
-            post.likes_count = (post.likes_count or 0) + 1
             is_liked = True
+            try:
+                with db.begin_nested():
+                    db.add(PostLike(post_id=post_id, user_id=current_user.id))
+                buffered = change_likes_count(db, post_id, 1)
+                liked = True
+            except IntegrityError:
+                pass  # Liked by a concurrent request
         
         db.commit()
-        db.refresh(post)
+        buffer_like_delta(post_id, buffered)
+        feed_cache.invalidate(f"post:{post_id}")
+        if liked:
+            record_like(post_id)
+        elif removed:
+            record_unlike(post_id, existing.created_at)
         
         return {
             "isLiked": is_liked,
-            "likesCount": post.likes_count or 0
+            "likesCount": current_likes_count(db, post_id)
         }
     except HTTPException:
         raise
@@ -425,35 +495,36 @@ async def create_reply(
         if not content:
             raise HTTPException(status_code=400, detail="Content is required")
         
+        # Only high-risk content is checked inline; the rest is moderated from the queue
+        if high_risk_category(content):
+            raise HTTPException(status_code=400, detail="Reply violates community guidelines")
+        duplicate = check_duplicate(current_user.id, content)
+        if duplicate.throttled:
+            raise HTTPException(status_code=429, detail="You've posted this several times already. Please slow down.")
+        
         reply = PostReply(
             post_id=post_id,
             author_id=None if is_anonymous else current_user.id,
             content=content,
-            is_anonymous=is_anonymous or False
+            is_anonymous=is_anonymous or False,
+            moderation_status=FLAGGED if duplicate.suspected else None
         )
         db.add(reply)
+        db.flush()
+        index_reply(db, reply)
+        tag_mentions(db, post_id, current_user.id, content)
+        enqueue_moderation(db, REPLY, reply.id)
+        db.query(ForumPost).filter(ForumPost.id == post_id).update(
+            {ForumPost.replies_count: ForumPost.replies_count + 1},
+            synchronize_session=False
+        )
         db.commit()
         db.refresh(reply)
+        feed_cache.invalidate(f"post:{post_id}")
+        record_reply(post_id)
+        record_content(duplicate, reply.author_id)
         
-        # Get author info if not anonymous
-        reply_data: Dict[str, Any] = {
-            "id": reply.id,
-            "content": reply.content,
-            "isAnonymous": reply.is_anonymous,
-            "createdAt": reply.created_at.isoformat() if reply.created_at else None,
-        }
-        
-        if not reply.is_anonymous and reply.author_id:
-            author = db.query(User).filter(User.id == reply.author_id).first()
-            if author:
-                reply_data["author"] = {
-                    "id": author.id,
-                    "firstName": author.first_name,
-                    "lastName": author.last_name,
-                    "profileImageUrl": author.profile_image_url
-                }
-        
-        return reply_data
+        return reply_card(reply, current_user)
     except HTTPException:
         raise
     except Exception as e:
@@ -464,40 +535,18 @@ async def create_reply(
 @router.get("/posts/{post_id}/replies")
 async def get_replies(
     post_id: int,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    """Get replies/comments for a post"""
+    """Get replies/comments for a post, oldest first"""
     try:
-        replies = db.query(PostReply)\
-            .filter(PostReply.post_id == post_id)\
-            .order_by(PostReply.created_at)\
-            .limit(limit)\
-            .offset(offset)\
-            .all()
-        
-        result = []
-        for reply in replies:
-            reply_data: Dict[str, Any] = {
-                "id": reply.id,
-                "content": reply.content,
-                "isAnonymous": reply.is_anonymous,
-                "createdAt": reply.created_at.isoformat() if reply.created_at else None,
-            }
-            
-            if not reply.is_anonymous and reply.author_id:
-                author = db.query(User).filter(User.id == reply.author_id).first()
-                if author:
-                    reply_data["author"] = {
-                        "id": author.id,
-                        "firstName": author.first_name,
-                        "lastName": author.last_name,
-                        "profileImageUrl": author.profile_image_url
-                    }
-            
-            result.append(reply_data)
-        
-        return result
+        # One query per page, authors joined in
+        replies, cursor_out = _load_reply_page(db, post_id, limit, offset, cursor)
+        return paged_response(replies, cursor_out, cursor, response, key="replies")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch replies: {str(e)}")
@@ -1,16 +1,19 @@
 """
 Connection routes (follows, mutes, restrictions, bookmarks, etc.)
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, desc
 from datetime import datetime, timedelta
 from app.database import get_db
 from app.middleware.auth import get_current_user
 from app.models.auth import User
 from app.models.connections import Follow, MutedUser, RestrictedUser, PostTag
+from app.services.timeline_service import timeline_store
 from app.models.profile import SavedProfile
 from app.models.community import ForumPost
+from app.services.feed_service import post_card_query
+from app.services.pagination_service import decode_cursor, keyset_after, next_cursor, paged_response
 from app.models.collaboration import Collaboration
 from pydantic import BaseModel
 from typing import Optional, List, Dict
@@ -99,6 +102,8 @@ async def unfollow_user(
     
     db.delete(follow)
     db.commit()
+    # Rebuilt without this user's posts on the next read
+    timeline_store.invalidate(current_user.id)
     return {"message": "Unfollowed successfully"}
 
 
@@ -353,35 +358,48 @@ async def remove_bookmark(
 
 @router.get("/tagged")
 async def get_tagged_posts(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get posts where the current user is tagged"""
-    tags = db.query(PostTag).filter(PostTag.tagged_user_id == current_user.id).all()
+    """Get posts where the current user is tagged, newest tag first"""
+    # Tags with their visible posts, topics and (non-anonymous) authors in one query
+    query = post_card_query(db).add_entity(PostTag)\
+        .join(PostTag, PostTag.post_id == ForumPost.id)\
+        .filter(PostTag.tagged_user_id == current_user.id)\
+        .order_by(desc(PostTag.created_at), desc(PostTag.id))
+    if cursor:
+        try:
+            created_at, tag_id = decode_cursor(cursor, 2)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(keyset_after(db, (PostTag.created_at, PostTag.id), (created_at, tag_id)))
+    rows = query.limit(limit).all()
     
     result = []
-    for tag in tags:
-        post = db.query(ForumPost).filter(ForumPost.id == tag.post_id).first()
-        if post:
-            author = db.query(User).filter(User.id == post.author_id).first()
-            result.append({
-                "id": tag.id,
-                "post_id": post.id,
-                "post": {
-                    "id": post.id,
-                    "title": post.title,
-                    "content": post.content,
-                    "created_at": post.created_at.isoformat() if post.created_at else None,
-                    "author": {
-                        "id": author.id if author else None,
-                        "displayName": author.display_name if author else None,
-                        "firstName": author.first_name if author else None,
-                    } if author else None,
-                    "topic": {
-                        "name": "Unknown",  # Would need to join with ForumTopic
-                    },
+    for post, topic, author, tag in rows:
+        result.append({
+            "id": tag.id,
+            "post_id": post.id,
+            "post": {
+                "id": post.id,
+                "title": post.title,
+                "content": post.content,
+                "created_at": post.created_at.isoformat() if post.created_at else None,
+                "author": {
+                    "id": author.id,
+                    "displayName": author.display_name,
+                    "firstName": author.first_name,
+                } if author else None,
+                "topic": {
+                    "id": topic.id,
+                    "name": topic.name,
                 },
-                "created_at": tag.created_at.isoformat() if tag.created_at else None,
-            })
+            },
+            "created_at": tag.created_at.isoformat() if tag.created_at else None,
+        })
     
-    return result
+    cursor_out = next_cursor(rows, limit, lambda row: (row[3].created_at, row[3].id))
+    return paged_response(result, cursor_out, cursor, response, key="tags")
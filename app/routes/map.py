@@ -0,0 +1,32 @@
+"""
+Map routes (clustered creators and events)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.middleware.auth import get_current_user
+from app.models.auth import User
+from app.services.map_index_service import map_index, LAYERS
+
+router = APIRouter(prefix="/map", tags=["map"])
+
+
+@router.get("/clusters")
+async def get_map_clusters(
+    minLat: float = Query(..., ge=-90, le=90),
+    minLng: float = Query(..., ge=-180, le=180),
+    maxLat: float = Query(..., ge=-90, le=90),
+    maxLng: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    layers: str = Query(",".join(LAYERS)),
+    current_user: User = Depends(get_current_user)
+):
+    """Get pre-aggregated creator/event clusters for a bounding box at a zoom level"""
+    if minLat > maxLat:
+        raise HTTPException(status_code=400, detail="minLat must not be greater than maxLat")
+    
+    requested = tuple(layer.strip() for layer in layers.split(",") if layer.strip())
+    unknown = [layer for layer in requested if layer not in LAYERS]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"layers must be a subset of {', '.join(LAYERS)}")
+    
+    used_zoom, clusters = map_index.clusters(minLat, minLng, maxLat, maxLng, zoom, requested)
+    return {"zoom": used_zoom, **clusters}
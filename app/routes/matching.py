@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.storage_service import get_storage
+from app.services.moderation_service import high_risk_category
 from app.middleware.auth import get_current_user, require_auth
 from app.models.auth import User
 from pydantic import BaseModel
@@ -177,6 +178,10 @@ async def send_message(
     if match.user1_id != user_id and match.user2_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to send messages in this match")
     
+    # Only high-risk content is checked inline; the rest is moderated from the queue
+    if high_risk_category(request.content):
+        raise HTTPException(status_code=400, detail="Message violates community guidelines")
+    
     # Send message
     message = storage.send_message(match_id, user_id, request.content)
     return message
@@ -1,10 +1,13 @@
 """
-Moderation routes (blocks and reports)
+Moderation routes (blocks, reports and the moderation queue)
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
 from app.services.storage_service import get_storage
+from app.services.deck_service import deck_store
+from app.services.moderation_service import queue_stats
 from app.middleware.auth import get_current_user
 from app.models.auth import User
 from pydantic import BaseModel
@@ -54,6 +57,8 @@ async def create_block(
         raise HTTPException(status_code=400, detail="Cannot block yourself")
     
     block = storage.create_block(user_id, blocked_id)
+    deck_store.discard_candidate(user_id, blocked_id)
+    deck_store.discard_candidate(blocked_id, user_id)
     return block
 
 
@@ -96,3 +101,18 @@ async def create_report(
         request.description
     )
     return report
+
+
+@router.get("/moderation/queue")
+async def get_moderation_queue_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Moderation queue depth, lag and worker throughput (staff only)"""
+    staff_ids = {i.strip() for i in settings.MODERATION_STAFF_USER_IDS.split(",") if i.strip()}
+    if current_user.id not in staff_ids:
+        raise HTTPException(status_code=403, detail="Not authorized to view the moderation queue")
+    try:
+        return queue_stats(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch moderation queue stats: {str(e)}")
@@ -1,16 +1,21 @@
 """
 Profile routes
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
 from app.models.profile import Profile
 from app.models.auth import User
 from app.services.profile_service import get_profile_by_user_id, update_profile, create_profile
 from app.services.storage_service import get_storage
+from app.services.deck_service import take_from_deck, rank_candidates, deck_store
+from app.services.impression_service import record_impressions
+from app.services.colike_service import get_also_liked
+from app.services.text_index_service import text_index
+from app.services.feed_cache_service import feed_cache
 from app.middleware.auth import get_current_user, require_auth
 from app.models.auth import User
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, List
 from fastapi import Request
 
@@ -54,6 +59,28 @@ def convert_profile_to_camel_case(profile_dict: dict) -> dict:
     return result
 
 
+def profile_to_response(profile: Profile) -> dict:
+    """Serialize a profile (with its user) the way the profile endpoints return it"""
+    profile_dict = {column.name: getattr(profile, column.name, None) for column in Profile.__table__.columns}
+    user = profile.user
+    return {
+        **convert_profile_to_camel_case(profile_dict),
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "firstName": user.first_name,
+            "lastName": user.last_name,
+            "displayName": user.display_name,
+            "profileImageUrl": user.profile_image_url,
+        } if user else None
+    }
+
+
+class LocationUpdate(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
 class ProfileUpdate(BaseModel):
     bio: Optional[str] = None
     niche: Optional[str] = None
@@ -307,6 +334,10 @@ async def update_my_profile(
                     except:
                         pass
             
+            # Preferences may have changed, so queued candidates are scored against stale data
+            deck_store.invalidate(current_user.id)
+            # Author cards in cached feed pages may show the old name
+            feed_cache.invalidate(f"user:{current_user.id}")
             logger.info(f"Successfully updated profile for user {current_user.id}")
         except Exception as e:
             logger.error(f"Error in update_profile: {str(e)}", exc_info=True)
@@ -365,6 +396,109 @@ async def update_my_profile(
         )
 
 
+@router.put("/profiles/location")
+async def update_my_location(
+    update: LocationUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update current user's coordinates (coalesced; see location_service)"""
+    pending = get_storage(db).update_profile_location(current_user.id, update.latitude, update.longitude)
+    return {
+        "userId": current_user.id,
+        "latitude": pending.latitude,
+        "longitude": pending.longitude,
+        "locationUpdatedAt": pending.updated_at,
+    }
+
+
+@router.get("/profiles/discover")
+async def discover_profiles(
+    limit: int = Query(20, ge=1, le=100),
+    maxDistance: Optional[float] = None,
+    contentType: Optional[str] = None,
+    experienceLevel: Optional[str] = None,
+    availability: Optional[str] = None,
+    travelMode: Optional[str] = None,
+    monetization: Optional[str] = None,
+    compatibleOnly: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the next discover candidates, best match first
+    
+    Unfiltered requests are served from the user's pre-scored swipe deck;
+    filtered requests are scored on the fly.
+    """
+    filters = {
+        "max_distance": maxDistance,
+        "content_type": contentType,
+        "experience_level": experienceLevel.split(",") if experienceLevel else None,
+        "availability": availability.split(",") if availability else None,
+        "travel_mode": travelMode.split(",") if travelMode else None,
+        "monetization": monetization.split(",") if monetization else None,
+        "compatible_only": compatibleOnly,
+    }
+    if any(filters.values()):
+        scored = rank_candidates(db, current_user.id, filters)[:limit]
+    else:
+        scored = take_from_deck(db, current_user.id, limit)
+    
+    shown_ids = [profile.user_id for profile, _ in scored]
+    record_impressions(current_user.id, shown_ids)
+    deck_store.release_served(current_user.id, shown_ids)
+    
+    return [{**profile_to_response(profile), "matchScore": score} for profile, score in scored]
+
+
+@router.get("/profiles/{profile_id}/also-liked")
+async def get_also_liked_profiles(
+    profile_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """People who liked this creator also liked..."""
+    profile = db.query(Profile).filter(Profile.id == profile_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    neighbors = get_also_liked(db, profile.user_id, limit)
+    scores = {n.neighbor_id: n.score for n in neighbors}
+    profiles = db.query(Profile)\
+        .options(joinedload(Profile.user))\
+        .filter(Profile.user_id.in_(list(scores)))\
+        .filter(Profile.is_visible == True)\
+        .all()
+    profiles.sort(key=lambda p: scores[p.user_id], reverse=True)
+    
+    return [{**profile_to_response(p), "similarity": round(scores[p.user_id], 4)} for p in profiles]
+
+
+@router.get("/profiles/{profile_id}/similar")
+async def get_similar_creators(
+    profile_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Creators like this one, by bio / niche / content style / tags similarity"""
+    profile = db.query(Profile).filter(Profile.id == profile_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    scores = dict(text_index.similar(profile.user_id, limit))
+    if not scores:
+        return []
+    profiles = db.query(Profile)\
+        .options(joinedload(Profile.user))\
+        .filter(Profile.user_id.in_(list(scores)))\
+        .all()
+    profiles.sort(key=lambda p: scores[p.user_id], reverse=True)
+    
+    return [{**profile_to_response(p), "similarity": round(scores[p.user_id], 4)} for p in profiles]
+
+
 @router.get("/profiles/{profile_id}")
 async def get_profile(
     profile_id: int,
@@ -0,0 +1,55 @@
+"""
+Search routes (full-text search over forum posts and replies)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.middleware.auth import get_current_user_id
+from app.models.community import ForumPost
+from app.services.feed_service import post_card_query, build_post_cards
+from app.services.search_service import search_posts, render_highlight
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("/posts")
+async def search_forum_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db),
+    request: Request = None
+):
+    """Search posts and replies, best matches first"""
+    viewer_id = None
+    try:
+        if request:
+            viewer_id = get_current_user_id(request, db)
+    except:
+        pass  # User not authenticated, continue without user
+    try:
+        hits = search_posts(db, q, limit, offset)
+
+        # Cards for every post on the page in one joined query
+        rows = post_card_query(db).filter(ForumPost.id.in_({hit.post_id for hit in hits})).all()
+        cards = {card["id"]: card for card in build_post_cards(db, rows, viewer_id)}
+
+        results = [
+            {
+                "post": cards[hit.post_id],
+                "replyId": hit.reply_id,
+                "score": hit.score,
+                "highlight": {
+                    "title": render_highlight(hit.title),
+                    "snippet": render_highlight(hit.snippet)
+                }
+            }
+            for hit in hits
+            if hit.post_id in cards
+        ]
+        return {
+            "results": results,
+            "nextOffset": offset + limit if len(hits) == limit else None
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search posts: {str(e)}")
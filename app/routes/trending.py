@@ -0,0 +1,18 @@
+"""
+Trending routes (hashtags)
+"""
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.config import settings
+from app.services.hashtag_service import trending_tags
+
+router = APIRouter(prefix="/trending", tags=["trending"])
+
+
+@router.get("/tags")
+async def get_trending_tags(
+    limit: int = Query(10, ge=1, le=50),
+    hours: Optional[int] = Query(None, ge=1, le=settings.TRENDING_TAGS_WINDOW_HOURS)
+):
+    """Get the most used hashtags over the last `hours` (default: the whole window)"""
+    return trending_tags.top(limit, hours)
@@ -0,0 +1,266 @@
+"""
+Blocked terms service - scans text for banned phrases with one Aho-Corasick pass
+
+The term list (BLOCKED_TERMS_PATH, default app/data/blocked_terms.txt) is
+compiled into an Aho-Corasick automaton. Scanning a text then costs one
+dictionary lookup per character, however many phrases the list has. Scanning
+with one regex per phrase would cost one pass per phrase. Text and phrases
+are normalized the same way: NFKC, casefolded, and runs of punctuation and
+whitespace turned into single spaces. Every phrase is padded with spaces, so
+only whole words match.
+
+The list's modification time is checked at most every
+BLOCKED_TERMS_RELOAD_SECONDS. An edited list is recompiled and swapped in
+without a restart. A list that fails to load leaves the previous automaton
+in place.
+
+    python -m app.services.blocked_terms_service benchmark --terms 500
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TERMS_PATH = Path(__file__).resolve().parent.parent / "data" / "blocked_terms.txt"
+
+BLOCK = "block"
+REJECT = "reject"
+FLAG = "flag"
+ACTIONS = (BLOCK, REJECT, FLAG)
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_ALTERNATIVES = re.compile(r"\{([^{}]*)\}")
+
+
+def normalize(text: str) -> str:
+    """Casefolded words separated (and surrounded) by single spaces"""
+    return f" {_NON_WORD.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()} "
+
+
+class Term(NamedTuple):
+    action: str
+    category: str
+    phrase: str
+
+
+def expand(phrase: str) -> List[str]:
+    """Every phrase "{a|b} c" stands for: ["a c", "b c"]"""
+    parts = _ALTERNATIVES.split(phrase)
+    # Odd parts are the insides of braces
+    choices = [part.split("|") if i % 2 else [part] for i, part in enumerate(parts)]
+    return ["".join(combination) for combination in itertools.product(*choices)]
+
+
+def parse_terms(lines: Iterable[str]) -> List[Term]:
+    terms: List[Term] = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split(None, 2)
+        if len(fields) != 3 or fields[0] not in ACTIONS:
+            raise ValueError(f"line {number}: expected '<{'|'.join(ACTIONS)}> <category> <phrase>'")
+        action, category, phrase = fields
+        terms.extend(Term(action, category, expanded) for expanded in expand(phrase))
+    return terms
+
+
+class AhoCorasick:
+    """Automaton finding every pattern occurring in a text in one pass
+
+    Failure links are folded into the transition table (each state's
+    transitions include those of its failure state), so a scan never backs
+    up. Characters no pattern uses send the scan back to the root.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append(())
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state] += (index,)
+
+        # Breadth-first, so a state's failure state is finished before the state itself
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [goto[0]] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                outputs[child] += outputs[fail[child]]
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = outputs
+        self.pattern_count = len(patterns)
+        self.state_count = len(goto)
+
+    def search(self, text: str) -> Set[int]:
+        """Indices of the patterns that occur in the text"""
+        delta, outputs = self._delta, self._outputs
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class CompiledTerms:
+    """A term list and its automaton"""
+
+    def __init__(self, terms: Sequence[Term]):
+        # Duplicate phrases keep their first entry
+        by_phrase: Dict[str, Term] = {}
+        for term in terms:
+            phrase = normalize(term.phrase)
+            if phrase.strip():
+                by_phrase.setdefault(phrase, term)
+        self.terms = list(by_phrase.values())
+        self.automaton = AhoCorasick(list(by_phrase))
+
+    def scan(self, *texts: Optional[str]) -> List[Term]:
+        found: Set[int] = set()
+        for value in texts:
+            if value:
+                found |= self.automaton.search(normalize(value))
+        return [self.terms[index] for index in sorted(found)]
+
+
+class BlockedTerms:
+    """The current compiled term list, reloaded when its file changes"""
+
+    def __init__(self):
+        self._compiled: Optional[CompiledTerms] = None
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path() -> Path:
+        return Path(settings.BLOCKED_TERMS_PATH) if settings.BLOCKED_TERMS_PATH else DEFAULT_TERMS_PATH
+
+    def _current(self) -> CompiledTerms:
+        compiled = self._compiled
+        if compiled is not None and time.monotonic() - self._checked_at < settings.BLOCKED_TERMS_RELOAD_SECONDS:
+            return compiled
+        with self._lock:
+            if self._compiled is None or time.monotonic() - self._checked_at >= settings.BLOCKED_TERMS_RELOAD_SECONDS:
+                self._reload_locked()
+            return self._compiled
+
+    def _reload_locked(self, force: bool = False):
+        self._checked_at = time.monotonic()
+        path = self.path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if not force and self._compiled is not None and mtime == self._mtime:
+                return
+            with open(path, encoding="utf-8") as f:
+                compiled = CompiledTerms(parse_terms(f))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load blocked terms from {path}: {str(e)}")
+            if self._compiled is None:
+                self._compiled = CompiledTerms([])
+            return
+        self._compiled, self._mtime = compiled, mtime
+        logger.info(f"Loaded {len(compiled.terms)} blocked terms ({compiled.automaton.state_count} states)")
+
+    def reload(self) -> int:
+        """Recompile the list now; returns how many phrases it has"""
+        with self._lock:
+            self._reload_locked(force=True)
+            return len(self._compiled.terms)
+
+    def scan(self, *texts: Optional[str]) -> List[Term]:
+        """Every listed phrase found in the texts"""
+        return self._current().scan(*texts)
+
+
+blocked_terms = BlockedTerms()
+
+
+def _benchmark(term_count: int, text_count: int, words_per_text: int, seed: int):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = ["".join(rng.choices(alphabet, k=rng.randint(3, 9))) for _ in range(5000)]
+    with open(blocked_terms.path(), encoding="utf-8") as f:
+        terms = parse_terms(f)
+    while len(terms) < term_count:
+        phrase = " ".join(rng.sample(vocabulary, rng.randint(1, 3)))
+        terms.append(Term(FLAG, "synthetic", phrase))
+    terms = terms[:term_count]
+    texts = []
+    for _ in range(text_count):
+        words = rng.choices(vocabulary, k=words_per_text)
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), rng.choice(terms).phrase)
+        texts.append(" ".join(words))
+
+    started = time.perf_counter()
+    compiled = CompiledTerms(terms)
+    build_seconds = time.perf_counter() - started
+
+    # The naive approach: one regex per phrase, each run over the whole (normalized) text
+    naive = [(term, re.compile(re.escape(normalize(term.phrase)))) for term in compiled.terms]
+
+    started = time.perf_counter()
+    automaton_hits = [compiled.scan(text) for text in texts]
+    automaton_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    naive_hits = []
+    for text in texts:
+        normalized = normalize(text)
+        naive_hits.append([term for term, pattern in naive if pattern.search(normalized)])
+    naive_seconds = time.perf_counter() - started
+
+    mismatches = sum(set(a) != set(b) for a, b in zip(automaton_hits, naive_hits))
+    logger.info(
+        f"{len(compiled.terms)} phrases ({compiled.automaton.state_count} states, built in {build_seconds * 1000:.0f} ms), "
+        f"{text_count} texts of {words_per_text} words, {sum(map(bool, automaton_hits))} with hits"
+    )
+    logger.info(f"aho-corasick: {automaton_seconds / text_count * 1e6:.0f} us/text")
+    logger.info(f"regex per phrase: {naive_seconds / text_count * 1e6:.0f} us/text")
+    logger.info(f"speedup {naive_seconds / automaton_seconds:.1f}x, {mismatches} texts with different matches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blocked-term matcher tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    bench = subcommands.add_parser("benchmark", help="time the automaton against one regex per phrase")
+    bench.add_argument("--terms", type=int, default=500)
+    bench.add_argument("--texts", type=int, default=2000)
+    bench.add_argument("--words", type=int, default=80, help="words per text")
+    bench.add_argument("--seed", type=int, default=1)
+    subcommands.add_parser("check", help="compile the term list and report its size")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    if args.command == "benchmark":
+        _benchmark(args.terms, args.texts, args.words, args.seed)
+    else:
+        logger.info(f"{blocked_terms.reload()} phrases in {blocked_terms.path()}")
+
+
+if __name__ == "__main__":
+    main()
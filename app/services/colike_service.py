@@ -0,0 +1,211 @@
+"""
+Co-like service - item-item collaborative filtering over the likes graph
+
+Treats `likes` as an implicit-feedback matrix (liker x liked) and computes
+cosine similarity between liked profiles from their shared likers. Results go
+to `profile_neighbors` and feed the "people who liked X also liked" signal.
+
+Runs are incremental. A new like of profile i changes i's co-like counts
+and also i's norm, so every score against i changes. Only profiles co-liked
+with a profile that got likes since the stored checkpoint are recomputed.
+A new like of a very popular profile can therefore cost close to a full
+rebuild. Run from the CLI:
+
+    python -m app.services.colike_service          # incremental
+    python -m app.services.colike_service --full   # rebuild everything
+"""
+import argparse
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import JobCheckpoint, Like, ProfileNeighbor
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "colike_neighbors"
+CHUNK_SIZE = 500
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _likes_where(db: Session, column, ids: Set[str]) -> List[tuple]:
+    """Fetch (liker_id, liked_id) pairs where `column` is in `ids`, in chunks"""
+    pairs = []
+    for chunk in _chunks(list(ids)):
+        pairs.extend(db.query(Like.liker_id, Like.liked_id).filter(column.in_(chunk)).all())
+    return pairs
+
+
+def _like_counts(db: Session, liked_ids: Set[str]) -> Dict[str, int]:
+    counts = {}
+    for chunk in _chunks(list(liked_ids)):
+        counts.update(
+            db.query(Like.liked_id, func.count(func.distinct(Like.liker_id)))
+            .filter(Like.liked_id.in_(chunk))
+            .group_by(Like.liked_id)
+            .all()
+        )
+    return counts
+
+
+def compute_neighbors(
+    pairs: List[tuple],
+    targets: Set[str],
+    like_counts: Dict[str, int],
+    top_k: int,
+    min_co_likes: int
+) -> Dict[str, List[tuple]]:
+    """Top-k cosine neighbors for each target profile
+
+    `pairs` must contain every like of every liker who liked a target, so the
+    co-like counts for the target rows are exact. Returns
+    {target_id: [(neighbor_id, score, co_likes), ...]} best first.
+    """
+    likers = sorted({liker for liker, _ in pairs})
+    items = sorted({liked for _, liked in pairs})
+    liker_index = {u: i for i, u in enumerate(likers)}
+    item_index = {u: i for i, u in enumerate(items)}
+
+    rows = np.fromiter((liker_index[liker] for liker, _ in pairs), dtype=np.int64, count=len(pairs))
+    cols = np.fromiter((item_index[liked] for _, liked in pairs), dtype=np.int64, count=len(pairs))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, cols)),
+        shape=(len(likers), len(items))
+    )
+    matrix.data[:] = 1  # duplicate likes count once
+
+    target_ids = [t for t in sorted(targets) if t in item_index]
+    if not target_ids:
+        return {}
+    target_cols = np.array([item_index[t] for t in target_ids])
+
+    # co_likes[t, j] = number of users who liked both target t and item j
+    co_likes = (matrix[:, target_cols].T @ matrix).tocsr()
+    norms = np.sqrt(np.array([like_counts.get(item, 0) for item in items], dtype=np.float64))
+
+    result = {}
+    for row, target_id in enumerate(target_ids):
+        start, end = co_likes.indptr[row], co_likes.indptr[row + 1]
+        cols_j = co_likes.indices[start:end]
+        counts = co_likes.data[start:end]
+        keep = (cols_j != item_index[target_id]) & (counts >= min_co_likes) & (norms[cols_j] > 0)
+        cols_j, counts = cols_j[keep], counts[keep]
+        if len(cols_j) == 0 or norms[item_index[target_id]] == 0:
+            result[target_id] = []
+            continue
+        scores = counts / (norms[item_index[target_id]] * norms[cols_j])
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        result[target_id] = [(items[cols_j[i]], float(scores[i]), int(counts[i])) for i in best]
+    return result
+
+
+def _write_neighbors(db: Session, neighbors: Dict[str, List[tuple]]):
+    """Replace the stored neighbor lists of the given profiles"""
+    for chunk in _chunks(list(neighbors)):
+        db.query(ProfileNeighbor).filter(ProfileNeighbor.user_id.in_(chunk)).delete(synchronize_session=False)
+    db.bulk_insert_mappings(ProfileNeighbor, [
+        {"user_id": user_id, "neighbor_id": neighbor_id, "score": score, "co_likes": co_count}
+        for user_id, rows in neighbors.items()
+        for neighbor_id, score, co_count in rows
+    ])
+
+
+def run_colike_pipeline(db: Session, full: bool = False) -> int:
+    """Recompute neighbors touched by likes since the last run; returns how many profiles were updated"""
+    checkpoint = db.query(JobCheckpoint).filter(JobCheckpoint.name == CHECKPOINT_NAME).first()
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=CHECKPOINT_NAME, last_id=0)
+        db.add(checkpoint)
+    since_id = 0 if full else checkpoint.last_id
+
+    max_id = db.query(func.max(Like.id)).scalar() or 0
+    if max_id <= since_id:
+        return 0
+
+    if full:
+        db.query(ProfileNeighbor).delete(synchronize_session=False)
+
+    # A new like (u, i) changes co-like counts between i and everything else u
+    # liked, and i's norm, which is in i's score against everything co-liked with i
+    liked_since = {
+        liked for (liked,) in
+        db.query(Like.liked_id).filter(Like.id > since_id, Like.id <= max_id).distinct().all()
+    }
+    their_likers = {liker for liker, _ in _likes_where(db, Like.liked_id, liked_since)}
+    targets = {liked for _, liked in _likes_where(db, Like.liker_id, their_likers)}
+
+    # Every like of every user who liked a target, so target rows are exact
+    target_likers = {liker for liker, _ in _likes_where(db, Like.liked_id, targets)}
+    pairs = _likes_where(db, Like.liker_id, target_likers)
+    like_counts = _like_counts(db, {liked for _, liked in pairs})
+
+    neighbors = compute_neighbors(
+        pairs, targets, like_counts,
+        top_k=settings.COLIKE_TOP_K,
+        min_co_likes=settings.COLIKE_MIN_CO_LIKES
+    )
+    _write_neighbors(db, neighbors)
+    checkpoint.last_id = max_id
+    db.commit()
+    return len(neighbors)
+
+
+def get_colike_signal(db: Session, user_id: str, recent_likes: int = 50) -> Dict[str, float]:
+    """Sum of neighbor similarity to the user's recent likes, per candidate"""
+    liked_ids = [
+        liked_id for (liked_id,) in
+        db.query(Like.liked_id)
+        .filter(Like.liker_id == user_id)
+        .order_by(Like.id.desc())
+        .limit(recent_likes)
+        .all()
+    ]
+    if not liked_ids:
+        return {}
+    signal: Dict[str, float] = defaultdict(float)
+    for neighbor_id, score in db.query(ProfileNeighbor.neighbor_id, ProfileNeighbor.score)\
+            .filter(ProfileNeighbor.user_id.in_(liked_ids)).all():
+        signal[neighbor_id] += score
+    return signal
+
+
+def get_also_liked(db: Session, user_id: str, limit: int) -> List[ProfileNeighbor]:
+    """People who liked this user also liked..."""
+    return db.query(ProfileNeighbor)\
+        .filter(ProfileNeighbor.user_id == user_id)\
+        .order_by(ProfileNeighbor.score.desc())\
+        .limit(limit)\
+        .all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild co-like profile neighbors")
+    parser.add_argument("--full", action="store_true", help="recompute from all likes instead of new ones")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    db = SessionLocal()
+    try:
+        updated = run_colike_pipeline(db, full=args.full)
+        logger.info(f"Updated neighbors for {updated} profiles")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
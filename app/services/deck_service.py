@@ -0,0 +1,228 @@
+"""
+Swipe deck service - pre-scored discover queues per recently active user
+
+Each deck holds the next candidate user IDs (with their match score) so a
+discover request only pops from a ready list. A background loop refills decks
+that dropped below the low watermark and evicts decks of dormant users.
+
+Served candidates are remembered per deck until their impression is
+recorded (`release_served`), so a refill in between doesn't queue them again.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Block, Profile
+from app.services.storage_service import get_storage
+from app.services.impression_service import load_impressions
+from app.services.colike_service import get_colike_signal
+
+logger = logging.getLogger(__name__)
+
+
+class SwipeDeck:
+    """Queue of (candidate user ID, match score) for one user"""
+
+    def __init__(self):
+        self.queue: Deque[Tuple[str, int]] = deque()
+        # Taken from the queue, impression not recorded yet
+        self.served: Set[str] = set()
+        self.last_access = time.monotonic()
+        # Bumped on invalidation so an in-flight refill built from stale data is dropped
+        self.generation = 0
+
+
+class DeckStore:
+    """In-process store of swipe decks, guarded by a single lock"""
+
+    def __init__(self):
+        self._decks: Dict[str, SwipeDeck] = {}
+        self._pending_refill: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def touch(self, user_id: str):
+        """Create the user's deck if needed and mark it recently used"""
+        with self._lock:
+            self._decks.setdefault(user_id, SwipeDeck()).last_access = time.monotonic()
+
+    def take(self, user_id: str, count: int) -> List[Tuple[str, int]]:
+        """Atomically pop up to `count` candidates from the front of a user's deck"""
+        with self._lock:
+            deck = self._decks.setdefault(user_id, SwipeDeck())
+            deck.last_access = time.monotonic()
+            taken = []
+            while deck.queue and len(taken) < count:
+                taken.append(deck.queue.popleft())
+            deck.served.update(candidate_id for candidate_id, _ in taken)
+            if len(deck.queue) < settings.DECK_LOW_WATERMARK:
+                self._pending_refill.add(user_id)
+            return taken
+
+    def size(self, user_id: str) -> int:
+        with self._lock:
+            deck = self._decks.get(user_id)
+            return len(deck.queue) if deck else 0
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            deck = self._decks.get(user_id)
+            return deck.generation if deck else 0
+
+    def fill(self, user_id: str, candidates: List[Tuple[str, int]], generation: int) -> int:
+        """Append scored candidates not already queued or served, up to DECK_SIZE; returns how many were added"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is None or deck.generation != generation:
+                return 0
+            queued = {candidate_id for candidate_id, _ in deck.queue} | deck.served
+            added = 0
+            for candidate_id, score in candidates:
+                if len(deck.queue) >= settings.DECK_SIZE:
+                    break
+                if candidate_id in queued:
+                    continue
+                deck.queue.append((candidate_id, score))
+                queued.add(candidate_id)
+                added += 1
+            return added
+
+    def release_served(self, user_id: str, candidate_ids: List[str]):
+        """Forget served candidates once their impressions are recorded (the filter hides them from then on)"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is not None:
+                deck.served.difference_update(candidate_ids)
+
+    def invalidate(self, user_id: str):
+        """Drop a user's queued candidates (e.g. after their preferences changed)"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is not None:
+                deck.queue.clear()
+                deck.generation += 1
+                self._pending_refill.add(user_id)
+
+    def discard_candidate(self, user_id: str, candidate_id: str):
+        """Remove one candidate from a user's deck (e.g. after a block)"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is not None:
+                deck.queue = deque(item for item in deck.queue if item[0] != candidate_id)
+
+    def drain_pending_refills(self) -> List[str]:
+        with self._lock:
+            pending = [user_id for user_id in self._pending_refill if user_id in self._decks]
+            self._pending_refill.clear()
+            return pending
+
+    def evict_dormant(self, idle_seconds: int) -> int:
+        """Drop decks not read for `idle_seconds`; returns how many were evicted"""
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            dormant = [user_id for user_id, deck in self._decks.items() if deck.last_access < cutoff]
+            for user_id in dormant:
+                del self._decks[user_id]
+                self._pending_refill.discard(user_id)
+            return len(dormant)
+
+
+deck_store = DeckStore()
+
+
+def rank_candidates(
+    db: Session,
+    user_id: str,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Tuple[Profile, int]]:
+    """Discover candidates in serving order, with recently shown profiles removed
+    
+    The match score is returned unchanged; the co-like signal only affects order.
+    """
+    scored = get_storage(db).get_discover_profiles(user_id, filters)
+    seen = load_impressions(db, user_id)
+    colike = get_colike_signal(db, user_id)
+    unseen = [(profile, score) for profile, score in scored if profile.user_id not in seen]
+    unseen.sort(
+        key=lambda item: item[1] + settings.COLIKE_RANK_WEIGHT * min(colike.get(item[0].user_id, 0.0), 1.0),
+        reverse=True
+    )
+    return unseen
+
+
+def refill_deck(db: Session, user_id: str) -> int:
+    """Score candidates for a user and top their deck up to DECK_SIZE"""
+    generation = deck_store.generation(user_id)
+    candidates = [(profile.user_id, score) for profile, score in rank_candidates(db, user_id)]
+    return deck_store.fill(user_id, candidates, generation)
+
+
+def take_from_deck(db: Session, user_id: str, count: int) -> List[Tuple[Profile, int]]:
+    """Serve the next `count` discover candidates for a user from their deck"""
+    if deck_store.size(user_id) < count:
+        # Cold or nearly empty deck: build it inline so this request isn't short-changed
+        deck_store.touch(user_id)
+        refill_deck(db, user_id)
+
+    taken = deck_store.take(user_id, count)
+    if not taken:
+        return []
+
+    candidate_ids = [candidate_id for candidate_id, _ in taken]
+    profiles = db.query(Profile)\
+        .options(joinedload(Profile.user))\
+        .filter(Profile.user_id.in_(candidate_ids))\
+        .filter(Profile.is_visible == True)\
+        .all()
+
+    # Blocks created after the deck was built
+    blocked_ids = set()
+    for blocker_id, blocked_id in db.query(Block.blocker_id, Block.blocked_id).filter(
+        or_(
+            and_(Block.blocker_id == user_id, Block.blocked_id.in_(candidate_ids)),
+            and_(Block.blocked_id == user_id, Block.blocker_id.in_(candidate_ids)),
+        )
+    ).all():
+        blocked_ids.add(blocked_id if blocker_id == user_id else blocker_id)
+
+    by_user_id = {p.user_id: p for p in profiles}
+    return [
+        (by_user_id[candidate_id], score)
+        for candidate_id, score in taken
+        if candidate_id in by_user_id and candidate_id not in blocked_ids
+    ]
+
+
+def refill_pending_decks() -> int:
+    """Refill every deck that dropped below the low watermark"""
+    refilled = 0
+    for user_id in deck_store.drain_pending_refills():
+        db = SessionLocal()
+        try:
+            refill_deck(db, user_id)
+            refilled += 1
+        except Exception as e:
+            logger.warning(f"Failed to refill swipe deck for user {user_id}: {str(e)}")
+        finally:
+            db.close()
+    return refilled
+
+
+async def run_deck_refill_loop():
+    """Background task: refill low decks and evict dormant ones"""
+    while True:
+        await asyncio.sleep(settings.DECK_REFILL_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(refill_pending_decks)
+            evicted = deck_store.evict_dormant(settings.DECK_IDLE_TTL_SECONDS)
+            if evicted:
+                logger.info(f"Evicted {evicted} dormant swipe decks")
+        except Exception as e:
+            logger.warning(f"Swipe deck refill loop error: {str(e)}")
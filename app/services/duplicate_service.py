@@ -0,0 +1,206 @@
+"""
+Duplicate service - near-duplicate detection for new posts and replies
+
+Each text is cut into overlapping SHINGLE_WORDS-word shingles and reduced
+to a MinHash signature of NUM_BANDS * ROWS_PER_BAND values. Two signatures
+agree in a position with probability equal to the Jaccard similarity of
+their shingle sets. Signatures are split into bands, and each band is
+hashed into an in-memory LSH bucket. Only texts sharing at least one bucket
+are compared. A write therefore costs NUM_BANDS dictionary lookups, however
+many recent texts there are.
+
+Texts stay indexed for DUPLICATE_WINDOW_MINUTES (and at most
+DUPLICATE_MAX_ENTRIES texts), oldest evicted first. A new text whose
+estimated similarity to an indexed one reaches DUPLICATE_SIMILARITY is a
+suspected duplicate. It is stored flagged for moderation. An author with
+DUPLICATE_THROTTLE_COUNT near-copies of their own in the window is
+throttled instead. Texts under DUPLICATE_MIN_WORDS words ("thanks!",
+"+1") are not checked. Anonymous posts and replies are indexed without an
+author, as they are stored, so they count as near-duplicates but never
+towards anyone's own copies, whether indexed live or at startup.
+
+The index is per process and rebuilt from recent posts and replies at
+startup.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.community import ForumPost, PostReply
+
+SHINGLE_WORDS = 3
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+
+# Universal hashing (a*x + b) mod p over 32-bit shingle hashes; a and b stay
+# below 2^32, so a*x + b never overflows uint64
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64((1 << 32) - 1)
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 1 << 32, size=NUM_HASHES, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, 1 << 32, size=NUM_HASHES, dtype=np.uint64)[:, None]
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(*texts: Optional[str]) -> List[str]:
+    return [word for value in texts if value for word in _WORD.findall(value.casefold())]
+
+
+def shingles(words: List[str]) -> Set[str]:
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(shingle_set: Set[str]) -> np.ndarray:
+    """NUM_HASHES minimum hash values over the shingles"""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+         for shingle in shingle_set),
+        dtype=np.uint64, count=len(shingle_set)
+    )
+    return (((_A * hashes[None, :] + _B) % _PRIME) & _MASK).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / NUM_HASHES
+
+
+class DuplicateCheck(NamedTuple):
+    # None for texts too short to check
+    signature: Optional[np.ndarray]
+    # Near-duplicates in the window, and how many of them are by the same author
+    similar: int
+    similar_own: int
+
+    @property
+    def suspected(self) -> bool:
+        return self.similar > 0
+
+    @property
+    def throttled(self) -> bool:
+        return self.similar_own >= settings.DUPLICATE_THROTTLE_COUNT
+
+
+class _Entry(NamedTuple):
+    signature: np.ndarray
+    author_id: Optional[str]
+    at: float
+    keys: Tuple[Tuple[int, bytes], ...]
+
+
+class NearDuplicateIndex:
+    """LSH buckets of recent signatures with time-based eviction"""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, bytes], Set[int]] = {}
+        self._entries: Dict[int, _Entry] = {}
+        self._order: Deque[int] = deque()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(signature: np.ndarray) -> Tuple[Tuple[int, bytes], ...]:
+        return tuple(
+            (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(NUM_BANDS)
+        )
+
+    def _evict_locked(self, now: float):
+        cutoff = now - settings.DUPLICATE_WINDOW_MINUTES * 60
+        while self._order and (
+            self._entries[self._order[0]].at < cutoff or len(self._order) > settings.DUPLICATE_MAX_ENTRIES
+        ):
+            entry_id = self._order.popleft()
+            for key in self._entries.pop(entry_id).keys:
+                bucket = self._buckets[key]
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def similar(self, signature: np.ndarray, author_id: Optional[str]) -> Tuple[int, int]:
+        """(near-duplicates, near-duplicates by author_id) of a signature"""
+        with self._lock:
+            self._evict_locked(time.time())
+            candidates: Set[int] = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            matches = [
+                self._entries[entry_id] for entry_id in candidates
+                if similarity(signature, self._entries[entry_id].signature) >= settings.DUPLICATE_SIMILARITY
+            ]
+        return len(matches), sum(1 for entry in matches if author_id and entry.author_id == author_id)
+
+    def add(self, signature: np.ndarray, author_id: Optional[str], at: Optional[float] = None):
+        at = time.time() if at is None else at
+        keys = self._band_keys(signature)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(signature, author_id, at, keys)
+            self._order.append(entry_id)
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+            self._evict_locked(time.time())
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self._entries.clear()
+            self._order.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+near_duplicates = NearDuplicateIndex()
+
+
+def _signature(*texts: Optional[str]) -> Optional[np.ndarray]:
+    words = _words(*texts)
+    if len(words) < settings.DUPLICATE_MIN_WORDS:
+        return None
+    return minhash(shingles(words))
+
+
+def check_duplicate(author_id: Optional[str], *texts: Optional[str]) -> DuplicateCheck:
+    """How many recent posts and replies the texts nearly duplicate"""
+    signature = _signature(*texts)
+    if signature is None:
+        return DuplicateCheck(None, 0, 0)
+    similar, similar_own = near_duplicates.similar(signature, author_id)
+    return DuplicateCheck(signature, similar, similar_own)
+
+
+def record_content(check: DuplicateCheck, author_id: Optional[str]):
+    """Index a stored post or reply, once committed; `author_id` is the stored one (None if anonymous)"""
+    if check.signature is not None:
+        near_duplicates.add(check.signature, author_id)
+
+
+def load_recent_content(db: Session) -> int:
+    """Index posts and replies still inside the window; called at startup"""
+    near_duplicates.reset()
+    since = datetime.utcnow() - timedelta(minutes=settings.DUPLICATE_WINDOW_MINUTES)
+    rows = db.query(ForumPost.author_id, ForumPost.created_at, ForumPost.title, ForumPost.content)\
+        .filter(ForumPost.created_at >= since).all()
+    rows += db.query(PostReply.author_id, PostReply.created_at, PostReply.content)\
+        .filter(PostReply.created_at >= since).all()
+    loaded = 0
+    for author_id, created_at, *texts in sorted(rows, key=lambda row: row[1]):
+        signature = _signature(*texts)
+        if signature is not None:
+            near_duplicates.add(signature, author_id, created_at.replace(tzinfo=timezone.utc).timestamp())
+            loaded += 1
+    return loaded
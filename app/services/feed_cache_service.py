@@ -0,0 +1,177 @@
+"""
+Feed cache service - shared cache for the first pages of the global feed
+
+The first FEED_CACHE_PAGES pages are the same for every viewer apart from
+`isLiked`, so each is built once and kept as pre-serialized JSON, one bytes
+chunk per post card. Anonymous requests get the stored body as is;
+authenticated ones flip `isLiked` in the cards they have liked.
+
+Pages are tagged with "feed", "post:<id>" and "user:<author id>". Writes
+invalidate by tag: a new post drops every page, while a like or reply only
+drops the pages showing that post. Only one request rebuilds a missing page;
+while an expired page is being rebuilt, other requests are served the stale
+copy. A page whose build overlapped an invalidation of one of its own tags
+is returned but not stored; invalidations of other tags don't affect it.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Response
+
+from app.config import settings
+
+_LIKED_FALSE = b'"isLiked":false'
+_LIKED_TRUE = b'"isLiked":true'
+
+
+class CachedPage(NamedTuple):
+    cards: List[bytes]
+    post_ids: List[int]
+    next_cursor: Optional[str]
+    body: bytes
+    tags: FrozenSet[str]
+    expires_at: float
+
+
+def _serialize(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def page_tags(cards: List[Dict[str, Any]]) -> Set[str]:
+    tags = {"feed"}
+    for card in cards:
+        tags.add(f"post:{card['id']}")
+        if card.get("author"):
+            tags.add(f"user:{card['author']['id']}")
+    return tags
+
+
+class FeedCache:
+    """Tagged page cache with single-flight rebuilds"""
+
+    def __init__(self):
+        self._pages: Dict[Hashable, CachedPage] = {}
+        self._keys_by_tag: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._rebuild_locks: Dict[Hashable, asyncio.Lock] = {}
+        # Sequence number of the last invalidation of each tag (and of the last
+        # clear), so a page built concurrently isn't stored stale. Only kept
+        # while builds are running.
+        self._sequence = 0
+        self._invalidated_at: Dict[str, int] = {}
+        self._cleared_at = 0
+        self._builds = 0
+        self._lock = threading.Lock()
+
+    def _drop_locked(self, key: Hashable):
+        page = self._pages.pop(key, None)
+        if page is not None:
+            for tag in page.tags:
+                keys = self._keys_by_tag.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_tag[tag]
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            self._sequence += 1
+            for tag in tags:
+                if self._builds:
+                    self._invalidated_at[tag] = self._sequence
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._drop_locked(key)
+
+    def clear(self):
+        with self._lock:
+            self._sequence += 1
+            self._cleared_at = self._sequence
+            self._pages.clear()
+            self._keys_by_tag.clear()
+
+    def _get(self, key: Hashable) -> Optional[CachedPage]:
+        with self._lock:
+            return self._pages.get(key)
+
+    def _start_build(self, key: Hashable) -> Tuple[Optional[CachedPage], int]:
+        """The current page and the sequence number a build started now must be checked against"""
+        with self._lock:
+            self._builds += 1
+            return self._pages.get(key), self._sequence
+
+    def _finish_build(self, key: Hashable, page: Optional[CachedPage], started_at: int):
+        """Store a built page unless one of its tags was invalidated since `started_at`"""
+        with self._lock:
+            self._builds -= 1
+            fresh = page is not None and self._cleared_at <= started_at and all(
+                self._invalidated_at.get(tag, 0) <= started_at for tag in page.tags
+            )
+            if not self._builds:
+                self._invalidated_at.clear()
+            if not fresh:
+                return
+            self._drop_locked(key)
+            self._pages[key] = page
+            for tag in page.tags:
+                self._keys_by_tag[tag].add(key)
+
+    async def get_or_build(
+        self,
+        key: Hashable,
+        build: Callable[[], Tuple[List[Dict[str, Any]], Optional[str]]]
+    ) -> CachedPage:
+        """Cached page for `key`; `build` returns (cards, next_cursor) and runs in a worker thread"""
+        page = self._get(key)
+        if page is not None and page.expires_at > time.monotonic():
+            return page
+        lock = self._rebuild_locks.setdefault(key, asyncio.Lock())
+        if page is not None and lock.locked():
+            return page
+        async with lock:
+            page, started_at = self._start_build(key)
+            built = None
+            try:
+                if page is not None and page.expires_at > time.monotonic():
+                    return page
+                cards, next_cursor = await asyncio.to_thread(build)
+                chunks = [_serialize(card) for card in cards]
+                built = CachedPage(
+                    cards=chunks,
+                    post_ids=[card["id"] for card in cards],
+                    next_cursor=next_cursor,
+                    body=b"[" + b",".join(chunks) + b"]",
+                    tags=frozenset(page_tags(cards)),
+                    expires_at=time.monotonic() + settings.FEED_CACHE_TTL_SECONDS,
+                )
+                return built
+            finally:
+                self._finish_build(key, built, started_at)
+
+
+feed_cache = FeedCache()
+
+
+def is_cacheable_page(limit: int, offset: int, cursor: Optional[str]) -> bool:
+    """Only the first pages, reached by offset or as the first cursor page, are shared"""
+    return not cursor and offset % limit == 0 and offset // limit < settings.FEED_CACHE_PAGES
+
+
+def render_page(page: CachedPage, liked_ids: Set[int], envelope: bool) -> Response:
+    """Response for a cached page with the viewer's liked flags overlaid"""
+    if liked_ids:
+        cards = [
+            card.replace(_LIKED_FALSE, _LIKED_TRUE, 1) if post_id in liked_ids else card
+            for card, post_id in zip(page.cards, page.post_ids)
+        ]
+        posts = b"[" + b",".join(cards) + b"]"
+    else:
+        posts = page.body
+    if envelope:
+        content = b'{"posts":' + posts + b',"next_cursor":' + _serialize(page.next_cursor) + b"}"
+    else:
+        content = posts
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return Response(content=content, media_type="application/json", headers=headers)
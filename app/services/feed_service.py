@@ -0,0 +1,104 @@
+"""
+Feed service - assembles post cards for the community feed endpoints
+
+A page of posts is loaded with its topics and author cards in one joined
+query, and the viewer's liked flags with one IN query, so building a page
+costs the same number of queries whatever its size. Reply counts come from
+the denormalized `forum_posts.replies_count`. Reply threads are paged the
+same way, oldest first, with their authors joined in.
+"""
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+
+from app.models.auth import User
+from app.models.community import ForumPost, ForumTopic, PostLike, PostReply
+from app.services.moderation_service import REJECTED
+
+
+def author_card(author: Optional[User]) -> Optional[Dict[str, Any]]:
+    if author is None:
+        return None
+    return {
+        "id": author.id,
+        "firstName": author.first_name,
+        "lastName": author.last_name,
+        "profileImageUrl": author.profile_image_url
+    }
+
+
+def post_card(
+    post: ForumPost,
+    topic: Optional[ForumTopic],
+    author: Optional[User],
+    is_liked: bool = False
+) -> Dict[str, Any]:
+    """Serialize a post the way the feed endpoints return it"""
+    post_data: Dict[str, Any] = {
+        "id": post.id,
+        "title": post.title,
+        "content": post.content,
+        "authorId": post.author_id,
+        "likesCount": post.likes_count or 0,
+        "repliesCount": post.replies_count or 0,
+        "createdAt": post.created_at.isoformat() if post.created_at else None,
+        "isAnonymous": post.is_anonymous,
+        "isPinned": post.is_pinned,
+        "isLiked": is_liked,
+    }
+    if not post.is_anonymous and author is not None:
+        post_data["author"] = author_card(author)
+    if topic is not None:
+        post_data["topic"] = {
+            "id": topic.id,
+            "name": topic.name
+        }
+    return post_data
+
+
+def post_card_query(db: Session) -> Query:
+    """Visible posts joined with their topic and (non-anonymous) author, for filtering and paging"""
+    return db.query(ForumPost, ForumTopic, User)\
+        .join(ForumTopic, ForumPost.topic_id == ForumTopic.id)\
+        .outerjoin(User, and_(ForumPost.author_id == User.id, ForumPost.is_anonymous == False))\
+        .filter(or_(ForumPost.moderation_status.is_(None), ForumPost.moderation_status != REJECTED))
+
+
+def liked_post_ids(db: Session, user_id: Optional[str], post_ids: List[int]) -> Set[int]:
+    """Which of the given posts the user has liked, in one query"""
+    if not user_id or not post_ids:
+        return set()
+    return {
+        post_id for (post_id,) in
+        db.query(PostLike.post_id)
+        .filter(PostLike.user_id == user_id, PostLike.post_id.in_(post_ids))
+        .all()
+    }
+
+
+def build_post_cards(db: Session, rows: List[tuple], viewer_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Turn (post, topic, author) rows from post_card_query into response cards"""
+    liked = liked_post_ids(db, viewer_id, [post.id for post, _, _ in rows])
+    return [post_card(post, topic, author, post.id in liked) for post, topic, author in rows]
+
+
+def reply_card(reply: PostReply, author: Optional[User]) -> Dict[str, Any]:
+    reply_data: Dict[str, Any] = {
+        "id": reply.id,
+        "content": reply.content,
+        "isAnonymous": reply.is_anonymous,
+        "createdAt": reply.created_at.isoformat() if reply.created_at else None,
+    }
+    if not reply.is_anonymous and author is not None:
+        reply_data["author"] = author_card(author)
+    return reply_data
+
+
+def reply_card_query(db: Session, post_id: int) -> Query:
+    """A post's visible replies joined with their (non-anonymous) author, oldest first"""
+    return db.query(PostReply, User)\
+        .outerjoin(User, and_(PostReply.author_id == User.id, PostReply.is_anonymous == False))\
+        .filter(PostReply.post_id == post_id)\
+        .filter(or_(PostReply.moderation_status.is_(None), PostReply.moderation_status != REJECTED))\
+        .order_by(PostReply.created_at, PostReply.id)
@@ -0,0 +1,31 @@
+"""
+Forum service - forum topic serialization and maintained post counts
+
+`forum_topics.post_count` is kept current by `create_post` in the same
+transaction as the insert, so listing topics needs no COUNT. The serialized
+topic list itself is cached by reference_data_service.
+"""
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.models.community import ForumTopic
+
+
+def topic_to_response(topic: ForumTopic) -> Dict[str, Any]:
+    return {
+        "id": topic.id,
+        "name": topic.name,
+        "description": topic.description,
+        "icon": topic.icon,
+        "createdAt": topic.created_at.isoformat() if topic.created_at else None,
+        "postCount": topic.post_count or 0
+    }
+
+
+def increment_topic_post_count(db: Session, topic_id: int, delta: int = 1):
+    """Adjust the maintained count in the caller's transaction"""
+    db.query(ForumTopic).filter(ForumTopic.id == topic_id).update(
+        {ForumTopic.post_count: ForumTopic.post_count + delta},
+        synchronize_session=False
+    )
@@ -0,0 +1,292 @@
+"""
+Geocoding service - offline resolution of free-text locations to coordinates
+
+Place names from the bundled `app/data/places.tsv` gazetteer are loaded into a
+character trie. A location string such as "Austin, TX" or "based in berlin"
+is normalized, the first (longest) place name at a word boundary wins, and the
+region words after it ("tx", "germany", ...) disambiguate between places
+sharing a name. No network access is needed.
+
+Backfill coordinates for profiles that only have a text location:
+
+    python -m app.services.geocoding_service
+"""
+import argparse
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Profile
+from app.services.map_index_service import map_index
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = Path(__file__).resolve().parent.parent / "data" / "places.tsv"
+
+US_STATES = {
+    "AL": "alabama", "AK": "alaska", "AZ": "arizona", "AR": "arkansas", "CA": "california",
+    "CO": "colorado", "CT": "connecticut", "DE": "delaware", "DC": "district of columbia",
+    "FL": "florida", "GA": "georgia", "HI": "hawaii", "ID": "idaho", "IL": "illinois",
+    "IN": "indiana", "IA": "iowa", "KS": "kansas", "KY": "kentucky", "LA": "louisiana",
+    "ME": "maine", "MD": "maryland", "MA": "massachusetts", "MI": "michigan", "MN": "minnesota",
+    "MS": "mississippi", "MO": "missouri", "MT": "montana", "NE": "nebraska", "NV": "nevada",
+    "NH": "new hampshire", "NJ": "new jersey", "NM": "new mexico", "NY": "new york",
+    "NC": "north carolina", "ND": "north dakota", "OH": "ohio", "OK": "oklahoma", "OR": "oregon",
+    "PA": "pennsylvania", "RI": "rhode island", "SC": "south carolina", "SD": "south dakota",
+    "TN": "tennessee", "TX": "texas", "UT": "utah", "VT": "vermont", "VA": "virginia",
+    "WA": "washington", "WV": "west virginia", "WI": "wisconsin", "WY": "wyoming",
+}
+CA_PROVINCES = {
+    "AB": "alberta", "BC": "british columbia", "MB": "manitoba", "NS": "nova scotia",
+    "ON": "ontario", "QC": "quebec",
+}
+GB_NATIONS = {"ENG": "england", "SCT": "scotland", "WLS": "wales", "NIR": "northern ireland"}
+# Countries with at least one gazetteer entry, with the names people type
+COUNTRY_NAMES = {
+    "US": ("us", "usa", "united states", "united states of america", "america"),
+    "CA": ("canada",), "MX": ("mexico",), "GB": ("uk", "united kingdom", "great britain", "britain"),
+    "IE": ("ireland",), "FR": ("france",), "DE": ("germany", "deutschland"),
+    "NL": ("netherlands", "holland"), "BE": ("belgium",), "LU": ("luxembourg",),
+    "ES": ("spain", "espana"), "PT": ("portugal",), "IT": ("italy", "italia"),
+    "CH": ("switzerland",), "AT": ("austria",), "CZ": ("czechia", "czech republic"),
+    "HU": ("hungary",), "PL": ("poland",), "DK": ("denmark",), "SE": ("sweden",),
+    "NO": ("norway",), "FI": ("finland",), "IS": ("iceland",), "GR": ("greece",),
+    "TR": ("turkey", "turkiye"), "RO": ("romania",), "BG": ("bulgaria",), "RS": ("serbia",),
+    "HR": ("croatia",), "SI": ("slovenia",), "EE": ("estonia",), "LV": ("latvia",),
+    "LT": ("lithuania",), "UA": ("ukraine",), "RU": ("russia",), "IL": ("israel",),
+    "AE": ("uae", "united arab emirates"), "EG": ("egypt",), "ZA": ("south africa",),
+    "KE": ("kenya",), "NG": ("nigeria",), "GH": ("ghana",), "MA": ("morocco",),
+    "JP": ("japan",), "KR": ("south korea", "korea"), "CN": ("china",), "HK": ("hong kong",),
+    "TW": ("taiwan",), "SG": ("singapore",), "TH": ("thailand",), "MY": ("malaysia",),
+    "ID": ("indonesia",), "PH": ("philippines",), "VN": ("vietnam", "viet nam"),
+    "IN": ("india",), "AU": ("australia",), "NZ": ("new zealand",), "BR": ("brazil", "brasil"),
+    "AR": ("argentina",), "CL": ("chile",), "PE": ("peru",), "CO": ("colombia",),
+    "EC": ("ecuador",), "UY": ("uruguay",), "CU": ("cuba",), "PR": ("puerto rico",),
+    "PA": ("panama",), "CR": ("costa rica",),
+}
+ADMIN_NAMES = {"US": US_STATES, "CA": CA_PROVINCES, "GB": GB_NATIONS}
+
+# Words people put around a place name that say nothing about which place it is
+FILLER_WORDS = frozenset("""
+i im am in from near based live living located around the greater area metro region city downtown
+uptown central north south east west northern southern eastern western outside of currently usually
+""".split())
+QUALIFIER_WORDS = frozenset(
+    word
+    for name in [
+        *(name for names in COUNTRY_NAMES.values() for name in names),
+        *(f"{code.lower()} {name}" for admins in ADMIN_NAMES.values() for code, name in admins.items()),
+    ]
+    for word in name.split()
+)
+
+_PUNCTUATION_RE = re.compile(r"[^\w,]+")
+
+
+class Place(NamedTuple):
+    name: str
+    admin1: str
+    country: str
+    latitude: float
+    longitude: float
+    population: int
+
+
+def normalize_location(text: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation (commas are kept as separators)"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower().replace(".", "")
+    text = _PUNCTUATION_RE.sub(" ", text.replace("_", " "))
+    return ", ".join(" ".join(part.split()) for part in text.split(",") if part.strip())
+
+
+class _TrieNode:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.places: List[Place] = []
+
+
+class Gazetteer:
+    """Character trie over normalized place names and aliases"""
+
+    def __init__(self, places: List[Place], aliases: Dict[Place, List[str]]):
+        self._root = _TrieNode()
+        self.size = len(places)
+        for place in places:
+            for name in {normalize_location(place.name), *aliases.get(place, [])}:
+                self._insert(name.replace(",", ""), place)
+
+    def _insert(self, key: str, place: Place):
+        node = self._root
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.places.append(place)
+
+    def _longest_match(self, text: str, start: int) -> Tuple[int, List[Place]]:
+        """Longest place name starting at `start` that ends on a word boundary"""
+        node, end, places = self._root, start, []
+        for i in range(start, len(text)):
+            node = node.children.get(text[i])
+            if node is None:
+                break
+            if node.places and (i + 1 == len(text) or text[i + 1] == " "):
+                end, places = i + 1, node.places
+        return end, places
+
+    def resolve(self, normalized: str) -> Optional[Place]:
+        """Best place for a normalized location string, or None
+
+        The place name must be the first one in its comma-separated segment, with
+        only filler words ("based in", "greater ... area") or region qualifiers
+        ("tx", "germany") around it, so prose like "somewhere nice" stays unresolved.
+        """
+        segments = normalized.split(", ")
+        for index, segment in enumerate(segments):
+            words = segment.split(" ")
+            offset = 0
+            for word_index, word in enumerate(words):
+                end, candidates = self._longest_match(segment, offset)
+                if candidates:
+                    rest = segment[end:].split()
+                    if all(w in FILLER_WORDS or w in QUALIFIER_WORDS for w in rest):
+                        return _pick(candidates, rest + " ".join(segments[index + 1:]).split())
+                    break
+                if word not in FILLER_WORDS:
+                    break
+                offset += len(word) + 1
+        return None
+
+
+def _pick(candidates: List[Place], qualifiers: List[str]) -> Optional[Place]:
+    """Disambiguate places sharing a name by the region words that follow it"""
+    qualifier_text = f" {' '.join(qualifiers)} "
+
+    def qualifier_score(place: Place) -> int:
+        score = 0
+        if any(f" {name} " in qualifier_text for name in COUNTRY_NAMES.get(place.country, ())):
+            score += 1
+        admin_name = ADMIN_NAMES.get(place.country, {}).get(place.admin1)
+        if place.admin1.lower() in qualifiers or (admin_name and f" {admin_name} " in qualifier_text):
+            score += 2
+        return score
+
+    score, _, place = max(
+        ((qualifier_score(place), place.population, place) for place in candidates),
+        key=lambda item: item[:2]
+    )
+    if score == 0 and _names_other_region(qualifiers, qualifier_text):
+        # "Paris, TX" must not resolve to Paris, France
+        return None
+    return place
+
+
+def _names_other_region(qualifiers: List[str], qualifier_text: str) -> bool:
+    for country, names in COUNTRY_NAMES.items():
+        if any(f" {name} " in qualifier_text for name in names):
+            return True
+    for admins in ADMIN_NAMES.values():
+        for code, name in admins.items():
+            if code.lower() in qualifiers or f" {name} " in qualifier_text:
+                return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def get_gazetteer() -> Gazetteer:
+    """Load the bundled dataset once per process"""
+    places, aliases = [], {}
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, alternates, admin1, country, lat, lng, population = line.rstrip("\n").split("\t")
+            place = Place(name, admin1, country, float(lat), float(lng), int(population))
+            places.append(place)
+            aliases[place] = [normalize_location(alt) for alt in alternates.split(",") if alt.strip()]
+    return Gazetteer(places, aliases)
+
+
+@lru_cache(maxsize=settings.GEOCODER_CACHE_SIZE)
+def _geocode_normalized(normalized: str) -> Optional[Place]:
+    return get_gazetteer().resolve(normalized) if normalized else None
+
+
+def geocode(location: Optional[str]) -> Optional[Place]:
+    """Resolve a free-text location to a known place (cached by normalized text)"""
+    return _geocode_normalized(normalize_location(location))
+
+
+def geocode_profile(profile: Profile):
+    """Fill coordinates from the text location when none came from the device"""
+    if profile.location_updated_at is not None:
+        return
+    place = geocode(profile.location)
+    profile.latitude = place.latitude if place else None
+    profile.longitude = place.longitude if place else None
+
+
+def backfill_profile_coordinates(db: Session, batch_size: Optional[int] = None) -> Tuple[int, int]:
+    """Geocode profiles that have a text location but no coordinates
+
+    Scans in primary-key batches and writes each batch with one bulk update.
+    Returns (profiles scanned, profiles geocoded).
+    """
+    batch_size = batch_size or settings.GEOCODER_BACKFILL_BATCH_SIZE
+    last_id, scanned, geocoded = 0, 0, 0
+    while True:
+        rows = db.query(Profile.id, Profile.location, Profile.is_visible)\
+            .filter(Profile.id > last_id)\
+            .filter(Profile.latitude.is_(None), Profile.location.isnot(None))\
+            .filter(func.length(func.trim(Profile.location)) > 0)\
+            .order_by(Profile.id)\
+            .limit(batch_size)\
+            .all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned += len(rows)
+
+        updates = []
+        for row in rows:
+            place = geocode(row.location)
+            if place:
+                updates.append({"id": row.id, "latitude": place.latitude, "longitude": place.longitude})
+        if updates:
+            db.bulk_update_mappings(Profile, updates)
+            db.commit()
+            visible = {row.id for row in rows if row.is_visible is not False}
+            for update in updates:
+                if update["id"] in visible:
+                    map_index.upsert("profiles", update["id"], update["latitude"], update["longitude"])
+        geocoded += len(updates)
+    return scanned, geocoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill profile coordinates from free-text locations")
+    parser.add_argument("--batch-size", type=int, default=None, help="profiles per bulk update")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    db = SessionLocal()
+    try:
+        scanned, geocoded = backfill_profile_coordinates(db, args.batch_size)
+        logger.info(f"Geocoded {geocoded} of {scanned} profiles with a text-only location")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Hashtag service - trending hashtags from a streaming heavy-hitters sketch
+
+Hashtags are pulled from each new post and counted in count-min sketches,
+one per TRENDING_TAGS_BUCKET_MINUTES bucket, over a sliding window of
+TRENDING_TAGS_WINDOW_HOURS. A running sum of the window's buckets answers
+full-window counts. When a bucket slides out of the window, its sketch is
+subtracted from the sum and reused. A min-heap keeps the
+TRENDING_TAGS_CANDIDATES tags with the highest estimates, so
+`/api/trending/tags` never touches the posts table. Memory is fixed by
+these settings, however much content comes in.
+
+Count-min estimates only ever overcount, by at most ~e/width of the window's
+total tag count (with probability 1 - e^-depth).
+"""
+import hashlib
+import heapq
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.community import ForumPost
+
+# "#tag" not glued to a preceding word, "#" or HTML entity (so not "a#b", "##b" or "&#39;")
+HASHTAG_PATTERN = re.compile(r"(?<![\w#&])#(\w{1,64})", re.UNICODE)
+
+
+def extract_hashtags(*texts: Optional[str]) -> List[str]:
+    """Distinct lowercase hashtags in the texts, in order of appearance; numbers alone don't count"""
+    tags: Dict[str, None] = {}
+    for value in texts:
+        for match in HASHTAG_PATTERN.finditer(value or ""):
+            tag = match.group(1).lower()
+            if not tag.isdigit():
+                tags.setdefault(tag, None)
+    return list(tags)
+
+
+class CountMinSketch:
+    """depth x width counters; a key's estimate is its smallest counter"""
+
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def columns(self, key: str) -> np.ndarray:
+        # Double hashing (h1 + i*h2) from one 128-bit digest gives independent-enough rows
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def add(self, columns: np.ndarray, count: int = 1):
+        self.table[self._rows, columns] += count
+
+    def estimate(self, columns: np.ndarray) -> int:
+        return int(self.table[self._rows, columns].min())
+
+
+class TopCandidates:
+    """The `capacity` keys with the highest counts, as a min-heap with lazy updates"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self._heap: List[tuple] = []
+
+    def offer(self, key: str, count: int):
+        if key in self.counts:
+            self.counts[key] = count
+            heapq.heappush(self._heap, (count, key))
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            heapq.heappush(self._heap, (count, key))
+        else:
+            smallest = self._smallest()
+            if count <= smallest[0]:
+                return
+            heapq.heappop(self._heap)
+            del self.counts[smallest[1]]
+            self.counts[key] = count
+            heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.capacity:
+            self.reset(self.counts)
+
+    def _smallest(self) -> tuple:
+        # Drop heap entries left behind by later updates of the same key
+        while self._heap[0][0] != self.counts.get(self._heap[0][1]):
+            heapq.heappop(self._heap)
+        return self._heap[0]
+
+    def reset(self, counts: Dict[str, int]):
+        self.counts = {key: count for key, count in counts.items() if count > 0}
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+
+class TrendingTags:
+    """Sliding-window hashtag counts: a ring of bucket sketches plus their running sum"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configure()
+
+    def _configure(self):
+        self.bucket_seconds = settings.TRENDING_TAGS_BUCKET_MINUTES * 60
+        self.bucket_count = max(1, math.ceil(settings.TRENDING_TAGS_WINDOW_HOURS * 3600 / self.bucket_seconds))
+        width, depth = settings.TRENDING_TAGS_SKETCH_WIDTH, settings.TRENDING_TAGS_SKETCH_DEPTH
+        self._buckets = [CountMinSketch(width, depth) for _ in range(self.bucket_count)]
+        self._bucket_ids: List[Optional[int]] = [None] * self.bucket_count
+        self._window = CountMinSketch(width, depth)
+        self._current: Optional[int] = None
+        self._candidates = TopCandidates(settings.TRENDING_TAGS_CANDIDATES)
+
+    def reset(self):
+        with self._lock:
+            self._configure()
+
+    def _advance_locked(self, bucket_id: int):
+        if self._current is not None and bucket_id <= self._current:
+            return
+        start = bucket_id - self.bucket_count + 1
+        if self._current is not None:
+            start = max(start, self._current + 1)
+        for new_id in range(start, bucket_id + 1):
+            slot = new_id % self.bucket_count
+            if self._bucket_ids[slot] is not None:
+                self._window.table -= self._buckets[slot].table
+                self._buckets[slot].table.fill(0)
+            self._bucket_ids[slot] = new_id
+        self._current = bucket_id
+        # Counts only went down; re-estimate the candidates from the new window
+        self._candidates.reset({
+            tag: self._window.estimate(self._window.columns(tag)) for tag in self._candidates.counts
+        })
+
+    def add(self, tags: Iterable[str], at: Optional[float] = None):
+        at = time.time() if at is None else at
+        bucket_id = int(at // self.bucket_seconds)
+        with self._lock:
+            self._advance_locked(max(bucket_id, self._current or bucket_id))
+            if bucket_id <= self._current - self.bucket_count:
+                return  # Older than the window
+            slot = bucket_id % self.bucket_count
+            for tag in tags:
+                columns = self._window.columns(tag)
+                self._buckets[slot].add(columns)
+                self._window.add(columns)
+                self._candidates.offer(tag, self._window.estimate(columns))
+
+    def top(self, limit: int, hours: Optional[float] = None) -> List[Dict[str, object]]:
+        """Highest-count tags over the last `hours` (default: the whole window)"""
+        with self._lock:
+            self._advance_locked(int(time.time() // self.bucket_seconds))
+            buckets = self.bucket_count
+            if hours is not None:
+                buckets = min(buckets, max(1, math.ceil(hours * 3600 / self.bucket_seconds)))
+            if buckets == self.bucket_count:
+                counts = dict(self._candidates.counts)
+            else:
+                slots = [
+                    (self._current - i) % self.bucket_count for i in range(buckets)
+                    if self._bucket_ids[(self._current - i) % self.bucket_count] == self._current - i
+                ]
+                counts = {tag: self._estimate_over(slots, tag) for tag in self._candidates.counts}
+        ranked = sorted(((count, tag) for tag, count in counts.items() if count > 0), key=lambda item: (-item[0], item[1]))
+        return [{"tag": tag, "count": count} for count, tag in ranked[:limit]]
+
+    def _estimate_over(self, slots: Sequence[int], tag: str) -> int:
+        columns = self._window.columns(tag)
+        rows = np.arange(self._window.depth)
+        return int(sum(self._buckets[slot].table[rows, columns] for slot in slots).min()) if slots else 0
+
+
+trending_tags = TrendingTags()
+
+
+def record_post_hashtags(post: ForumPost) -> List[str]:
+    """Count a new post's hashtags; returns them"""
+    tags = extract_hashtags(post.title, post.content)
+    if tags:
+        trending_tags.add(tags)
+    return tags
+
+
+def load_recent_hashtags(db: Session) -> int:
+    """Count hashtags of posts still inside the window; called at startup"""
+    trending_tags.reset()
+    since = datetime.utcnow() - timedelta(hours=settings.TRENDING_TAGS_WINDOW_HOURS)
+    loaded = 0
+    for title, content, created_at in db.query(ForumPost.title, ForumPost.content, ForumPost.created_at)\
+            .filter(ForumPost.created_at >= since)\
+            .order_by(ForumPost.created_at)\
+            .yield_per(1000):
+        tags = extract_hashtags(title, content)
+        if tags:
+            trending_tags.add(tags, created_at.replace(tzinfo=timezone.utc).timestamp())
+            loaded += 1
+    return loaded
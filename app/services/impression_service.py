@@ -0,0 +1,193 @@
+"""
+Impression service - records which profiles a user was shown in discover
+
+Discover responses push candidate IDs into an in-memory buffer; a background
+loop flushes the buffer into per-user bloom filters stored in the
+`impression_filters` table. Candidate generation uses the filters to suppress
+recently shown profiles (with a tunable false-positive rate).
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ImpressionFilter
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over string keys (double hashing on blake2b)"""
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Optional[bytes] = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """Size a filter to hold `capacity` keys at the given false-positive rate"""
+        num_bits = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))))
+        num_bits = (num_bits + 7) // 8 * 8
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class ImpressionSet:
+    """Read view over a user's current and previous impression generations"""
+
+    def __init__(self, filters: List[BloomFilter], pending: Iterable[str] = ()):
+        self.filters = filters
+        self.pending = set(pending)
+
+    def __contains__(self, candidate_id: str) -> bool:
+        return candidate_id in self.pending or any(candidate_id in f for f in self.filters)
+
+
+# user_id -> candidate IDs shown since the last flush
+_pending_impressions: Dict[str, Set[str]] = {}
+# Batch taken by a flush that hasn't committed yet; still read by _pending_for
+_flushing_impressions: Dict[str, Set[str]] = {}
+_pending_lock = threading.Lock()
+
+
+def record_impressions(user_id: str, candidate_ids: Iterable[str]):
+    """Buffer profiles shown to a user; persisted by the next flush"""
+    candidate_ids = list(candidate_ids)
+    if not candidate_ids:
+        return
+    with _pending_lock:
+        _pending_impressions.setdefault(user_id, set()).update(candidate_ids)
+
+
+def _pending_for(user_id: str) -> Set[str]:
+    with _pending_lock:
+        return set(_pending_impressions.get(user_id, ())) | _flushing_impressions.get(user_id, set())
+
+
+def _filters_from_row(row: ImpressionFilter) -> List[BloomFilter]:
+    filters = [BloomFilter(len(row.bits) * 8, row.num_hashes, row.bits)]
+    if row.previous_bits:
+        filters.append(BloomFilter(len(row.previous_bits) * 8, row.previous_num_hashes, row.previous_bits))
+    return filters
+
+
+def load_impressions(db: Session, user_id: str) -> ImpressionSet:
+    """Get the set of profiles recently shown to a user (persisted + not yet flushed)"""
+    row = db.query(ImpressionFilter).filter(ImpressionFilter.user_id == user_id).first()
+    return ImpressionSet(_filters_from_row(row) if row else [], _pending_for(user_id))
+
+
+def _next_capacity(item_count: int, started_at: Optional[datetime], now: datetime) -> int:
+    """Size the next generation to hold one impression window at the user's recent rate"""
+    elapsed_days = max((now - started_at).total_seconds() / 86400, 1) if started_at else 1
+    expected = int(item_count / elapsed_days * settings.IMPRESSION_WINDOW_DAYS)
+    return min(max(expected, settings.IMPRESSION_MIN_CAPACITY), settings.IMPRESSION_MAX_CAPACITY)
+
+
+def _new_generation(row: ImpressionFilter, capacity: int, now: datetime):
+    bloom = BloomFilter.for_capacity(capacity, settings.IMPRESSION_FALSE_POSITIVE_RATE)
+    row.capacity = capacity
+    row.num_hashes = bloom.num_hashes
+    row.bits = bytes(bloom.bits)
+    row.item_count = 0
+    row.started_at = now
+
+
+def _add_to_row(row: ImpressionFilter, candidate_ids: Set[str], now: datetime):
+    window = timedelta(days=settings.IMPRESSION_WINDOW_DAYS)
+    bloom = BloomFilter(len(row.bits) * 8, row.num_hashes, row.bits)
+    count = row.item_count or 0
+    for candidate_id in candidate_ids:
+        if count >= row.capacity or (row.started_at and now - row.started_at > window):
+            # Current generation is full or stale: demote it and start a new one
+            row.bits = bytes(bloom.bits)
+            row.item_count = count
+            row.previous_bits = row.bits
+            row.previous_num_hashes = row.num_hashes
+            _new_generation(row, _next_capacity(count, row.started_at, now), now)
+            bloom = BloomFilter(len(row.bits) * 8, row.num_hashes, row.bits)
+            count = 0
+        if candidate_id not in bloom:
+            bloom.add(candidate_id)
+            count += 1
+    row.bits = bytes(bloom.bits)
+    row.item_count = count
+
+
+def flush_impressions() -> int:
+    """Persist buffered impressions in one batch; returns how many users were updated"""
+    global _pending_impressions, _flushing_impressions
+    with _pending_lock:
+        batch, _pending_impressions = _pending_impressions, {}
+        _flushing_impressions = batch
+    if not batch:
+        return 0
+
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        rows = {
+            row.user_id: row
+            for row in db.query(ImpressionFilter).filter(ImpressionFilter.user_id.in_(list(batch))).all()
+        }
+        for user_id, candidate_ids in batch.items():
+            row = rows.get(user_id)
+            if row is None:
+                row = ImpressionFilter(user_id=user_id)
+                _new_generation(row, settings.IMPRESSION_MIN_CAPACITY, now)
+                db.add(row)
+            _add_to_row(row, candidate_ids, now)
+        db.commit()
+        with _pending_lock:
+            _flushing_impressions = {}
+        return len(batch)
+    except Exception:
+        db.rollback()
+        # Put the batch back so the next flush retries it
+        with _pending_lock:
+            for user_id, candidate_ids in batch.items():
+                _pending_impressions.setdefault(user_id, set()).update(candidate_ids)
+            _flushing_impressions = {}
+        raise
+    finally:
+        db.close()
+
+
+async def run_impression_flush_loop():
+    """Background task: flush buffered impressions into the bloom filters"""
+    try:
+        while True:
+            await asyncio.sleep(settings.IMPRESSION_FLUSH_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(flush_impressions)
+            except Exception as e:
+                logger.warning(f"Impression flush error: {str(e)}")
+    except asyncio.CancelledError:
+        # Don't lose the last batch on shutdown
+        try:
+            flush_impressions()
+        except Exception as e:
+            logger.warning(f"Final impression flush failed: {str(e)}")
+        raise
@@ -0,0 +1,132 @@
+"""
+Like counter service - atomic and write-behind updates of forum_posts.likes_count
+
+By default each like or unlike changes the counter with a single
+`likes_count = likes_count +/- 1` UPDATE in the request's transaction.
+
+A viral post turns its counter row into a lock hotspot. With
+LIKE_WRITE_BEHIND_THRESHOLD > 0, a post that has taken that many likes
+within the current flush window switches to write-behind. Its deltas are
+summed in memory and flushed every LIKE_FLUSH_INTERVAL_SECONDS as one
+batched UPDATE. A threshold of 1 sends every post through write-behind.
+The `post_likes` rows themselves are always written immediately. A
+buffered delta is only added once the request's transaction has committed
+(`buffer_like_delta`), so a rolled-back like never reaches the counter.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict
+
+from sqlalchemy import bindparam, case, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.community import ForumPost
+from app.services.feed_cache_service import feed_cache
+
+logger = logging.getLogger(__name__)
+
+# post_id -> summed delta not yet written
+_pending_deltas: Dict[int, int] = defaultdict(int)
+# post_id -> likes seen in the current flush window (hot post detection)
+_window_counts: Dict[int, int] = defaultdict(int)
+_pending_lock = threading.Lock()
+
+
+def _apply_delta(db: Session, post_id: int, delta: int):
+    db.query(ForumPost).filter(ForumPost.id == post_id).update(
+        {ForumPost.likes_count: case(
+            (ForumPost.likes_count + delta < 0, 0),
+            else_=ForumPost.likes_count + delta
+        )},
+        synchronize_session=False
+    )
+
+
+def change_likes_count(db: Session, post_id: int, delta: int) -> int:
+    """Add `delta` to a post's like counter in the transaction, unless the post is hot
+    
+    Returns the delta left for write-behind (0 if it was applied); pass it to
+    `buffer_like_delta` after the commit.
+    """
+    threshold = settings.LIKE_WRITE_BEHIND_THRESHOLD
+    if threshold > 0:
+        with _pending_lock:
+            _window_counts[post_id] += 1
+            if _window_counts[post_id] >= threshold:
+                return delta
+    _apply_delta(db, post_id, delta)
+    return 0
+
+
+def buffer_like_delta(post_id: int, delta: int):
+    """Queue a committed like or unlike for the next flush"""
+    if delta:
+        with _pending_lock:
+            _pending_deltas[post_id] += delta
+
+
+def pending_delta(post_id: int) -> int:
+    with _pending_lock:
+        return _pending_deltas.get(post_id, 0)
+
+
+def current_likes_count(db: Session, post_id: int) -> int:
+    """Counter as readers will see it once buffered deltas are flushed"""
+    stored = db.query(ForumPost.likes_count).filter(ForumPost.id == post_id).scalar() or 0
+    return max(0, stored + pending_delta(post_id))
+
+
+def flush_like_deltas() -> int:
+    """Write buffered deltas in one batched UPDATE; returns how many posts were updated"""
+    global _pending_deltas, _window_counts
+    with _pending_lock:
+        batch = {post_id: delta for post_id, delta in _pending_deltas.items() if delta}
+        _pending_deltas = defaultdict(int)
+        _window_counts = defaultdict(int)
+    if not batch:
+        return 0
+
+    db = SessionLocal()
+    try:
+        table = ForumPost.__table__
+        new_count = table.c.likes_count + bindparam("delta")
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("post_id"))
+            .values(likes_count=case((new_count < 0, 0), else_=new_count)),
+            [{"post_id": post_id, "delta": delta} for post_id, delta in batch.items()]
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Put the deltas back so the next flush retries them
+        with _pending_lock:
+            for post_id, delta in batch.items():
+                _pending_deltas[post_id] += delta
+        raise
+    finally:
+        db.close()
+    feed_cache.invalidate(*[f"post:{post_id}" for post_id in batch])
+    return len(batch)
+
+
+async def run_like_flush_loop():
+    """Background task: write buffered like deltas"""
+    try:
+        while True:
+            await asyncio.sleep(settings.LIKE_FLUSH_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(flush_like_deltas)
+            except Exception as e:
+                logger.warning(f"Like counter flush error: {str(e)}")
+    except asyncio.CancelledError:
+        # Don't lose the last deltas on shutdown
+        try:
+            flush_like_deltas()
+        except Exception as e:
+            logger.warning(f"Final like counter flush failed: {str(e)}")
+        raise
@@ -0,0 +1,173 @@
+"""
+Location service - coalesces frequent location pings into batched writes
+
+`PUT /profiles/location` only records the latest position per user in memory.
+A background loop writes all buffered positions with one multi-row UPDATE and
+moves the points in the map index in the same pass. It flushes every
+LOCATION_FLUSH_INTERVAL_SECONDS, or on the next tick once any user has moved
+more than LOCATION_FLUSH_DISTANCE_KM. Until then `apply_pending_location`
+lets the user's own reads see the newest position.
+"""
+import asyncio
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Profile
+from app.services.map_index_service import map_index
+
+logger = logging.getLogger(__name__)
+
+FLUSH_POLL_SECONDS = 1
+
+
+class PendingLocation(NamedTuple):
+    latitude: float
+    longitude: float
+    updated_at: datetime
+    # Position when this user's entry was first buffered; movement is measured from here
+    anchor_latitude: float
+    anchor_longitude: float
+
+
+def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in km"""
+    r = 6371  # Earth's radius in km
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = math.sin(d_lat / 2) ** 2 + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2
+    return r * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+# user_id -> latest position not yet written
+_pending_locations: Dict[str, PendingLocation] = {}
+# Batch being written right now, still visible to reads until it is committed
+_flushing_locations: Dict[str, PendingLocation] = {}
+_pending_lock = threading.Lock()
+_flush_requested = False
+
+
+def record_location(user_id: str, lat: float, lng: float) -> PendingLocation:
+    """Buffer a user's latest position; persisted by the next flush"""
+    global _flush_requested
+    now = datetime.now()
+    with _pending_lock:
+        previous = _pending_locations.get(user_id)
+        anchor = (previous.anchor_latitude, previous.anchor_longitude) if previous else (lat, lng)
+        pending = PendingLocation(lat, lng, now, *anchor)
+        _pending_locations[user_id] = pending
+        if haversine_distance(*anchor, lat, lng) >= settings.LOCATION_FLUSH_DISTANCE_KM:
+            _flush_requested = True
+    return pending
+
+
+def pending_location(user_id: str) -> Optional[PendingLocation]:
+    with _pending_lock:
+        return _pending_locations.get(user_id) or _flushing_locations.get(user_id)
+
+
+def discard_pending_location(user_id: str):
+    """Drop a buffered position superseded by a direct profile write"""
+    with _pending_lock:
+        _pending_locations.pop(user_id, None)
+
+
+def apply_pending_location(profile: Optional[Profile]) -> Optional[Profile]:
+    """Show a buffered position on a loaded profile without marking it dirty"""
+    if profile is None:
+        return None
+    pending = pending_location(profile.user_id)
+    if pending is not None:
+        set_committed_value(profile, "latitude", pending.latitude)
+        set_committed_value(profile, "longitude", pending.longitude)
+        set_committed_value(profile, "location_updated_at", pending.updated_at)
+    return profile
+
+
+def _write_locations(db: Session, batch: Dict[str, PendingLocation]) -> int:
+    profiles = {
+        user_id: (profile_id, is_visible)
+        for profile_id, user_id, is_visible in
+        db.query(Profile.id, Profile.user_id, Profile.is_visible)
+        .filter(Profile.user_id.in_(list(batch)))
+        .all()
+    }
+    updates = [
+        {"id": profiles[user_id][0], "latitude": p.latitude, "longitude": p.longitude, "location_updated_at": p.updated_at}
+        for user_id, p in batch.items() if user_id in profiles
+    ]
+    if updates:
+        db.execute(update(Profile), updates)
+    # Like storage.ts, a location ping creates the profile if there is none yet
+    created = [
+        Profile(user_id=user_id, latitude=p.latitude, longitude=p.longitude,
+                location_updated_at=p.updated_at, is_visible=True)
+        for user_id, p in batch.items() if user_id not in profiles
+    ]
+    db.add_all(created)
+    db.commit()
+
+    for profile in created:
+        map_index.upsert("profiles", profile.id, profile.latitude, profile.longitude)
+    for user_id, (profile_id, is_visible) in profiles.items():
+        if is_visible is not False:
+            map_index.upsert("profiles", profile_id, batch[user_id].latitude, batch[user_id].longitude)
+    return len(batch)
+
+
+def flush_locations() -> int:
+    """Persist buffered positions in one batch; returns how many users were updated"""
+    global _pending_locations, _flushing_locations, _flush_requested
+    with _pending_lock:
+        batch, _pending_locations = _pending_locations, {}
+        _flushing_locations = batch
+        _flush_requested = False
+    if not batch:
+        return 0
+
+    db = SessionLocal()
+    try:
+        return _write_locations(db, batch)
+    except Exception:
+        db.rollback()
+        # Put the batch back unless a newer position arrived meanwhile
+        with _pending_lock:
+            for user_id, pending in batch.items():
+                _pending_locations.setdefault(user_id, pending)
+        raise
+    finally:
+        with _pending_lock:
+            _flushing_locations = {}
+        db.close()
+
+
+async def run_location_flush_loop():
+    """Background task: write buffered positions on an interval or after a large move"""
+    elapsed = 0.0
+    try:
+        while True:
+            await asyncio.sleep(FLUSH_POLL_SECONDS)
+            elapsed += FLUSH_POLL_SECONDS
+            if not _flush_requested and elapsed < settings.LOCATION_FLUSH_INTERVAL_SECONDS:
+                continue
+            elapsed = 0.0
+            try:
+                await asyncio.to_thread(flush_locations)
+            except Exception as e:
+                logger.warning(f"Location flush error: {str(e)}")
+    except asyncio.CancelledError:
+        # Don't lose the last positions on shutdown
+        try:
+            flush_locations()
+        except Exception as e:
+            logger.warning(f"Final location flush failed: {str(e)}")
+        raise
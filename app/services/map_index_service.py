@@ -0,0 +1,300 @@
+"""
+Map index service - hierarchical grid clustering for profiles and events
+
+Every located profile and upcoming event is counted in one web-mercator grid
+cell per level (level L has 2^L x 2^L cells). Cells keep a count, coordinate
+sums and a few representative IDs, so a cluster query only reads the cells
+inside the requested tiles. Location changes move a point between cells on
+every level, and the cached tiles it touched are dropped.
+
+Only the deepest level keeps every member of a cell. When a representative
+is removed, its cell is refilled from the members (deepest level) or from
+its four child cells' representatives, deepest level first. Events are
+indexed with their date and evicted once it has passed.
+"""
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Event, Profile
+
+MAX_LEVEL = 16
+# Clusters are drawn from cells this many levels below the tile zoom (8x8 cells per tile)
+CELL_OFFSET = 3
+MAX_TILE_ZOOM = MAX_LEVEL - CELL_OFFSET
+MAX_REPRESENTATIVES = 3
+TILE_CACHE_SIZE = 5000
+MAX_TILES_PER_QUERY = 64
+MAX_LAT = 85.05112878
+
+LAYERS = ("profiles", "events")
+
+
+def tile_xy(lat: float, lng: float, zoom: int) -> Tuple[int, int]:
+    """Web-mercator tile containing a point at the given zoom"""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    n = 1 << zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_center(x: int, y: int, zoom: int) -> Tuple[float, float]:
+    n = 1 << zoom
+    lng = (x + 0.5) / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    return lat, lng
+
+
+class GridCell:
+    __slots__ = ("count", "sum_lat", "sum_lng", "representatives", "members")
+
+    def __init__(self, leaf: bool = False):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        self.representatives: List[int] = []
+        # Every item in the cell, kept on the deepest level only
+        self.members: Optional[Set[int]] = set() if leaf else None
+
+
+class MapIndex:
+    """Grid cells for every level plus a per-tile cache of computed clusters"""
+
+    def __init__(self):
+        # level -> layer -> (x, y) -> cell
+        self._levels: List[Dict[str, Dict[Tuple[int, int], GridCell]]] = [
+            {layer: {} for layer in LAYERS} for _ in range(MAX_LEVEL + 1)
+        ]
+        self._points: Dict[Tuple[str, int], Tuple[float, float]] = {}
+        # (layer, id) -> epoch seconds after which the point is dropped, plus a
+        # min-heap of the same entries (stale heap entries are skipped)
+        self._expires_at: Dict[Tuple[str, int], float] = {}
+        self._expiry_heap: List[Tuple[float, str, int]] = []
+        self._tile_cache: "OrderedDict[Tuple[int, int, int], Dict[str, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _add_locked(self, layer: str, item_id: int, lat: float, lng: float):
+        for level in range(MAX_LEVEL + 1):
+            cells = self._levels[level][layer]
+            key = tile_xy(lat, lng, level)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = GridCell(leaf=level == MAX_LEVEL)
+            cell.count += 1
+            cell.sum_lat += lat
+            cell.sum_lng += lng
+            if cell.members is not None:
+                cell.members.add(item_id)
+            if len(cell.representatives) < MAX_REPRESENTATIVES:
+                cell.representatives.append(item_id)
+        self._points[(layer, item_id)] = (lat, lng)
+        self._invalidate_tiles_locked(lat, lng)
+
+    def _refill_locked(self, layer: str, level: int, key: Tuple[int, int], cell: GridCell):
+        if cell.members is not None:
+            candidates = cell.members
+        else:
+            # Children are refilled first, so their representatives are current
+            children = self._levels[level + 1][layer]
+            x, y = key
+            candidates = [
+                item_id
+                for child_key in ((2 * x, 2 * y), (2 * x + 1, 2 * y), (2 * x, 2 * y + 1), (2 * x + 1, 2 * y + 1))
+                if child_key in children
+                for item_id in children[child_key].representatives
+            ]
+        for item_id in candidates:
+            if len(cell.representatives) >= MAX_REPRESENTATIVES:
+                break
+            if item_id not in cell.representatives:
+                cell.representatives.append(item_id)
+
+    def _remove_locked(self, layer: str, item_id: int):
+        self._expires_at.pop((layer, item_id), None)
+        position = self._points.pop((layer, item_id), None)
+        if position is None:
+            return
+        lat, lng = position
+        for level in range(MAX_LEVEL, -1, -1):
+            cells = self._levels[level][layer]
+            key = tile_xy(lat, lng, level)
+            cell = cells.get(key)
+            if cell is None:
+                continue
+            cell.count -= 1
+            cell.sum_lat -= lat
+            cell.sum_lng -= lng
+            if cell.members is not None:
+                cell.members.discard(item_id)
+            if cell.count <= 0:
+                del cells[key]
+            elif item_id in cell.representatives:
+                cell.representatives.remove(item_id)
+                self._refill_locked(layer, level, key, cell)
+        self._invalidate_tiles_locked(lat, lng)
+
+    def _evict_expired_locked(self, now: float):
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, layer, item_id = heapq.heappop(self._expiry_heap)
+            if self._expires_at.get((layer, item_id)) == expires_at:
+                self._remove_locked(layer, item_id)
+
+    def _invalidate_tiles_locked(self, lat: float, lng: float):
+        for zoom in range(MAX_TILE_ZOOM + 1):
+            self._tile_cache.pop((zoom, *tile_xy(lat, lng, zoom)), None)
+
+    def upsert(
+        self,
+        layer: str,
+        item_id: int,
+        lat: Optional[float],
+        lng: Optional[float],
+        expires_at: Optional[float] = None
+    ):
+        """Place (or move) a point; a point without coordinates is removed
+        
+        A point with `expires_at` (epoch seconds) is dropped once that time passes.
+        """
+        with self._lock:
+            key = (layer, item_id)
+            if self._points.get(key) != (lat, lng):
+                self._remove_locked(layer, item_id)
+                if lat is None or lng is None:
+                    return
+                self._add_locked(layer, item_id, lat, lng)
+            if expires_at is None:
+                self._expires_at.pop(key, None)
+            elif self._expires_at.get(key) != expires_at:
+                self._expires_at[key] = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, layer, item_id))
+
+    def remove(self, layer: str, item_id: int):
+        with self._lock:
+            self._remove_locked(layer, item_id)
+
+    def clear(self):
+        with self._lock:
+            for level in self._levels:
+                for cells in level.values():
+                    cells.clear()
+            self._points.clear()
+            self._expires_at.clear()
+            self._expiry_heap.clear()
+            self._tile_cache.clear()
+
+    def _tile_clusters_locked(self, zoom: int, x: int, y: int) -> Dict[str, list]:
+        key = (zoom, x, y)
+        cached = self._tile_cache.get(key)
+        if cached is not None:
+            self._tile_cache.move_to_end(key)
+            return cached
+
+        level = min(zoom + CELL_OFFSET, MAX_LEVEL)
+        scale = 1 << (level - zoom)
+        clusters: Dict[str, list] = {}
+        for layer in LAYERS:
+            cells = self._levels[level][layer]
+            layer_clusters = []
+            for cx in range(x * scale, (x + 1) * scale):
+                for cy in range(y * scale, (y + 1) * scale):
+                    cell = cells.get((cx, cy))
+                    if cell is None:
+                        continue
+                    if cell.count == 1 and layer == "profiles":
+                        # Never expose a single creator's exact position
+                        lat, lng = tile_center(cx, cy, level)
+                    else:
+                        lat, lng = cell.sum_lat / cell.count, cell.sum_lng / cell.count
+                    layer_clusters.append({
+                        "lat": round(lat, 5),
+                        "lng": round(lng, 5),
+                        "count": cell.count,
+                        "ids": list(cell.representatives),
+                    })
+            clusters[layer] = layer_clusters
+
+        self._tile_cache[key] = clusters
+        if len(self._tile_cache) > TILE_CACHE_SIZE:
+            self._tile_cache.popitem(last=False)
+        return clusters
+
+    def clusters(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        zoom: int,
+        layers: Tuple[str, ...] = LAYERS
+    ) -> Tuple[int, Dict[str, list]]:
+        """Pre-aggregated clusters for every tile overlapping the bounding box
+        
+        Returns the zoom actually used: it is lowered until the box spans at
+        most MAX_TILES_PER_QUERY tiles. A box with min_lng > max_lng crosses
+        the antimeridian.
+        """
+        zoom = max(0, min(zoom, MAX_TILE_ZOOM))
+        while True:
+            x0, y0 = tile_xy(max_lat, min_lng, zoom)
+            x1, y1 = tile_xy(min_lat, max_lng, zoom)
+            xs = list(range(x0, x1 + 1)) if x0 <= x1 else list(range(x0, 1 << zoom)) + list(range(0, x1 + 1))
+            if zoom == 0 or len(xs) * (y1 - y0 + 1) <= MAX_TILES_PER_QUERY:
+                break
+            zoom -= 1
+
+        result: Dict[str, list] = {layer: [] for layer in layers}
+        with self._lock:
+            self._evict_expired_locked(time.time())
+            for x in xs:
+                for y in range(y0, y1 + 1):
+                    tile = self._tile_clusters_locked(zoom, x, y)
+                    for layer in layers:
+                        result[layer].extend(tile[layer])
+        return zoom, result
+
+
+map_index = MapIndex()
+
+
+def index_profile_location(profile: Profile):
+    """Keep a profile's map point in sync after its location or visibility changed"""
+    if profile.is_visible is False:
+        map_index.remove("profiles", profile.id)
+    else:
+        map_index.upsert("profiles", profile.id, profile.latitude, profile.longitude)
+
+
+def index_event_location(event: Event):
+    """Keep an event's map point in sync after it is created, moved or rescheduled"""
+    ends_at = event.event_date.replace(tzinfo=timezone.utc).timestamp() if event.event_date else None
+    if ends_at is None or ends_at <= time.time():
+        map_index.remove("events", event.id)
+    else:
+        map_index.upsert("events", event.id, event.latitude, event.longitude, ends_at)
+
+
+def build_map_index(db: Session) -> int:
+    """(Re)load the grid from located visible profiles and upcoming events"""
+    map_index.clear()
+    count = 0
+    for profile_id, lat, lng in db.query(Profile.id, Profile.latitude, Profile.longitude)\
+            .filter(Profile.is_visible == True)\
+            .filter(Profile.latitude.isnot(None), Profile.longitude.isnot(None))\
+            .yield_per(1000):
+        map_index.upsert("profiles", profile_id, lat, lng)
+        count += 1
+    for event in db.query(Event)\
+            .filter(Event.event_date >= datetime.utcnow())\
+            .filter(Event.latitude.isnot(None), Event.longitude.isnot(None))\
+            .yield_per(1000):
+        index_event_location(event)
+        count += 1
+    return count
@@ -0,0 +1,64 @@
+"""
+Mention service - turns @handles in posts and replies into PostTag rows
+
+Handles are matched case-insensitively against `profiles.username` in one
+IN query (on the lower(username) index). Tags for a post are then written
+in one bulk INSERT in the caller's transaction. A mention in a reply tags
+the reply's post. Self-mentions, handles that match no profile, and users
+already tagged on the post are skipped.
+"""
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.connections import PostTag
+from app.models.profile import Profile
+
+# "@handle" not glued to a preceding word (so not an email address); a trailing "." ends the handle
+MENTION_PATTERN = re.compile(r"(?<![\w@.])@([A-Za-z0-9_](?:[A-Za-z0-9_.]{0,30}[A-Za-z0-9_])?)")
+
+# Beyond this many handles a post is treated as spam and the rest are ignored
+MAX_MENTIONS = 20
+
+
+def extract_mentions(*texts: Optional[str]) -> List[str]:
+    """Distinct lowercase handles mentioned in the texts, in order of appearance"""
+    handles: Dict[str, None] = {}
+    for value in texts:
+        for match in MENTION_PATTERN.finditer(value or ""):
+            handles.setdefault(match.group(1).lower(), None)
+            if len(handles) == MAX_MENTIONS:
+                return list(handles)
+    return list(handles)
+
+
+def tag_mentions(db: Session, post_id: int, author_id: Optional[str], *texts: Optional[str]) -> List[str]:
+    """Tag the users mentioned in `texts` on a post; returns the newly tagged user ids"""
+    handles = extract_mentions(*texts)
+    if not handles:
+        return []
+    user_ids = {
+        user_id for (user_id,) in
+        db.query(Profile.user_id).filter(func.lower(Profile.username).in_(handles)).all()
+    }
+    user_ids.discard(author_id)
+    if not user_ids:
+        return []
+    already_tagged = {
+        user_id for (user_id,) in
+        db.query(PostTag.tagged_user_id)
+        .filter(PostTag.post_id == post_id, PostTag.tagged_user_id.in_(user_ids))
+        .all()
+    }
+    new_ids = sorted(user_ids - already_tagged)
+    if not new_ids:
+        return []
+    try:
+        with db.begin_nested():
+            db.bulk_insert_mappings(PostTag, [{"post_id": post_id, "tagged_user_id": user_id} for user_id in new_ids])
+    except IntegrityError:
+        return []  # Tagged by a concurrent reply; the tags exist either way
+    return new_ids
@@ -0,0 +1,359 @@
+"""
+Moderation service - background classification of posts, replies and messages
+
+`create_post`, `create_reply` and `send_message` don't classify content inline. In the same
+transaction as the write they add a row to `moderation_queue`. Workers
+(MODERATION_WORKERS loops in the app, or the CLI) claim up to
+MODERATION_BATCH_SIZE pending rows at a time. They classify the whole batch
+and write every status back with one batched UPDATE per table. Claimed rows
+are tagged with a per-batch token, so several workers never classify the same
+item. A claim older than MODERATION_CLAIM_TIMEOUT_SECONDS (a worker that
+died) goes back to pending. After MODERATION_MAX_ATTEMPTS tries it is
+marked failed.
+
+Only high-risk content (phrases with the "block" action in the blocked-term
+list, see blocked_terms_service) is checked synchronously, so it is refused
+before it is stored. Both checks scan the text in one pass. Queue depth, oldest pending
+age and worker throughput are exposed for backpressure monitoring at
+`GET /api/moderation/queue`, to the users in MODERATION_STAFF_USER_IDS
+only. A warning is logged when the queue falls behind.
+
+    python -m app.services.moderation_service           # drain the queue once
+    python -m app.services.moderation_service --stats
+"""
+import argparse
+import asyncio
+import logging
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.community import ForumPost, PostReply
+from app.models.matching import Message
+from app.models.moderation import ModerationQueueItem
+from app.services.blocked_terms_service import BLOCK, FLAG, REJECT, blocked_terms
+from app.services.feed_cache_service import feed_cache
+
+logger = logging.getLogger(__name__)
+
+POST = "post"
+REPLY = "reply"
+MESSAGE = "message"
+
+PENDING = "pending"
+PROCESSING = "processing"
+FAILED = "failed"
+
+APPROVED = "approved"
+FLAGGED = "flagged"
+REJECTED = "rejected"
+
+# Most severe first; an item gets the status of its most severe match
+_SEVERITY = {REJECTED: 2, FLAGGED: 1, APPROVED: 0}
+
+_TERM_STATUS = {BLOCK: REJECTED, REJECT: REJECTED, FLAG: FLAGGED}
+
+# Contact details and spam signals that a phrase list can't express
+_CONTACT_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[a-z]{2,}|\+?\d[\d\s().-]{8,}\d", re.IGNORECASE)
+_LINK_PATTERN = re.compile(r"https?://|www\.", re.IGNORECASE)
+_REPEAT_PATTERN = re.compile(r"(.)\1{9,}")
+MAX_LINKS = 3
+
+
+def high_risk_category(*texts: Optional[str]) -> Optional[str]:
+    """Category of the first blocked (high-risk) phrase in the texts, if any"""
+    for term in blocked_terms.scan(*texts):
+        if term.action == BLOCK:
+            return term.category
+    return None
+
+
+def classify(*texts: Optional[str]) -> Tuple[str, List[str]]:
+    """(status, matched categories) for one item's texts"""
+    matches = [(term.category, _TERM_STATUS[term.action]) for term in blocked_terms.scan(*texts)]
+    text = "\n".join(value for value in texts if value)
+    if _CONTACT_PATTERN.search(text):
+        matches.append(("off_platform_contact", FLAGGED))
+    if len(_LINK_PATTERN.findall(text)) > MAX_LINKS or _REPEAT_PATTERN.search(text):
+        matches.append(("spam", FLAGGED))
+    status = max((status for _, status in matches), key=_SEVERITY.get, default=APPROVED)
+    return status, list(dict.fromkeys(category for category, _ in matches))
+
+
+def enqueue(db: Session, item_type: str, item_id: int):
+    """Queue an item for moderation; committed with the caller's transaction"""
+    db.add(ModerationQueueItem(item_type=item_type, item_id=item_id, status=PENDING, attempts=0))
+
+
+class ModerationMetrics:
+    """Worker-side counters for backpressure monitoring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.by_status: Dict[str, int] = {APPROVED: 0, FLAGGED: 0, REJECTED: 0}
+        self.failed_batches = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        self.last_batch_at: Optional[float] = None
+        # Smoothed items/second while working through batches
+        self.throughput = 0.0
+
+    def record_batch(self, statuses: List[str], seconds: float):
+        with self._lock:
+            self.processed += len(statuses)
+            for status in statuses:
+                self.by_status[status] += 1
+            self.last_batch_size = len(statuses)
+            self.last_batch_seconds = seconds
+            self.last_batch_at = time.time()
+            if statuses and seconds > 0:
+                rate = len(statuses) / seconds
+                self.throughput = rate if not self.throughput else 0.8 * self.throughput + 0.2 * rate
+
+    def record_failure(self):
+        with self._lock:
+            self.failed_batches += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "approved": self.by_status[APPROVED],
+                "flagged": self.by_status[FLAGGED],
+                "rejected": self.by_status[REJECTED],
+                "failedBatches": self.failed_batches,
+                "lastBatchSize": self.last_batch_size,
+                "lastBatchMs": round(self.last_batch_seconds * 1000, 1),
+                "lastBatchAt": datetime.utcfromtimestamp(self.last_batch_at).isoformat() if self.last_batch_at else None,
+                "throughputPerSecond": round(self.throughput, 1),
+            }
+
+
+moderation_metrics = ModerationMetrics()
+
+
+def queue_stats(db: Session) -> Dict[str, Any]:
+    """Queue depth, lag and worker throughput"""
+    counts = dict(
+        db.query(ModerationQueueItem.status, func.count())
+        .group_by(ModerationQueueItem.status)
+        .all()
+    )
+    oldest = db.query(func.min(ModerationQueueItem.enqueued_at))\
+        .filter(ModerationQueueItem.status == PENDING)\
+        .scalar()
+    if isinstance(oldest, str):  # SQLite returns the aggregate as text
+        oldest = datetime.fromisoformat(oldest)
+    oldest_age = max(0.0, (datetime.utcnow() - oldest).total_seconds()) if oldest else 0.0
+    pending = counts.get(PENDING, 0)
+    workers = moderation_metrics.snapshot()
+    throughput = workers["throughputPerSecond"]
+    return {
+        "pending": pending,
+        "processing": counts.get(PROCESSING, 0),
+        "failed": counts.get(FAILED, 0),
+        "oldestPendingSeconds": round(oldest_age, 1),
+        "estimatedDrainSeconds": round(pending / throughput, 1) if throughput else None,
+        "isBacklogged": pending > settings.MODERATION_QUEUE_WARN_DEPTH
+        or oldest_age > settings.MODERATION_QUEUE_WARN_AGE_SECONDS,
+        "workers": workers,
+    }
+
+
+def _requeue_stale_claims(db: Session):
+    """Put back items claimed by a worker that never finished them"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.MODERATION_CLAIM_TIMEOUT_SECONDS)
+    stale = (ModerationQueueItem.status == PROCESSING) & (ModerationQueueItem.claimed_at < cutoff)
+    db.query(ModerationQueueItem)\
+        .filter(stale, ModerationQueueItem.attempts >= settings.MODERATION_MAX_ATTEMPTS)\
+        .update({"status": FAILED, "claimed_by": None}, synchronize_session=False)
+    db.query(ModerationQueueItem)\
+        .filter(stale)\
+        .update({"status": PENDING, "claimed_by": None}, synchronize_session=False)
+    db.commit()
+
+
+def _claim_batch(db: Session, batch_size: int) -> List[Tuple[int, str, int]]:
+    """Claim up to batch_size of the oldest pending items; returns (queue id, item type, item id)"""
+    ids = [
+        queue_id for (queue_id,) in
+        db.query(ModerationQueueItem.id)
+        .filter(ModerationQueueItem.status == PENDING)
+        .order_by(ModerationQueueItem.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not ids:
+        db.commit()
+        return []
+    token = uuid.uuid4().hex
+    # The status check keeps a row that another worker claimed in the meantime with that worker
+    db.query(ModerationQueueItem)\
+        .filter(ModerationQueueItem.id.in_(ids), ModerationQueueItem.status == PENDING)\
+        .update({
+            "status": PROCESSING,
+            "claimed_by": token,
+            "claimed_at": datetime.utcnow(),
+            "attempts": ModerationQueueItem.attempts + 1,
+        }, synchronize_session=False)
+    db.commit()
+    return db.query(ModerationQueueItem.id, ModerationQueueItem.item_type, ModerationQueueItem.item_id)\
+        .filter(ModerationQueueItem.claimed_by == token)\
+        .all()
+
+
+class Target(NamedTuple):
+    model: type
+    text_columns: Tuple[str, ...]
+    # Set along with the status
+    extra_values: Dict[str, Any]
+
+
+TARGETS: Dict[str, Target] = {
+    POST: Target(ForumPost, ("title", "content"), {}),
+    REPLY: Target(PostReply, ("content",), {}),
+    MESSAGE: Target(Message, ("content",), {"is_moderated": True}),
+}
+
+
+def _classify_items(db: Session, target: Target, item_ids: List[int]) -> Dict[int, str]:
+    """Status per item; items deleted since they were queued are left out"""
+    columns = [getattr(target.model, name) for name in target.text_columns]
+    rows = db.query(target.model.id, target.model.moderation_status, *columns)\
+        .filter(target.model.id.in_(item_ids))\
+        .all()
+    # A status set at write time (e.g. a suspected duplicate) is never downgraded
+    return {
+        row[0]: max(row[1] or APPROVED, classify(*row[2:])[0], key=_SEVERITY.get)
+        for row in rows
+    }
+
+
+def _write_statuses(db: Session, target: Target, statuses: Dict[int, str]):
+    table = target.model.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("item_id"))
+        .values(moderation_status=bindparam("status"), **target.extra_values),
+        [{"item_id": item_id, "status": status} for item_id, status in statuses.items()]
+    )
+
+
+def process_batch(db: Session, batch_size: Optional[int] = None) -> int:
+    """Claim, classify and write back one batch; returns how many items were taken off the queue"""
+    batch_size = batch_size or settings.MODERATION_BATCH_SIZE
+    _requeue_stale_claims(db)
+    claimed = _claim_batch(db, batch_size)
+    if not claimed:
+        return 0
+    started = time.perf_counter()
+    queue_ids = [queue_id for queue_id, _, _ in claimed]
+    statuses: Dict[str, Dict[int, str]] = {}
+    try:
+        for item_type, target in TARGETS.items():
+            item_ids = [item_id for _, claimed_type, item_id in claimed if claimed_type == item_type]
+            if item_ids:
+                statuses[item_type] = _classify_items(db, target, item_ids)
+                if statuses[item_type]:
+                    _write_statuses(db, target, statuses[item_type])
+        db.query(ModerationQueueItem)\
+            .filter(ModerationQueueItem.id.in_(queue_ids))\
+            .delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        moderation_metrics.record_failure()
+        # Retry later, or give up on items that keep failing
+        db.query(ModerationQueueItem)\
+            .filter(ModerationQueueItem.id.in_(queue_ids))\
+            .update({"status": PENDING, "claimed_by": None}, synchronize_session=False)
+        db.query(ModerationQueueItem)\
+            .filter(
+                ModerationQueueItem.id.in_(queue_ids),
+                ModerationQueueItem.attempts >= settings.MODERATION_MAX_ATTEMPTS
+            )\
+            .update({"status": FAILED}, synchronize_session=False)
+        db.commit()
+        raise
+
+    moderation_metrics.record_batch(
+        [status for by_item in statuses.values() for status in by_item.values()],
+        time.perf_counter() - started
+    )
+    rejected_posts = [post_id for post_id, status in statuses.get(POST, {}).items() if status == REJECTED]
+    if rejected_posts:
+        feed_cache.invalidate("feed", *[f"post:{post_id}" for post_id in rejected_posts])
+    return len(claimed)
+
+
+def drain(db: Session, batch_size: Optional[int] = None) -> int:
+    """Process batches until the queue is empty; returns how many items were processed"""
+    total = 0
+    while True:
+        processed = process_batch(db, batch_size)
+        if not processed:
+            return total
+        total += processed
+
+
+def _run_worker_pass() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        processed = process_batch(db)
+        stats = queue_stats(db) if processed else None
+        return {"processed": processed, "stats": stats}
+    finally:
+        db.close()
+
+
+async def run_moderation_worker_loop():
+    """Background task: work through the queue, polling while it is empty"""
+    last_warning = 0.0
+    while True:
+        processed = 0
+        try:
+            result = await asyncio.to_thread(_run_worker_pass)
+            processed = result["processed"]
+            stats = result["stats"]
+            if stats and stats["isBacklogged"] and time.time() - last_warning > 60:
+                last_warning = time.time()
+                logger.warning(
+                    f"Moderation queue is behind: {stats['pending']} pending, "
+                    f"oldest {stats['oldestPendingSeconds']}s, "
+                    f"{stats['workers']['throughputPerSecond']} items/s"
+                )
+        except Exception as e:
+            logger.warning(f"Moderation batch failed: {str(e)}")
+        # A full batch means more is waiting; go straight on to the next one
+        if processed < settings.MODERATION_BATCH_SIZE:
+            await asyncio.sleep(settings.MODERATION_POLL_INTERVAL_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify queued posts and messages")
+    parser.add_argument("--batch-size", type=int, help="items per batch (default MODERATION_BATCH_SIZE)")
+    parser.add_argument("--stats", action="store_true", help="print queue stats and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    db = SessionLocal()
+    try:
+        if not args.stats:
+            logger.info(f"Moderated {drain(db, args.batch_size)} items")
+        logger.info(f"Queue: {queue_stats(db)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
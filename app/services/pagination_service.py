@@ -0,0 +1,87 @@
+"""
+Pagination service - opaque keyset cursors
+
+A cursor encodes the sort key of the last row on a page, e.g.
+(created_at, id). The next page is everything strictly after that key in
+sort order, so deep pages cost the same as the first one and rows inserted
+while scrolling don't shift the window the way OFFSET does.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import Response
+
+from sqlalchemy import and_, literal, or_, Boolean, String
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque, URL-safe cursor for a row's sort key"""
+    payload = [
+        {"t": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Sort key from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, list) or len(payload) != size:
+        raise ValueError("Invalid cursor")
+    return [
+        datetime.fromisoformat(value["t"]) if isinstance(value, dict) and "t" in value else value
+        for value in payload
+    ]
+
+
+def _bind(db: Session, value: Any):
+    if isinstance(value, bool):
+        # Python booleans only compare with =/!=; bound, they order false < true
+        return literal(value, Boolean)
+    # SQLite keeps server-default timestamps as text without fractional seconds, while
+    # bound datetimes always carry them; compare against the stored text form instead
+    if isinstance(value, datetime) and db.bind.dialect.name == "sqlite" and not value.microsecond:
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return value
+
+
+def keyset_after(db: Session, columns: Sequence, values: Sequence[Any], descending: bool = True):
+    """Predicate for rows strictly after `values` in (columns) order, all in one direction"""
+    clauses = []
+    for i, column in enumerate(columns):
+        value = _bind(db, values[i])
+        step = column < value if descending else column > value
+        clauses.append(and_(*[columns[j] == _bind(db, values[j]) for j in range(i)], step))
+    return or_(*clauses)
+
+
+def next_cursor(rows: Sequence, limit: int, key: Callable[[Any], tuple]) -> Optional[str]:
+    """Cursor for the page after `rows` (key gives a row's sort key), or None on the last page"""
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(*key(rows[-1]))
+
+
+def paged_response(
+    items: List[Dict[str, Any]],
+    cursor_out: Optional[str],
+    cursor: Optional[str],
+    response: Response,
+    key: str = "posts"
+):
+    """The body stays a plain list for older clients, with the next cursor in the
+    X-Next-Cursor header; clients that send `cursor` (empty for the first page)
+    get {"posts": [...], "next_cursor": ...} instead (`key` names the list).
+    """
+    if cursor_out:
+        response.headers["X-Next-Cursor"] = cursor_out
+    if cursor is not None:
+        return {key: items, "next_cursor": cursor_out}
+    return items
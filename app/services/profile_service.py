@@ -1,23 +1,202 @@
 """
 Profile service
 """
+from sqlalchemy import extract, or_
 from sqlalchemy.orm import Session
-from app.models.profile import Profile
+from app.models.profile import Profile, GenderCode
 from app.models.auth import User
-from typing import Dict, Optional
+from app.services.text_index_service import index_profile
+from app.services.map_index_service import index_profile_location
+from app.services.geocoding_service import geocode_profile
+from app.services.location_service import apply_pending_location, discard_pending_location
+from app.database import SessionLocal
+from typing import Dict, Iterable, Optional, Set, Union
+from datetime import date, datetime, timedelta
+import asyncio
+import calendar
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Free-text gender values seen from the clients, normalized to GenderCode
+GENDER_ALIASES = {
+    GenderCode.WOMAN: {"woman", "women", "female", "f", "girl", "cis woman", "cisgender woman"},
+    GenderCode.MAN: {"man", "men", "male", "m", "guy", "cis man", "cisgender man"},
+    GenderCode.NON_BINARY: {"non-binary", "nonbinary", "non binary", "nb", "enby", "genderqueer", "genderfluid", "agender"},
+    GenderCode.TRANS_WOMAN: {"trans woman", "transwoman", "trans women", "trans female", "mtf"},
+    GenderCode.TRANS_MAN: {"trans man", "transman", "trans men", "trans male", "ftm"},
+    GenderCode.OTHER: {"other", "others"},
+}
+_GENDER_LOOKUP = {alias: code for code, aliases in GENDER_ALIASES.items() for alias in aliases}
+
+# Mask bit (above every GenderCode) for a preference list that also names
+# genders without a code; those are matched by their text, not by a code bit
+UNLISTED_PREFERENCE = 1 << 7
+
+
+def gender_key(value: Optional[str]) -> str:
+    """Lowercase, single-spaced form free-text genders are compared in"""
+    return " ".join((value or "").lower().replace("_", " ").split())
+
+
+def normalize_gender(value: Optional[str]) -> GenderCode:
+    """Map a free-text gender to its GenderCode (UNKNOWN if empty, OTHER if not listed)"""
+    key = gender_key(value)
+    if not key:
+        return GenderCode.UNKNOWN
+    return _GENDER_LOOKUP.get(key, GenderCode.OTHER)
+
+
+def unlisted_genders(values: Optional[Iterable[str]]) -> Set[str]:
+    """Preference values (as gender keys) that have no GenderCode"""
+    return {key for key in map(gender_key, values or []) if key and key not in _GENDER_LOOKUP}
+
+
+def gender_mask(values: Optional[Iterable[str]]) -> int:
+    """Bitmask of the genders in a preference list (0 means no preference)
+    
+    Only listed genders get their code's bit. Unlisted ones set
+    UNLISTED_PREFERENCE instead of the OTHER bit, so "demigirl" does not
+    match every other unlisted gender.
+    """
+    mask = 0
+    for value in values or []:
+        key = gender_key(value)
+        if key:
+            mask |= 1 << _GENDER_LOOKUP[key] if key in _GENDER_LOOKUP else UNLISTED_PREFERENCE
+    return mask
+
+
+def gender_accepts(mask: int, preferences: Optional[Iterable[str]], code: int, gender: Optional[str]) -> bool:
+    """Whether a preference (mask plus raw list) accepts a profile's gender; unknowns pass"""
+    if not mask or not code or mask & (1 << code):
+        return True
+    return code == GenderCode.OTHER and bool(mask & UNLISTED_PREFERENCE) \
+        and gender_key(gender) in unlisted_genders(preferences)
+
+
+def calculate_age(birth_date: Optional[Union[date, str]], today: Optional[date] = None) -> Optional[int]:
+    """Calculate age in whole years from a birth date"""
+    if not birth_date:
+        return None
+    if isinstance(birth_date, str):
+        try:
+            birth_date = date.fromisoformat(birth_date[:10])
+        except ValueError:
+            return None
+    if isinstance(birth_date, datetime):
+        birth_date = birth_date.date()
+    today = today or date.today()
+    age = today.year - birth_date.year
+    if (today.month, today.day) < (birth_date.month, birth_date.day):
+        age -= 1
+    return age
+
+
+def sync_derived_columns(profile: Profile):
+    """Recompute birth_year / age / gender_code / gender_key / gender_preference_mask from the source fields"""
+    if isinstance(profile.birth_date, str):
+        # Clients send ISO strings; store a real date so every dialect accepts it
+        try:
+            profile.birth_date = date.fromisoformat(profile.birth_date[:10]) if profile.birth_date else None
+        except ValueError:
+            profile.birth_date = None
+    profile.age = calculate_age(profile.birth_date)
+    profile.birth_year = profile.birth_date.year if profile.birth_date else None
+    profile.gender_code = int(normalize_gender(profile.gender))
+    profile.gender_key = gender_key(profile.gender) or None
+    profile.gender_preference_mask = gender_mask(profile.gender_preference)
+
+
+def backfill_derived_columns(db: Session, chunk_size: int = 1000) -> int:
+    """Fill derived columns for profiles saved before they existed; returns how many were updated"""
+    updated = 0
+    last_id = 0
+    while True:
+        profiles = db.query(Profile)\
+            .filter(Profile.id > last_id)\
+            .filter(or_(
+                Profile.birth_date.isnot(None) & Profile.age.is_(None),
+                Profile.gender.isnot(None) & (Profile.gender_code == 0),
+                Profile.gender.isnot(None) & Profile.gender_key.is_(None),
+            ))\
+            .order_by(Profile.id)\
+            .limit(chunk_size)\
+            .all()
+        if not profiles:
+            return updated
+        for profile in profiles:
+            sync_derived_columns(profile)
+        db.commit()
+        updated += len(profiles)
+        last_id = profiles[-1].id
+
+
+def refresh_birthday_ages(db: Session, today: Optional[date] = None, days_back: int = 2) -> int:
+    """Recompute `age` for profiles whose birthday fell in the last `days_back` days
+    
+    Covering more than today keeps ages right if a daily run was missed.
+    """
+    today = today or date.today()
+    updated = 0
+    for offset in range(days_back):
+        day = today - timedelta(days=offset)
+        month_days = [(day.month, day.day)]
+        if day.month == 3 and day.day == 1 and not calendar.isleap(day.year):
+            month_days.append((2, 29))  # Feb 29 birthdays tick over on Mar 1
+        for month, day_of_month in month_days:
+            profiles = db.query(Profile)\
+                .filter(Profile.birth_date.isnot(None))\
+                .filter(extract("month", Profile.birth_date) == month)\
+                .filter(extract("day", Profile.birth_date) == day_of_month)\
+                .all()
+            for profile in profiles:
+                age = calculate_age(profile.birth_date, today)
+                if profile.age != age:
+                    profile.age = age
+                    updated += 1
+    db.commit()
+    return updated
+
+
+def _run_daily_profile_maintenance():
+    db = SessionLocal()
+    try:
+        backfilled = backfill_derived_columns(db)
+        refreshed = refresh_birthday_ages(db)
+        logger.info(f"Profile maintenance: backfilled {backfilled}, refreshed {refreshed} birthday ages")
+    finally:
+        db.close()
+
+
+async def run_birthday_refresh_loop():
+    """Background task: keep derived age columns current, once at startup and then after each midnight"""
+    while True:
+        try:
+            await asyncio.to_thread(_run_daily_profile_maintenance)
+        except Exception as e:
+            logger.warning(f"Profile maintenance failed: {str(e)}")
+        now = datetime.now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        await asyncio.sleep((next_midnight - now).total_seconds() + 60)
 
 
 def get_profile_by_user_id(db: Session, user_id: str) -> Optional[Profile]:
     """Get profile by user ID"""
-    return db.query(Profile).filter(Profile.user_id == user_id).first()
+    return apply_pending_location(db.query(Profile).filter(Profile.user_id == user_id).first())
 
 
 def create_profile(db: Session, user_id: str, profile_data: Dict) -> Profile:
     """Create a new profile"""
     profile = Profile(user_id=user_id, **profile_data)
+    sync_derived_columns(profile)
+    if profile.latitude is None:
+        geocode_profile(profile)
     db.add(profile)
     db.commit()
     db.refresh(profile)
+    index_profile(profile)
+    index_profile_location(profile)
     return profile
 
 
@@ -27,9 +206,6 @@ def update_profile(db: Session, user_id: str, updates: Dict) -> Profile:
     Security: This function only updates the profile for the provided user_id.
     The caller (route handler) must ensure the user_id matches the authenticated user.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     try:
         profile = get_profile_by_user_id(db, user_id)
         
@@ -66,9 +242,16 @@ def update_profile(db: Session, user_id: str, updates: Dict) -> Profile:
                 else:
                     logger.warning(f"Profile model does not have attribute: {key} - skipping")
             
+            sync_derived_columns(profile)
+            if "location" in updates and "latitude" not in updates:
+                geocode_profile(profile)
+            if "latitude" in updates or "longitude" in updates:
+                discard_pending_location(user_id)
             try:
                 db.commit()
                 db.refresh(profile)
+                index_profile(profile)
+                index_profile_location(profile)
                 logger.info(f"Successfully committed profile update for user {user_id}")
             except Exception as e:
                 logger.error(f"Database commit error: {str(e)}", exc_info=True)
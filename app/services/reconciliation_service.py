@@ -0,0 +1,166 @@
+"""
+Reconciliation service - repairs drift in denormalized counters
+
+Each counter is recomputed from its source table. Parent rows are scanned in
+primary-key chunks, and each chunk is counted with one grouped aggregate.
+Only rows whose stored value differs are rewritten, in one batched UPDATE
+and a short transaction per chunk. Each fix is a compare-and-set on the
+value that was read, so a counter that moved in the meantime is left for
+the next run.
+
+Runs on a schedule inside the app (COUNTER_RECONCILE_INTERVAL_SECONDS) and
+from the CLI. Like deltas buffered by write-behind (see like_counter_service)
+only exist in the app's memory. The scheduled run flushes them first and
+skips posts that still have some. The CLI cannot see them at all. Writing
+the true count there would have the app's next flush count those likes a
+second time. So with LIKE_WRITE_BEHIND_THRESHOLD > 0 the CLI leaves
+forum_posts.likes_count to the scheduled run.
+
+    python -m app.services.reconciliation_service
+    python -m app.services.reconciliation_service --counter forum_posts.likes_count
+"""
+import argparse
+import asyncio
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.community import ForumPost, ForumTopic, PostLike, PostReply
+from app.services.feed_cache_service import feed_cache
+from app.services.like_counter_service import flush_like_deltas, pending_delta
+from app.services.reference_data_service import reference_data, TOPICS
+
+logger = logging.getLogger(__name__)
+
+
+class Counter(NamedTuple):
+    name: str
+    parent: type
+    column: str
+    child_key: object
+    # Rows with in-memory changes not yet written; their stored value is expected to lag
+    has_pending: Optional[Callable[[int], int]] = None
+
+
+LIKES_COUNT = "forum_posts.likes_count"
+
+COUNTERS = [
+    Counter(LIKES_COUNT, ForumPost, "likes_count", PostLike.post_id, pending_delta),
+    Counter("forum_posts.replies_count", ForumPost, "replies_count", PostReply.post_id),
+    Counter("forum_topics.post_count", ForumTopic, "post_count", ForumPost.topic_id),
+]
+
+
+def _reconcile_chunk(db: Session, counter: Counter, rows: List[tuple]) -> Tuple[List[int], int]:
+    """Fix drifted rows in one chunk; returns the ids written to and how many were corrected"""
+    ids = [row_id for row_id, _ in rows]
+    actual = dict(
+        db.query(counter.child_key, func.count())
+        .filter(counter.child_key.in_(ids))
+        .group_by(counter.child_key)
+        .all()
+    )
+    fixes = [
+        {"row_id": row_id, "stored": stored, "actual": actual.get(row_id, 0)}
+        for row_id, stored in rows
+        if stored != actual.get(row_id, 0) and not (counter.has_pending and counter.has_pending(row_id))
+    ]
+    if not fixes:
+        return [], 0
+
+    table = counter.parent.__table__
+    result = db.execute(
+        update(table)
+        .where(and_(table.c.id == bindparam("row_id"), table.c[counter.column] == bindparam("stored")))
+        .values({counter.column: bindparam("actual")}),
+        fixes
+    )
+    db.commit()
+    # Rows whose counter moved after it was read don't match and are left for the next run
+    corrected = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(fixes)
+    return [fix["row_id"] for fix in fixes], corrected
+
+
+def reconcile_counter(db: Session, counter: Counter, chunk_size: Optional[int] = None) -> int:
+    """Fix one counter across its whole table; returns how many rows were corrected"""
+    chunk_size = chunk_size or settings.COUNTER_RECONCILE_CHUNK_SIZE
+    column = getattr(counter.parent, counter.column)
+    last_id, corrected = 0, 0
+    while True:
+        rows = db.query(counter.parent.id, column)\
+            .filter(counter.parent.id > last_id)\
+            .order_by(counter.parent.id)\
+            .limit(chunk_size)\
+            .all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        fixed, count = _reconcile_chunk(db, counter, rows)
+        corrected += count
+        if fixed and counter.parent is ForumPost:
+            feed_cache.invalidate(*[f"post:{post_id}" for post_id in fixed])
+    if corrected and counter.parent is ForumTopic:
+        reference_data.invalidate(TOPICS)
+    return corrected
+
+
+def reconcile_counters(db: Session, names: Optional[List[str]] = None, chunk_size: Optional[int] = None) -> Dict[str, int]:
+    """Fix every (or the named) counter; returns corrected rows per counter"""
+    return {
+        counter.name: reconcile_counter(db, counter, chunk_size)
+        for counter in COUNTERS
+        if not names or counter.name in names
+    }
+
+
+def _run_scheduled_reconciliation():
+    flush_like_deltas()
+    db = SessionLocal()
+    try:
+        corrected = reconcile_counters(db)
+        if any(corrected.values()):
+            logger.info(f"Counter reconciliation corrected {corrected}")
+    finally:
+        db.close()
+
+
+async def run_reconciliation_loop():
+    """Background task: reconcile counters every COUNTER_RECONCILE_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.COUNTER_RECONCILE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_run_scheduled_reconciliation)
+        except Exception as e:
+            logger.warning(f"Counter reconciliation failed: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute denormalized counters and fix drift")
+    parser.add_argument(
+        "--counter", action="append", choices=[counter.name for counter in COUNTERS],
+        help="only reconcile this counter (repeatable)"
+    )
+    parser.add_argument("--chunk-size", type=int, help="rows per batch (default COUNTER_RECONCILE_CHUNK_SIZE)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    names = args.counter or [counter.name for counter in COUNTERS]
+    if settings.LIKE_WRITE_BEHIND_THRESHOLD > 0 and LIKES_COUNT in names:
+        logger.warning(f"Skipping {LIKES_COUNT}: write-behind is on, so the app reconciles it itself")
+        names = [name for name in names if name != LIKES_COUNT]
+        if not names:
+            return
+    db = SessionLocal()
+    try:
+        for name, corrected in reconcile_counters(db, names, args.chunk_size).items():
+            logger.info(f"{name}: corrected {corrected} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Reference data service - in-process cache of read-mostly lookup data
+
+Holds the General Feed topic, the serialized forum topic list and the
+collaboration templates. They are loaded at startup, served from memory,
+and reloaded on next use after a write invalidates them. Topic post counts
+come from the maintained `forum_topics.post_count`. `create_post` bumps the
+cached count in place instead of dropping the list.
+"""
+import threading
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.models.collaboration import CollabTemplate
+from app.models.community import ForumTopic
+from app.services.forum_service import topic_to_response
+
+GENERAL_TOPIC_NAME = "General Feed"
+
+GENERAL_TOPIC = "general_topic"
+TOPICS = "topics"
+TEMPLATES = "templates"
+
+
+def template_to_response(template: CollabTemplate) -> Dict[str, Any]:
+    return {
+        "id": template.id,
+        "name": template.name,
+        "content": template.content,
+        "category": template.category,
+        "isDefault": template.is_default
+    }
+
+
+def _load_general_topic(db: Session) -> Dict[str, Any]:
+    """The General Feed topic as {"id", "name"}, created on first use"""
+    topic = db.query(ForumTopic).filter(ForumTopic.name == GENERAL_TOPIC_NAME).first()
+    if not topic:
+        topic = ForumTopic(
+            name=GENERAL_TOPIC_NAME,
+            description="General posts from creators",
+            icon="📝"
+        )
+        db.add(topic)
+        db.commit()
+        db.refresh(topic)
+        reference_data.invalidate(TOPICS)
+    return {"id": topic.id, "name": topic.name}
+
+
+def _load_topics(db: Session) -> List[Dict[str, Any]]:
+    return [topic_to_response(topic) for topic in db.query(ForumTopic).order_by(ForumTopic.created_at).all()]
+
+
+def _load_templates(db: Session) -> List[Dict[str, Any]]:
+    return [template_to_response(template) for template in db.query(CollabTemplate).order_by(CollabTemplate.id).all()]
+
+
+_LOADERS: Dict[str, Callable[[Session], Any]] = {
+    GENERAL_TOPIC: _load_general_topic,
+    TOPICS: _load_topics,
+    TEMPLATES: _load_templates,
+}
+
+
+class ReferenceData:
+    """Named entries loaded on first use (or at startup) and dropped on write"""
+
+    def __init__(self):
+        self._entries: Dict[str, Any] = {}
+        # Bumped on every change so an entry loaded concurrently with a write isn't kept
+        self._versions: Dict[str, int] = {name: 0 for name in _LOADERS}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, db: Session) -> Any:
+        with self._lock:
+            if name in self._entries:
+                return self._entries[name]
+            version = self._versions[name]
+        value = _LOADERS[name](db)
+        with self._lock:
+            if version == self._versions[name]:
+                self._entries[name] = value
+        return value
+
+    def load(self, db: Session):
+        """Load every entry; called at startup"""
+        for name in _LOADERS:
+            self._get(name, db)
+
+    def invalidate(self, *names: str):
+        with self._lock:
+            for name in names or tuple(_LOADERS):
+                self._versions[name] += 1
+                self._entries.pop(name, None)
+
+    def general_topic(self, db: Session) -> Dict[str, Any]:
+        return dict(self._get(GENERAL_TOPIC, db))
+
+    def topics(self, db: Session) -> List[Dict[str, Any]]:
+        return [dict(topic) for topic in self._get(TOPICS, db)]
+
+    def templates(self, db: Session) -> List[Dict[str, Any]]:
+        return [dict(template) for template in self._get(TEMPLATES, db)]
+
+    def bump_post_count(self, topic_id: int, delta: int = 1):
+        with self._lock:
+            self._versions[TOPICS] += 1
+            for topic in self._entries.get(TOPICS) or []:
+                if topic["id"] == topic_id:
+                    topic["postCount"] += delta
+
+
+reference_data = ReferenceData()
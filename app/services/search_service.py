@@ -0,0 +1,361 @@
+"""
+Search service - ranked full-text search over forum posts and replies
+
+SQLite (dev) keeps a separate FTS5 table, `forum_search`, with one row per
+post (title + content) and one per reply (content). Row ids are derived from
+the source ids, so `index_post` / `index_reply` can replace a document in the
+caller's transaction when it is created or edited. Postgres keeps a generated
+`search_vector` tsvector column with a GIN index on each source table, so
+the database indexes every insert and update itself.
+
+Hits are ranked (bm25 / ts_rank_cd) and paged by offset. Highlighting is done
+only for the returned page. Matches are wrapped in <mark>, and the text
+around them is HTML-escaped.
+
+    python -m app.services.search_service reindex
+    python -m app.services.search_service benchmark --posts 1000000
+"""
+import argparse
+import html
+import itertools
+import logging
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, create_engine, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models.community import ForumPost, ForumTopic, PostReply
+from app.services.moderation_service import REJECTED
+
+logger = logging.getLogger(__name__)
+
+# Sentinels around matched terms; swapped for <mark> once the text is escaped
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchHit(NamedTuple):
+    post_id: int
+    reply_id: Optional[int]
+    score: float
+    title: Optional[str]
+    snippet: str
+
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+# Post documents get even row ids and replies odd ones, so both share one FTS table
+def _post_rowid(post_id: int) -> int:
+    return post_id * 2
+
+
+def _reply_rowid(reply_id: int) -> int:
+    return reply_id * 2 + 1
+
+
+_SQLITE_SETUP = [
+    "CREATE VIRTUAL TABLE forum_search USING fts5("
+    "title, body, post_id UNINDEXED, reply_id UNINDEXED, tokenize = 'porter unicode61')",
+    # Title matches count four times as much as body matches
+    "INSERT INTO forum_search(forum_search, rank) VALUES ('rank', 'bm25(4.0, 1.0)')",
+]
+
+_POSTGRES_SETUP = [
+    "ALTER TABLE forum_posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_forum_posts_search_vector ON forum_posts USING GIN (search_vector)",
+    "ALTER TABLE post_replies ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "to_tsvector('english', coalesce(content, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_post_replies_search_vector ON post_replies USING GIN (search_vector)",
+]
+
+
+def ensure_search_index(bind: Engine = engine):
+    """Create the search index if missing; run after create_all at startup"""
+    with bind.begin() as conn:
+        if _is_postgres(bind):
+            # Adding the generated columns fills them for existing rows
+            for statement in _POSTGRES_SETUP:
+                conn.execute(text(statement))
+            return
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'forum_search'")
+        ).first()
+        if exists:
+            return
+        for statement in _SQLITE_SETUP:
+            conn.execute(text(statement))
+        _fill_sqlite_index(conn)
+
+
+def _fill_sqlite_index(conn):
+    conn.execute(text(
+        "INSERT INTO forum_search(rowid, title, body, post_id, reply_id) "
+        "SELECT id * 2, title, content, id, NULL FROM forum_posts"
+    ))
+    conn.execute(text(
+        "INSERT INTO forum_search(rowid, title, body, post_id, reply_id) "
+        "SELECT id * 2 + 1, '', content, post_id, id FROM post_replies"
+    ))
+
+
+def rebuild_search_index(db: Session):
+    """Re-index every post and reply (Postgres columns are always current)"""
+    if _is_postgres(db.bind):
+        return
+    db.execute(text("DELETE FROM forum_search"))
+    _fill_sqlite_index(db.connection())
+    db.commit()
+
+
+def _replace_document(db: Session, rowid: int, title: str, body: str, post_id: int, reply_id: Optional[int]):
+    db.execute(
+        text(
+            "INSERT OR REPLACE INTO forum_search(rowid, title, body, post_id, reply_id) "
+            "VALUES (:rowid, :title, :body, :post_id, :reply_id)"
+        ),
+        {"rowid": rowid, "title": title, "body": body, "post_id": post_id, "reply_id": reply_id}
+    )
+
+
+def index_post(db: Session, post: ForumPost):
+    """(Re-)index a created or edited post in the caller's transaction; needs `post.id`"""
+    if not _is_postgres(db.bind):
+        _replace_document(db, _post_rowid(post.id), post.title, post.content, post.id, None)
+
+
+def index_reply(db: Session, reply: PostReply):
+    """(Re-)index a created or edited reply in the caller's transaction; needs `reply.id`"""
+    if not _is_postgres(db.bind):
+        _replace_document(db, _reply_rowid(reply.id), "", reply.content, reply.post_id, reply.id)
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    """All words must match; each is quoted so FTS5 operators in the input are literal"""
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words)
+
+
+# Ranking every match of a very common term is what makes a query slow, so
+# only the newest SEARCH_MAX_CANDIDATES matches (FTS5 walks them in rowid
+# order and stops) are ranked. Highlights are made for the page rows only.
+_SQLITE_SEARCH = text(
+    "SELECT id, post_id, reply_id, score FROM ("
+    "  SELECT rowid AS id, post_id, reply_id, rank AS score FROM forum_search "
+    "  WHERE forum_search MATCH :query ORDER BY rowid DESC LIMIT :candidates"
+    ") ORDER BY score, id DESC LIMIT :limit OFFSET :offset"
+)
+
+# One statement for the whole page; FTS5 looks the rowids up directly
+_SQLITE_HIGHLIGHT = text(
+    "SELECT rowid, highlight(forum_search, 0, char(2), char(3)), "
+    "snippet(forum_search, 1, char(2), char(3), '…', 32) "
+    "FROM forum_search WHERE forum_search MATCH :query AND rowid IN :rowids"
+).bindparams(bindparam("rowids", expanding=True))
+
+_HEADLINE_OPTIONS = "StartSel=\x02, StopSel=\x03, MaxWords=32, MinWords=12, MaxFragments=2, FragmentDelimiter=…"
+
+_POSTGRES_SEARCH = text(
+    "WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query), "
+    "hits AS ("
+    "  SELECT p.id AS post_id, NULL::integer AS reply_id, ts_rank_cd(p.search_vector, q.query) AS score "
+    "  FROM forum_posts p, q WHERE p.search_vector @@ q.query "
+    "  UNION ALL "
+    "  SELECT r.post_id, r.id, ts_rank_cd(r.search_vector, q.query) "
+    "  FROM post_replies r, q WHERE r.search_vector @@ q.query "
+    "  AND (r.moderation_status IS NULL OR r.moderation_status <> :rejected) "
+    "  ORDER BY score DESC, post_id DESC, reply_id DESC NULLS FIRST LIMIT :limit OFFSET :offset"
+    ") "
+    # Headlines are expensive, so they are only made for the page
+    "SELECT h.post_id, h.reply_id, h.score, "
+    "  CASE WHEN h.reply_id IS NULL THEN ts_headline('english', p.title, q.query, :options) END, "
+    "  ts_headline('english', COALESCE(r.content, p.content), q.query, :options) "
+    "FROM hits h CROSS JOIN q "
+    "JOIN forum_posts p ON p.id = h.post_id "
+    "LEFT JOIN post_replies r ON r.id = h.reply_id "
+    "ORDER BY h.score DESC, h.post_id DESC, h.reply_id DESC NULLS FIRST"
+)
+
+
+def search_posts(db: Session, query: str, limit: int = 20, offset: int = 0) -> List[SearchHit]:
+    """Best-ranked posts and replies matching `query`"""
+    if _is_postgres(db.bind):
+        if not query.strip():
+            return []
+        rows = db.execute(
+            _POSTGRES_SEARCH,
+            {"query": query, "limit": limit, "offset": offset, "options": _HEADLINE_OPTIONS, "rejected": REJECTED}
+        ).all()
+        return [SearchHit(post_id, reply_id, float(score), title, snippet or "")
+                for post_id, reply_id, score, title, snippet in rows]
+
+    match = _fts5_query(query)
+    if match is None:
+        return []
+    rows = db.execute(
+        _SQLITE_SEARCH,
+        {"query": match, "candidates": settings.SEARCH_MAX_CANDIDATES, "limit": limit, "offset": offset}
+    ).all()
+    # Rejected replies stay in the index; drop them before their text is highlighted
+    reply_ids = [row[2] for row in rows if row[2] is not None]
+    if reply_ids:
+        rejected = {
+            reply_id for (reply_id,) in
+            db.query(PostReply.id).filter(PostReply.id.in_(reply_ids), PostReply.moderation_status == REJECTED).all()
+        }
+        rows = [row for row in rows if row[2] not in rejected]
+    if not rows:
+        return []
+    highlights = {
+        rowid: (title, snippet) for rowid, title, snippet in
+        db.execute(_SQLITE_HIGHLIGHT, {"query": match, "rowids": [row[0] for row in rows]}).all()
+    }
+    hits = []
+    for rowid, post_id, reply_id, rank in rows:
+        title, snippet = highlights.get(rowid, (None, None))
+        # bm25 is lower-is-better; flip it so higher scores are better on both backends
+        hits.append(SearchHit(post_id, reply_id, -float(rank), title if reply_id is None else None, snippet or ""))
+    return hits
+
+
+def render_highlight(value: Optional[str]) -> Optional[str]:
+    """HTML-escape highlighted text and turn the match sentinels into <mark> tags"""
+    if value is None:
+        return None
+    return html.escape(value).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+# Benchmark
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    syllables = ["ka", "lo", "mi", "ra", "shu", "ten", "vo", "zer", "pa", "quin", "el", "dor", "fy", "gan", "bri"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda word: (len(word), word))
+
+
+def _populate(bind: Engine, posts: int, words_per_post: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 20000)
+    # Zipf-like word frequencies, as in natural text
+    weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    Session = sessionmaker(bind=bind)
+    db = Session()
+    try:
+        topic = ForumTopic(name="Benchmark", description="Synthetic posts", icon="📝")
+        db.add(topic)
+        db.commit()
+        batch = 10000
+        for start in range(0, posts, batch):
+            rows = []
+            for _ in range(min(batch, posts - start)):
+                words = rng.choices(vocabulary, cum_weights=weights, k=words_per_post)
+                rows.append({
+                    "topic_id": topic.id,
+                    "title": " ".join(words[:6]),
+                    "content": " ".join(words[6:]),
+                    "is_anonymous": False,
+                    "is_pinned": False,
+                })
+            db.execute(insert(ForumPost.__table__), rows)
+            db.commit()
+            if (start // batch) % 10 == 0:
+                logger.info(f"Inserted {start + len(rows)} posts")
+    finally:
+        db.close()
+    return vocabulary
+
+
+def run_benchmark(posts: int, database_url: Optional[str], repeat: int, words_per_post: int = 40, seed: int = 7):
+    """Time search queries against a synthetic corpus of `posts` posts"""
+    path = None
+    if not database_url:
+        fd, path = tempfile.mkstemp(suffix=".db", prefix="search-benchmark-")
+        os.close(fd)
+        database_url = f"sqlite:///{path}"
+    bind = create_engine(database_url)
+    try:
+        import app.models  # noqa: F401 - register every table for create_all
+        Base.metadata.create_all(bind=bind)
+        started = time.perf_counter()
+        vocabulary = _populate(bind, posts, words_per_post, seed)
+        logger.info(f"Inserted {posts} posts in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        ensure_search_index(bind)
+        logger.info(f"Built the search index in {time.perf_counter() - started:.1f}s")
+
+        frequent, common, rare = vocabulary[5], vocabulary[200], vocabulary[-1]
+        queries = {
+            "frequent word": frequent,
+            "common word": common,
+            "rare word": rare,
+            "two words": f"{common} {vocabulary[300]}",
+            "deep page": frequent,
+        }
+        db = sessionmaker(bind=bind)()
+        try:
+            for label, query in queries.items():
+                offset = 200 if label == "deep page" else 0
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    hits = search_posts(db, query, limit=20, offset=offset)
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                logger.info(
+                    f"{label:<14} {query!r:<28} hits={len(hits):<3} "
+                    f"p50={statistics.median(timings):.1f}ms p95={p95:.1f}ms max={timings[-1]:.1f}ms"
+                )
+        finally:
+            db.close()
+    finally:
+        bind.dispose()
+        if path:
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forum post search index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reindex", help="rebuild the index from all posts and replies")
+    benchmark = commands.add_parser("benchmark", help="time queries against a synthetic corpus")
+    benchmark.add_argument("--posts", type=int, default=1000000, help="corpus size")
+    benchmark.add_argument("--repeat", type=int, default=20, help="runs per query")
+    benchmark.add_argument(
+        "--database-url", help="empty database to fill (default: a temporary SQLite file)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(message)s")
+    if args.command == "benchmark":
+        run_benchmark(args.posts, args.database_url, args.repeat)
+        return
+    ensure_search_index()
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+        logger.info("Search index rebuilt")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,22 @@
 """
 Storage service - mirrors the TypeScript storage.ts functionality
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, desc, func, text
-from typing import Optional, List, Dict, Any
+from sqlalchemy.sql.elements import ColumnElement
+from typing import Optional, List, Dict, Any, Set, Tuple
 from app.models import (
     Profile, User, Like, Match, Message, Block, Report,
     Collaboration, CollaborationWorkspace, SavedProfile,
     ForumTopic, ForumPost, PostReply, Event, EventAttendee, SafetyAlert,
     CollabTemplate
 )
-from datetime import datetime
+from app.models.profile import GenderCode
+from app.services.profile_service import UNLISTED_PREFERENCE, gender_accepts, sync_derived_columns, unlisted_genders
+from app.services.location_service import PendingLocation, apply_pending_location, haversine_distance, record_location
+from app.services.moderation_service import MESSAGE, REJECTED, enqueue as enqueue_moderation
 import math
+import re
 
 
 class StorageService:
@@ -28,7 +33,7 @@ class StorageService:
     
     def get_profile_by_user_id(self, user_id: str) -> Optional[Profile]:
         """Get profile by user ID"""
-        return self.db.query(Profile).filter(Profile.user_id == user_id).first()
+        return apply_pending_location(self.db.query(Profile).filter(Profile.user_id == user_id).first())
     
     def get_all_profiles(self) -> List[Profile]:
         """Get all profiles"""
@@ -37,6 +42,7 @@ class StorageService:
     def create_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Profile:
         """Create a new profile"""
         profile = Profile(user_id=user_id, **profile_data)
+        sync_derived_columns(profile)
         self.db.add(profile)
         self.db.commit()
         self.db.refresh(profile)
@@ -50,20 +56,156 @@ class StorageService:
         else:
             for key, value in updates.items():
                 setattr(profile, key, value)
+            sync_derived_columns(profile)
             self.db.commit()
             self.db.refresh(profile)
         return profile
     
-    def update_profile_location(self, user_id: str, lat: float, lng: float) -> Profile:
-        """Update profile location"""
-        profile = self.get_profile_by_user_id(user_id)
-        if profile:
-            profile.latitude = lat
-            profile.longitude = lng
-            profile.location_updated_at = datetime.now()
-            self.db.commit()
-            self.db.refresh(profile)
-        return profile
+    def update_profile_location(self, user_id: str, lat: float, lng: float) -> PendingLocation:
+        """Update profile location (buffered; written by the location flush loop)"""
+        return record_location(user_id, lat, lng)
+    
+    # === Discover ===
+    
+    def get_discover_exclude_ids(self, user_id: str) -> Set[str]:
+        """Get user IDs that must never appear in a user's discover results"""
+        exclude_ids = {user_id}
+        exclude_ids.update(
+            blocked_id for (blocked_id,) in
+            self.db.query(Block.blocked_id).filter(Block.blocker_id == user_id).all()
+        )
+        exclude_ids.update(
+            blocker_id for (blocker_id,) in
+            self.db.query(Block.blocker_id).filter(Block.blocked_id == user_id).all()
+        )
+        exclude_ids.update(
+            liked_id for (liked_id,) in
+            self.db.query(Like.liked_id).filter(Like.liker_id == user_id).all()
+        )
+        for user1_id, user2_id in self.db.query(Match.user1_id, Match.user2_id).filter(
+            or_(Match.user1_id == user_id, Match.user2_id == user_id)
+        ).filter(Match.is_active == True).all():
+            exclude_ids.add(user1_id)
+            exclude_ids.add(user2_id)
+        return exclude_ids
+    
+    def get_discover_profiles(
+        self,
+        user_id: str,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Profile, int]]:
+        """Get visible candidate profiles with their match score, best first"""
+        my_profile = self.get_profile_by_user_id(user_id)
+        exclude_ids = self.get_discover_exclude_ids(user_id)
+        
+        query = self.db.query(Profile)\
+            .options(joinedload(Profile.user))\
+            .filter(Profile.is_visible == True)\
+            .filter(~Profile.user_id.in_(exclude_ids))
+        if filters and filters.get("compatible_only") and my_profile:
+            query = query.filter(mutual_compatibility_clause(my_profile))
+        candidates = query.all()
+        
+        if filters:
+            candidates = [p for p in candidates if self._matches_discover_filters(my_profile, p, filters)]
+        
+        scored = [(p, self.calculate_match_score(my_profile, p)) for p in candidates]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+    
+    def _matches_discover_filters(self, my_profile: Optional[Profile], profile: Profile, filters: Dict[str, Any]) -> bool:
+        """Apply the discover filters (contentType, experienceLevel, ...) to a candidate"""
+        content_type = filters.get("content_type")
+        if content_type and profile.niche:
+            if content_type.lower() not in profile.niche.lower():
+                return False
+        
+        for key, attr in (
+            ("experience_level", "experience_level"),
+            ("availability", "availability"),
+            ("travel_mode", "travel_mode"),
+            ("monetization", "monetization_expectation"),
+        ):
+            allowed = filters.get(key)
+            value = getattr(profile, attr)
+            if allowed and value and value not in allowed:
+                return False
+        
+        max_distance = filters.get("max_distance")
+        if (max_distance and my_profile and my_profile.latitude and my_profile.longitude
+                and profile.latitude and profile.longitude):
+            distance = haversine_distance(
+                my_profile.latitude, my_profile.longitude,
+                profile.latitude, profile.longitude
+            )
+            if distance > max_distance:
+                return False
+        
+        return True
+    
+    @staticmethod
+    def calculate_match_score(my_profile: Optional[Profile], other_profile: Profile) -> int:
+        """Score how well another profile fits the user's preferences (0-100)"""
+        if not my_profile:
+            return 50
+        
+        score = 0.0
+        weights = {
+            "location": 20,
+            "interests": 30,
+            "gender_preference": 25,
+            "age_preference": 15,
+            "relationship_type": 10,
+        }
+        
+        if my_profile.location and other_profile.location:
+            my_loc = my_profile.location.lower().strip()
+            other_loc = other_profile.location.lower().strip()
+            if my_loc == other_loc:
+                score += weights["location"]
+            else:
+                my_parts = [p for p in re.split(r"[,\s]+", my_loc) if p]
+                other_parts = [p for p in re.split(r"[,\s]+", other_loc) if p]
+                common_parts = [p for p in my_parts if any(op in p or p in op for op in other_parts)]
+                if common_parts:
+                    score += weights["location"] * (len(common_parts) / max(len(my_parts), len(other_parts)))
+        
+        my_interests = my_profile.interests or []
+        other_interests = other_profile.interests or []
+        if my_interests and other_interests:
+            my_set = {i.lower().strip() for i in my_interests}
+            matching = [i for i in other_interests if i.lower().strip() in my_set]
+            interest_score = len(matching) / max(len(my_interests), 1)
+            score += weights["interests"] * min(interest_score * 1.5, 1)
+        
+        # Gender and age use the derived columns kept in sync by the profile service
+        gender_match = gender_accepts(
+            my_profile.gender_preference_mask, my_profile.gender_preference,
+            other_profile.gender_code, other_profile.gender
+        ) and gender_accepts(
+            other_profile.gender_preference_mask, other_profile.gender_preference,
+            my_profile.gender_code, my_profile.gender
+        )
+        if gender_match:
+            score += weights["gender_preference"]
+        
+        age_match = True
+        if other_profile.age is not None:
+            if other_profile.age < (my_profile.min_age_preference or 18) or other_profile.age > (my_profile.max_age_preference or 99):
+                age_match = False
+        if age_match and my_profile.age is not None:
+            if my_profile.age < (other_profile.min_age_preference or 18) or my_profile.age > (other_profile.max_age_preference or 99):
+                age_match = False
+        if age_match:
+            score += weights["age_preference"]
+        
+        if my_profile.relationship_type and other_profile.relationship_type:
+            if my_profile.relationship_type.lower() == other_profile.relationship_type.lower():
+                score += weights["relationship_type"]
+        else:
+            score += weights["relationship_type"] * 0.5
+        
+        return round(score)
     
     # === Saved Profiles ===
     
@@ -182,6 +324,8 @@ class StorageService:
             content=content
         )
         self.db.add(message)
+        self.db.flush()
+        enqueue_moderation(self.db, MESSAGE, message.id)
         self.db.commit()
         self.db.refresh(message)
         return message
@@ -189,7 +333,8 @@ class StorageService:
     def get_messages(self, match_id: int) -> List[Message]:
         """Get messages for a match"""
         return self.db.query(Message).filter(
-            Message.match_id == match_id
+            Message.match_id == match_id,
+            or_(Message.moderation_status.is_(None), Message.moderation_status != REJECTED)
         ).order_by(Message.created_at.asc()).all()
     
     def mark_messages_as_read(self, match_id: int, user_id: str) -> bool:
@@ -296,6 +441,47 @@ class StorageService:
         return collab
 
 
+def mutual_compatibility_clause(my_profile: Profile) -> ColumnElement:
+    """SQL predicate: candidate and user fit each other's gender and age preferences
+    
+    Same rules as the gender/age part of calculate_match_score, evaluated on
+    the derived columns so it can use ix_profiles_visible_gender_age. An
+    unlisted gender of the user's own is checked against candidates' masks
+    only (any UNLISTED_PREFERENCE passes); calculate_match_score compares the
+    text.
+    """
+    clauses = []
+    mask = my_profile.gender_preference_mask
+    if mask:
+        wanted = [int(code) for code in GenderCode if mask & (1 << code)]
+        accepted = [Profile.gender_code == 0, Profile.gender_code.in_(wanted)]
+        unlisted = unlisted_genders(my_profile.gender_preference) if mask & UNLISTED_PREFERENCE else set()
+        if unlisted:
+            accepted.append(and_(
+                Profile.gender_code == int(GenderCode.OTHER),
+                Profile.gender_key.in_(unlisted)
+            ))
+        clauses.append(or_(*accepted))
+    if my_profile.gender_code:
+        bits = 1 << my_profile.gender_code
+        if my_profile.gender_code == GenderCode.OTHER:
+            bits |= UNLISTED_PREFERENCE
+        clauses.append(or_(
+            Profile.gender_preference_mask == 0,
+            Profile.gender_preference_mask.op("&")(bits) != 0
+        ))
+    clauses.append(or_(
+        Profile.age.is_(None),
+        Profile.age.between(my_profile.min_age_preference or 18, my_profile.max_age_preference or 99)
+    ))
+    if my_profile.age is not None:
+        clauses.append(and_(
+            func.coalesce(Profile.min_age_preference, 18) <= my_profile.age,
+            func.coalesce(Profile.max_age_preference, 99) >= my_profile.age
+        ))
+    return and_(*clauses)
+
+
 def get_storage(db: Session) -> StorageService:
     """Get storage service instance"""
     return StorageService(db)
@@ -0,0 +1,155 @@
+"""
+Text index service - TF-IDF similarity over creator profile text
+
+Indexes `bio`, `niche`, `content_style` and `tags` of visible profiles in an
+in-memory inverted index (term -> {user_id: tf}), i.e. the columns of a sparse
+TF-IDF matrix. Keeping it as posting lists lets `update_profile` replace one
+document at a time, and a top-k cosine query only touches profiles that share
+a term with the query profile.
+
+Each document's norm is stored when it is indexed. Norms depend on idf,
+which drifts as profiles change, so all of them are recomputed once the
+changes since the last refresh pass NORM_REFRESH_RATIO of the index.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Profile
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have i im in is it its me my of on or our so that the
+their them they this to us was we with you your
+""".split())
+# Short, curated fields say more about a creator than free-form bio text
+FIELD_WEIGHTS = {"bio": 1.0, "niche": 2.0, "content_style": 2.0, "tags": 2.0}
+# Terms in more than this share of profiles carry almost no signal and have huge posting lists,
+# so a query skips them; the floor keeps small indexes from losing every term
+MAX_DF_RATIO = 0.05
+MIN_DF_CUTOFF = 50
+NORM_REFRESH_RATIO = 0.1
+MIN_NORM_REFRESH_CHANGES = 100
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOP_WORDS]
+
+
+def profile_terms(profile: Profile) -> Dict[str, float]:
+    """Weighted term frequencies for a profile's indexed fields"""
+    counts: Counter = Counter()
+    for field in ("bio", "niche", "content_style"):
+        for token in tokenize(getattr(profile, field)):
+            counts[token] += FIELD_WEIGHTS[field]
+    for tag in profile.tags or []:
+        for token in tokenize(str(tag)):
+            counts[token] += FIELD_WEIGHTS["tags"]
+    # Sublinear tf so one repeated word doesn't dominate a long bio
+    return {term: 1 + math.log(count) for term, count in counts.items() if count > 0}
+
+
+class TextIndex:
+    """Incrementally updated TF-IDF index over profiles, keyed by user ID"""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._norms: Dict[str, float] = {}
+        self._changes_since_refresh = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _remove_locked(self, user_id: str):
+        self._norms.pop(user_id, None)
+        for term in self._docs.pop(user_id, {}):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(user_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def _changed_locked(self):
+        self._changes_since_refresh += 1
+        if self._changes_since_refresh > max(MIN_NORM_REFRESH_CHANGES, len(self._docs) * NORM_REFRESH_RATIO):
+            self._norms = {user_id: self._norm(terms) for user_id, terms in self._docs.items()}
+            self._changes_since_refresh = 0
+
+    def upsert(self, user_id: str, terms: Dict[str, float]):
+        with self._lock:
+            self._remove_locked(user_id)
+            if terms:
+                self._docs[user_id] = terms
+                for term, tf in terms.items():
+                    self._postings[term][user_id] = tf
+                self._norms[user_id] = self._norm(terms)
+            self._changed_locked()
+
+    def remove(self, user_id: str):
+        with self._lock:
+            self._remove_locked(user_id)
+            self._changed_locked()
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log((1 + len(self._docs)) / (1 + df)) + 1
+
+    def _norm(self, terms: Dict[str, float]) -> float:
+        return math.sqrt(sum((tf * self._idf(term)) ** 2 for term, tf in terms.items()))
+
+    def similar(self, user_id: str, limit: int) -> List[Tuple[str, float]]:
+        """Top-k profiles by TF-IDF cosine similarity to the given profile"""
+        with self._lock:
+            query = self._docs.get(user_id)
+            if not query:
+                return []
+            max_df = max(MIN_DF_CUTOFF, int(len(self._docs) * MAX_DF_RATIO))
+            dots: Dict[str, float] = defaultdict(float)
+            for term, tf in query.items():
+                posting = self._postings.get(term, {})
+                if len(posting) > max_df:
+                    continue
+                idf_sq = self._idf(term) ** 2
+                for other_id, other_tf in posting.items():
+                    if other_id != user_id:
+                        dots[other_id] += tf * other_tf * idf_sq
+            if not dots:
+                return []
+            query_norm = self._norms[user_id]
+            scored = [
+                (other_id, dot / (query_norm * self._norms[other_id]))
+                for other_id, dot in dots.items()
+            ]
+        return heapq.nlargest(limit, scored, key=lambda item: item[1])
+
+
+text_index = TextIndex()
+
+
+def index_profile(profile: Profile):
+    """Add, refresh or drop a profile in the similarity index after it changed"""
+    if profile.is_visible is False:
+        text_index.remove(profile.user_id)
+    else:
+        text_index.upsert(profile.user_id, profile_terms(profile))
+
+
+def build_text_index(db: Session) -> int:
+    """(Re)load the index from all visible profiles; returns how many were indexed"""
+    profiles = db.query(
+        Profile.user_id, Profile.bio, Profile.niche, Profile.content_style, Profile.tags
+    ).filter(Profile.is_visible == True).yield_per(1000)
+    count = 0
+    for row in profiles:
+        text_index.upsert(row.user_id, profile_terms(row))
+        count += 1
+    return count
@@ -0,0 +1,208 @@
+"""
+Timeline service - "following" home timelines with fan-out-on-write
+
+Each active reader keeps an in-memory, newest-first list of (created_at, post
+id) for posts by the accounts they follow, capped at TIMELINE_MAX_LENGTH.
+`create_post` pushes the new post into the lists of the author's followers
+that are loaded. Authors with more than TIMELINE_FANOUT_LIMIT followers are
+not fanned out. Their posts are merged in at read time from the
+(author_id, created_at, id) index instead.
+
+Timelines not read for TIMELINE_IDLE_TTL_SECONDS are evicted, and inactive
+users get no fan-out at all. Their list is rebuilt from the database on the
+next read, which is the only read that scans over all followees.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import ForumPost
+from app.models.connections import Follow
+from app.services.feed_service import build_post_cards, post_card_query
+from app.services.pagination_service import keyset_after
+
+logger = logging.getLogger(__name__)
+
+TimelineEntry = Tuple[datetime, int]
+
+
+class Timeline:
+    __slots__ = ("entries", "followees", "last_access")
+
+    def __init__(self, entries: List[TimelineEntry], followees: Set[str]):
+        self.entries: Deque[TimelineEntry] = deque(entries, maxlen=settings.TIMELINE_MAX_LENGTH)
+        self.followees = followees
+        self.last_access = time.monotonic()
+
+
+class TimelineStore:
+    """Per-user timelines plus the set of authors read with fan-out-on-read"""
+
+    def __init__(self):
+        self._timelines: Dict[str, Timeline] = {}
+        self._high_fanout_authors: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Timeline]:
+        with self._lock:
+            timeline = self._timelines.get(user_id)
+            if timeline is not None:
+                timeline.last_access = time.monotonic()
+            return timeline
+
+    def put(self, user_id: str, timeline: Timeline):
+        with self._lock:
+            self._timelines[user_id] = timeline
+
+    def push(self, follower_ids: List[str], entry: TimelineEntry) -> int:
+        """Prepend a post to the loaded timelines among `follower_ids`; returns how many"""
+        pushed = 0
+        with self._lock:
+            for follower_id in follower_ids:
+                timeline = self._timelines.get(follower_id)
+                if timeline is not None:
+                    timeline.entries.appendleft(entry)
+                    pushed += 1
+        return pushed
+
+    def mark_high_fanout(self, author_id: str, high: bool):
+        with self._lock:
+            if high:
+                self._high_fanout_authors.add(author_id)
+            else:
+                self._high_fanout_authors.discard(author_id)
+
+    def high_fanout_among(self, author_ids: Set[str]) -> Set[str]:
+        with self._lock:
+            return author_ids & self._high_fanout_authors
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._timelines.pop(user_id, None)
+
+    def evict_idle(self, idle_seconds: int) -> int:
+        """Drop timelines not read for `idle_seconds`; returns how many were evicted"""
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            idle = [user_id for user_id, timeline in self._timelines.items() if timeline.last_access < cutoff]
+            for user_id in idle:
+                del self._timelines[user_id]
+            return len(idle)
+
+
+timeline_store = TimelineStore()
+
+
+def _public_posts(db: Session):
+    return db.query(ForumPost.created_at, ForumPost.id).filter(ForumPost.is_anonymous == False)
+
+
+def fan_out_post(db: Session, post: ForumPost) -> int:
+    """Push a new post into its author's followers' timelines; returns how many were updated"""
+    if post.is_anonymous or not post.author_id:
+        return 0
+    follower_ids = [
+        follower_id for (follower_id,) in
+        db.query(Follow.follower_id)
+        .filter(Follow.following_id == post.author_id)
+        .limit(settings.TIMELINE_FANOUT_LIMIT + 1)
+        .all()
+    ]
+    high_fanout = len(follower_ids) > settings.TIMELINE_FANOUT_LIMIT
+    timeline_store.mark_high_fanout(post.author_id, high_fanout)
+    if high_fanout:
+        return 0
+    return timeline_store.push(follower_ids, (post.created_at, post.id))
+
+
+def rebuild_timeline(db: Session, user_id: str) -> Timeline:
+    """Load a user's timeline from the posts of everyone they follow"""
+    followees = {
+        following_id for (following_id,) in
+        db.query(Follow.following_id).filter(Follow.follower_id == user_id).all()
+    }
+    entries: List[TimelineEntry] = []
+    if followees:
+        entries = [
+            (created_at, post_id) for created_at, post_id in
+            _public_posts(db)
+            .filter(ForumPost.author_id.in_(followees))
+            .order_by(desc(ForumPost.created_at), desc(ForumPost.id))
+            .limit(settings.TIMELINE_MAX_LENGTH)
+            .all()
+        ]
+    timeline = Timeline(entries, followees)
+    timeline_store.put(user_id, timeline)
+    return timeline
+
+
+def get_timeline_page(
+    db: Session,
+    user_id: str,
+    limit: int,
+    after: Optional[TimelineEntry] = None
+) -> Tuple[List[Dict[str, Any]], Optional[TimelineEntry]]:
+    """One page of a user's following timeline, newest first
+
+    Returns the post cards and the (created_at, id) key of the last one if
+    there may be more.
+    """
+    timeline = timeline_store.get(user_id) or rebuild_timeline(db, user_id)
+    entries = list(timeline.entries)
+    start = 0
+    if after is not None:
+        # Entries are newest first, so skip everything not strictly older than the cursor
+        while start < len(entries) and entries[start] >= after:
+            start += 1
+    candidates = entries[start:start + limit]
+    if len(candidates) < limit and len(entries) == settings.TIMELINE_MAX_LENGTH and timeline.followees:
+        # Scrolled past the capped list: continue from the database
+        boundary = min(key for key in (after, entries[-1]) if key is not None)
+        candidates.extend(
+            (created_at, post_id) for created_at, post_id in
+            _public_posts(db)
+            .filter(ForumPost.author_id.in_(timeline.followees))
+            .filter(keyset_after(db, (ForumPost.created_at, ForumPost.id), boundary))
+            .order_by(desc(ForumPost.created_at), desc(ForumPost.id))
+            .limit(limit - len(candidates))
+            .all()
+        )
+
+    # Posts by high-fanout followees were never pushed; read them through the author index
+    high_fanout = timeline_store.high_fanout_among(timeline.followees)
+    if high_fanout:
+        query = _public_posts(db).filter(ForumPost.author_id.in_(high_fanout))
+        if after is not None:
+            query = query.filter(keyset_after(db, (ForumPost.created_at, ForumPost.id), after))
+        candidates.extend(
+            (created_at, post_id) for created_at, post_id in
+            query.order_by(desc(ForumPost.created_at), desc(ForumPost.id)).limit(limit).all()
+        )
+    page = sorted(set(candidates), reverse=True)[:limit]
+    if not page:
+        return [], None
+
+    rows = post_card_query(db).filter(ForumPost.id.in_([post_id for _, post_id in page])).all()
+    rows.sort(key=lambda row: (row[0].created_at, row[0].id), reverse=True)
+    last = page[-1] if len(page) == limit else None
+    return build_post_cards(db, rows, user_id), last
+
+
+async def run_timeline_eviction_loop():
+    """Background task: drop timelines of users who stopped reading them"""
+    while True:
+        await asyncio.sleep(settings.TIMELINE_EVICT_INTERVAL_SECONDS)
+        try:
+            evicted = timeline_store.evict_idle(settings.TIMELINE_IDLE_TTL_SECONDS)
+            if evicted:
+                logger.info(f"Evicted {evicted} idle timelines")
+        except Exception as e:
+            logger.warning(f"Timeline eviction error: {str(e)}")
@@ -0,0 +1,185 @@
+"""
+Trending service - time-decayed "hot" scores for forum posts
+
+Every like adds LIKE_WEIGHT to a post's score and every reply REPLY_WEIGHT.
+An unlike takes back what its like added, already decayed, by replaying
+the like's weight at the like's own time.
+Scores decay with a half-life of TRENDING_HALF_LIFE_HOURS. Instead of
+decaying every score on every tick, an event at time t adds
+weight * 2^((t - t0) / half_life) for a fixed reference time t0. Every
+score shrinks by the same factor over time, so their order is unchanged.
+Only when the multiplier gets large are all scores rebased to a new t0.
+
+At most TRENDING_MAX_POSTS posts are kept; the lowest scores are dropped
+first. The ranking is re-sorted only after a change. Scores are written to
+`post_trending_scores` every TRENDING_PERSIST_INTERVAL_SECONDS and reloaded
+at startup. With no snapshot, they are rebuilt from recent likes and
+replies.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.community import PostLike, PostReply, PostTrendingScore
+
+logger = logging.getLogger(__name__)
+
+LIKE_WEIGHT = 1.0
+REPLY_WEIGHT = 2.0
+
+# Rebase once the growth factor passes 2^64, far below float overflow
+_REBASE_HALF_LIVES = 64
+
+
+class TrendingScores:
+    """Bounded post_id -> decayed score map with a lazily sorted ranking"""
+
+    def __init__(self):
+        self._scores: Dict[int, float] = {}
+        self._epoch = time.time()
+        self._ranking: Optional[List[int]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _half_life_seconds() -> float:
+        return settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+    def _growth_locked(self, at: float) -> float:
+        half_lives = (at - self._epoch) / self._half_life_seconds()
+        if half_lives > _REBASE_HALF_LIVES:
+            factor = 2.0 ** -half_lives
+            self._scores = {post_id: score * factor for post_id, score in self._scores.items()}
+            self._epoch = at
+            half_lives = 0.0
+        return 2.0 ** half_lives
+
+    def record(self, post_id: int, weight: float, at: Optional[float] = None):
+        """Add (or with a negative weight, take back) an event's contribution"""
+        at = time.time() if at is None else at
+        with self._lock:
+            score = self._scores.get(post_id, 0.0) + weight * self._growth_locked(at)
+            if score <= 0:
+                self._scores.pop(post_id, None)
+            else:
+                self._scores[post_id] = score
+            self._ranking = None
+            # Trim in batches so a hot stream of new posts doesn't trim on every event
+            limit = settings.TRENDING_MAX_POSTS
+            if len(self._scores) > limit + max(1, limit // 10):
+                keep = heapq.nlargest(limit, self._scores.items(), key=lambda item: item[1])
+                self._scores = dict(keep)
+
+    def page(self, offset: int, limit: int) -> List[int]:
+        """Post ids for one page of the hot ranking"""
+        with self._lock:
+            if self._ranking is None:
+                self._ranking = sorted(self._scores, key=lambda post_id: (-self._scores[post_id], -post_id))
+            return self._ranking[offset:offset + limit]
+
+    def snapshot(self) -> Dict[int, float]:
+        """Current decayed scores (as of now), for persisting"""
+        with self._lock:
+            decay = 1.0 / self._growth_locked(time.time())
+            return {post_id: score * decay for post_id, score in self._scores.items()}
+
+    def load(self, scores: Dict[int, float], at: float):
+        """Replace all scores with `scores` as they were at time `at`"""
+        with self._lock:
+            growth = self._growth_locked(at)
+            self._scores = {post_id: score * growth for post_id, score in scores.items() if score > 0}
+            self._ranking = None
+
+
+trending_scores = TrendingScores()
+
+
+def _timestamp(created_at: datetime) -> float:
+    """Epoch seconds of a naive UTC database timestamp"""
+    return created_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def record_like(post_id: int):
+    trending_scores.record(post_id, LIKE_WEIGHT)
+
+
+def record_unlike(post_id: int, liked_at: Optional[datetime]):
+    """Remove a like's contribution; `liked_at` is the deleted like's created_at"""
+    if liked_at is not None:
+        trending_scores.record(post_id, -LIKE_WEIGHT, _timestamp(liked_at))
+
+
+def record_reply(post_id: int):
+    trending_scores.record(post_id, REPLY_WEIGHT)
+
+
+def _rebuild_from_activity(db: Session) -> int:
+    """Replay likes and replies from the last few half-lives"""
+    since = datetime.utcnow() - timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS * 4)
+    events = [
+        (post_id, LIKE_WEIGHT, created_at) for post_id, created_at in
+        db.query(PostLike.post_id, PostLike.created_at).filter(PostLike.created_at >= since).all()
+    ] + [
+        (post_id, REPLY_WEIGHT, created_at) for post_id, created_at in
+        db.query(PostReply.post_id, PostReply.created_at).filter(PostReply.created_at >= since).all()
+    ]
+    trending_scores.load({}, time.time())
+    for post_id, weight, created_at in events:
+        trending_scores.record(post_id, weight, _timestamp(created_at))
+    return len(events)
+
+
+def load_trending(db: Session) -> int:
+    """Load the persisted scores at startup; returns how many posts are ranked"""
+    rows = db.query(PostTrendingScore).all()
+    if not rows:
+        _rebuild_from_activity(db)
+    else:
+        # Rows are written together, so they share one scored_at
+        trending_scores.load({row.post_id: row.score for row in rows}, _timestamp(rows[0].scored_at))
+    return len(trending_scores.snapshot())
+
+
+def persist_trending() -> int:
+    """Replace the stored snapshot with the current scores; returns how many were written"""
+    scores = trending_scores.snapshot()
+    scored_at = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(PostTrendingScore).delete(synchronize_session=False)
+        if scores:
+            db.bulk_insert_mappings(PostTrendingScore, [
+                {"post_id": post_id, "score": score, "scored_at": scored_at}
+                for post_id, score in scores.items()
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return len(scores)
+
+
+async def run_trending_persist_loop():
+    """Background task: snapshot trending scores"""
+    try:
+        while True:
+            await asyncio.sleep(settings.TRENDING_PERSIST_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(persist_trending)
+            except Exception as e:
+                logger.warning(f"Trending snapshot error: {str(e)}")
+    except asyncio.CancelledError:
+        try:
+            persist_trending()
+        except Exception as e:
+            logger.warning(f"Final trending snapshot failed: {str(e)}")
+        raise